@@ -0,0 +1,88 @@
+"""Bundled assets (the window icon) and their optional remote refresh.
+
+Assets ship next to the scripts, or inside the PyInstaller bundle when
+frozen, so the window never waits on the network. If ICON_URL is set, a
+newer icon can be fetched in the background with a conditional GET and is
+kept under APP_DATA_DIR for the next launch.
+"""
+
+import json
+import os
+import sys
+
+from config import APP_DATA_DIR, ICON_URL
+
+ICON_NAME = "32x32.ico"
+ICON_CACHE_PATH = os.path.join(APP_DATA_DIR, ICON_NAME)
+ICON_TIMEOUT = 10
+
+# Every .ico file starts with this header (reserved 0, type 1 = icon)
+_ICO_MAGIC = b"\x00\x00\x01\x00"
+
+
+def resource_path(name):
+    """Return the path of a file bundled with the application."""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, name)
+
+
+def icon_path():
+    """Return the refreshed icon if one was downloaded, else the bundled one."""
+    if os.path.exists(ICON_CACHE_PATH):
+        return ICON_CACHE_PATH
+    return resource_path(ICON_NAME)
+
+
+def _metadata_path():
+    return ICON_CACHE_PATH + ".json"
+
+
+def _load_metadata():
+    try:
+        with open(_metadata_path(), encoding="utf-8") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return {}
+
+
+def refresh_icon(url=ICON_URL, timeout=ICON_TIMEOUT):
+    """Fetch ``url`` if it changed since the last fetch.
+
+    Returns the path of the new icon, or None when nothing changed, the
+    refresh is disabled or the request failed. Meant for a worker thread.
+    """
+    if not url:
+        return None
+    import requests  # deferred: not needed to show the window
+
+    headers = {}
+    if os.path.exists(ICON_CACHE_PATH):
+        metadata = _load_metadata()
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200 or not response.content.startswith(_ICO_MAGIC):
+        # 304 Not Modified, an error page, or not an icon at all
+        return None
+
+    os.makedirs(APP_DATA_DIR, exist_ok=True)
+    partial = ICON_CACHE_PATH + ".part"
+    with open(partial, "wb") as stream:
+        stream.write(response.content)
+    os.replace(partial, ICON_CACHE_PATH)
+    with open(_metadata_path(), "w", encoding="utf-8") as stream:
+        json.dump(
+            {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            },
+            stream,
+        )
+    return ICON_CACHE_PATH
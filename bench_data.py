@@ -0,0 +1,37 @@
+"""Synthetic vocabulary shared by the benchmarks.
+
+Kept free of config and database imports so bench_export.py runs without
+database settings.
+"""
+
+import random
+
+SYLLABLES = [
+    consonant + vowel
+    for consonant in "bcdfghklmnprstvz"
+    for vowel in ("a", "e", "i", "o", "u", "ai", "ou")
+]
+
+# Meanings draw from the first LEXICON_SIZE words, frequent ones more often
+LEXICON_SIZE = 20000
+# Offset so every generated word is at least two syllables long
+WORD_OFFSET = len(SYLLABLES) + 1
+
+
+def word_for(index):
+    """Return the unique synthetic word for ``index``."""
+    n = index + WORD_OFFSET
+    parts = []
+    while n:
+        n, digit = divmod(n - 1, len(SYLLABLES))
+        parts.append(SYLLABLES[digit])
+    return "".join(reversed(parts))
+
+
+def meaning_for(index):
+    rng = random.Random(index)
+    words = [
+        word_for(int(LEXICON_SIZE ** rng.random()) - 1)
+        for _ in range(rng.randint(8, 14))
+    ]
+    return " ".join(words).capitalize() + "."
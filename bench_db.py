@@ -0,0 +1,68 @@
+"""Per-operation latency of connect-per-call versus the pooled db layer.
+
+Usage: python bench_db.py [--iterations N]
+
+Runs the same single-row lookups the GUI issues (the duplicate check in
+add_word and the meaning lookup in edit_word) against the configured database,
+first opening a fresh connection per operation the way the handlers used to,
+then borrowing from db.py's pool.
+"""
+
+import argparse
+import statistics
+import time
+
+import mysql.connector
+
+import db
+from config import DB_CONFIG
+
+QUERIES = [
+    ("exists check", "SELECT COUNT(*) FROM vocabulary WHERE word = %s", ("example",)),
+    ("meaning lookup", "SELECT meaning FROM vocabulary WHERE word = %s", ("example",)),
+]
+
+
+def per_call(query, params):
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    cursor.fetchall()
+    conn.close()
+
+
+def pooled(query, params):
+    with db.cursor() as cursor:
+        cursor.execute(query, params)
+        cursor.fetchall()
+
+
+def measure(func, query, params, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(query, params)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # Warm the pool so the first handshake isn't counted against it.
+    pooled("SELECT 1", ())
+
+    print(f"{'operation':<16}{'mode':<10}{'median ms':>12}{'p95 ms':>12}")
+    for name, query, params in QUERIES:
+        for mode, func in (("per-call", per_call), ("pooled", pooled)):
+            median, p95 = measure(func, query, params, args.iterations)
+            print(f"{name:<16}{mode:<10}{median:>12.2f}{p95:>12.2f}")
+
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
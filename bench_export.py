@@ -0,0 +1,83 @@
+"""Time and peak memory of the PDF export, streaming versus FPDF.
+
+Usage: python bench_export.py [--sizes 10000 100000]
+
+Renders synthetic (word, meaning) rows to a temporary file, once with the
+streaming writer the export uses now and once with FPDF building the whole
+document in memory the way it used to (skipped if fpdf isn't installed).
+Rows come from a generator, so the numbers measure the writers rather than
+the database.
+"""
+
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+import tracemalloc
+
+import export
+from bench_data import meaning_for, word_for
+
+
+def synthetic_rows(count):
+    for index in range(count):
+        yield word_for(index), meaning_for(index)
+
+
+def streaming(rows, path):
+    export.write_atomically(path, lambda stream: export.write_pdf(rows, stream))
+
+
+def in_memory(rows, path):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", style="B", size=14)
+    pdf.cell(200, 10, txt="Vocabulary List", ln=True, align="C")
+    pdf.ln(10)
+    pdf.set_font("Arial", size=12)
+    for word, meaning in list(rows):
+        pdf.cell(0, 10, txt=f"Word: {word}", ln=True)
+        pdf.multi_cell(0, 10, txt=f"Meaning: {meaning}", align="L")
+        pdf.ln(5)
+    pdf.output(path)
+
+
+def measure(func, size, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(synthetic_rows(size), path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, os.path.getsize(path) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    writers = [("streaming", streaming)]
+    if importlib.util.find_spec("fpdf") is not None:
+        writers.append(("fpdf", in_memory))
+    else:
+        print("fpdf is not installed; only the streaming writer is measured.")
+
+    print(f"{'rows':>8}  {'writer':<10}{'seconds':>10}{'peak MiB':>10}{'file MiB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "export.pdf")
+        for size in args.sizes:
+            for name, func in writers:
+                elapsed, peak, file_size = measure(func, size, path)
+                print(
+                    f"{size:>8}  {name:<10}"
+                    f"{elapsed:>10.2f}{peak:>10.1f}{file_size:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
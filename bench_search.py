@@ -0,0 +1,119 @@
+"""Search latency of a LIKE scan versus the replica's full-text search.
+
+Usage: python bench_search.py [--sizes 10000 100000 1000000] [--iterations N]
+
+Fills a scratch replica (``bench_replica.sqlite3`` in the working directory by
+default, never the real one) with synthetic words and meanings, growing it to
+each size in turn, and times what the list does for a search: count the
+matches and read the first page. The scratch file is kept between runs so the
+larger sizes only have to be generated once; pass --drop to remove it
+afterwards.
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from bench_data import LEXICON_SIZE, meaning_for, word_for
+from replica import Replica
+from vocabulary import MEANING_PREVIEW_LENGTH, escape_like
+from vocabview import PAGE_SIZE
+
+INSERT_BATCH = 5000
+
+
+def like_search(replica, term):
+    """The search the list used to run: every word LIKE '%word%' on the word
+    or the meaning, exact and prefix matches on the word first."""
+    words = [word.strip('+-"*') for word in term.split()]
+    like = "'%' || ? || '%' ESCAPE '\\'"
+    where = " AND ".join(f"(word LIKE {like} OR meaning LIKE {like})" for _ in words)
+    params = tuple(param for word in words for param in (escape_like(word),) * 2)
+    phrase = " ".join(words)
+    rank = (
+        "CASE WHEN word = ? COLLATE NOCASE THEN 2 "
+        "WHEN word LIKE ? || '%' ESCAPE '\\' THEN 1 ELSE 0 END"
+    )
+    conn = replica._conn
+    conn.execute(f"SELECT COUNT(*) FROM vocabulary WHERE {where}", params).fetchone()
+    conn.execute(
+        f"SELECT local_id, word, substr(meaning, 1, {MEANING_PREVIEW_LENGTH}) "
+        f"FROM vocabulary WHERE {where} ORDER BY {rank} DESC, local_id LIMIT ?",
+        params + (phrase, escape_like(phrase), PAGE_SIZE),
+    ).fetchall()
+
+
+def fulltext_search(replica, term):
+    """The search box's search (see Replica.search)."""
+    source = replica.search(term)
+    source.count()
+    source.rows_at(0, PAGE_SIZE)
+
+
+def grow(replica, size):
+    """Insert synthetic rows until the replica holds ``size`` of them."""
+    conn = replica._conn
+    current = replica.count()
+    for start in range(current, size, INSERT_BATCH):
+        stop = min(start + INSERT_BATCH, size)
+        with conn:
+            conn.executemany(
+                "INSERT INTO vocabulary (word, meaning) VALUES (?, ?)",
+                [(word_for(i), meaning_for(i)) for i in range(start, stop)],
+            )
+    if size > current:
+        conn.execute("ANALYZE")
+
+
+def terms_for(size):
+    word = word_for(size // 2)
+    return [
+        ("frequent word", word_for(3)),
+        ("rare word", word_for(LEXICON_SIZE - 5)),
+        ("exact word", word),
+        ("prefix", word[:4] + "*"),
+        ("short prefix", word[:2]),
+        ("two words", f"{word_for(3)} {word_for(LEXICON_SIZE - 5)}"),
+    ]
+
+
+def measure(func, replica, term, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(replica, term)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[max(int(len(timings) * 0.95) - 1, 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--path", default="bench_replica.sqlite3")
+    parser.add_argument("--drop", action="store_true", help="delete the scratch file")
+    args = parser.parse_args()
+
+    replica = Replica(args.path)
+    print(f"{'rows':>9}  {'search':<14}{'mode':<10}{'median ms':>12}{'p95 ms':>12}")
+    for size in sorted(args.sizes):
+        grow(replica, size)
+        for name, term in terms_for(size):
+            for mode, func in (("like", like_search), ("fulltext", fulltext_search)):
+                func(replica, term)
+                median, p95 = measure(func, replica, term, args.iterations)
+                print(f"{size:>9}  {name:<14}{mode:<10}{median:>12.2f}{p95:>12.2f}")
+    replica.close()
+
+    if args.drop:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+
+
+if __name__ == "__main__":
+    main()
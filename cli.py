@@ -1,32 +1,49 @@
+"""Add words to the vocabulary from the command line.
+
+Interactive (one word at a time):
+
+    python cli.py
+
+Bulk (stream words from a file, one per line, or '-' for stdin):
+
+    python cli.py words.txt --concurrency 4 --rate 5 --report report.jsonl
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import mysql.connector
-import requests
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+import db
+import dictionary
+from importer import MEANING_MAX_BYTES, WORD_MAX_LENGTH
+
+PROGRESS_EVERY = 100
 
-DB_CONFIG = {
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "database": os.environ["DB_NAME"],
-}
 
-DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+class LookupFailed(Exception):
+    """The dictionary couldn't be reached or didn't answer; worth retrying."""
 
 
 def fetch_meaning(word):
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    return data[0]["meanings"][0]["definitions"][0]["definition"]
+    """Return the dictionary meaning of ``word``, or None if it has none.
+
+    Raises LookupFailed when the dictionary didn't answer (network error, rate
+    limiting, ...): only a real "not found" is cached, so that tells them apart.
+    """
+    entry = dictionary.lookup(word)
+    if entry is None and not dictionary.get_client().cache.contains_fresh(word):
+        raise LookupFailed(f"could not reach the dictionary for '{word}'")
+    return entry.meaning if entry else None
 
 
 def add_word():
     meaning = ''
-    
+
     word = input("Enter word >_")
 
     if not word:
@@ -34,22 +51,253 @@ def add_word():
         return
 
     if not meaning:
-        meaning = fetch_meaning(word)
+        try:
+            meaning = fetch_meaning(word)
+        except LookupFailed:
+            print("Fetch Error - Could not reach the dictionary, try again later")
+            return
 
     if not meaning:
         print("Fetch Error - Could not fetch meaning from the dictionary")
         return
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s)", (word, meaning)
-    )
-    conn.commit()
-    conn.close()
-    
+    with db.transaction() as cursor:
+        cursor.execute(
+            "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s)", (word, meaning)
+        )
+
     print(meaning)
 
-while True:
-    add_word()
 
+class RateLimiter:
+    """Token bucket allowing ``rate`` calls per second across threads."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class Report:
+    """JSONL progress/failure log with running throughput.
+
+    Outcomes are ``added``, ``skipped`` (already in the vocabulary),
+    ``not_found`` (the dictionary has no meaning) and ``failed`` (the lookup
+    didn't get an answer, or the row couldn't be inserted; see ``reason``).
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.started = time.monotonic()
+        self.counts = {
+            "processed": 0,
+            "added": 0,
+            "skipped": 0,
+            "not_found": 0,
+            "failed": 0,
+        }
+
+    def event(self, event, **fields):
+        self.stream.write(json.dumps({"event": event, **fields}) + "\n")
+
+    def record(self, outcome, word, reason=None):
+        self.event(outcome, word=word, reason=reason)
+        self._count(outcome, 1)
+
+    def record_batch(self, rows, inserted):
+        """Count a committed batch: rows not inserted were added concurrently."""
+        self.event("batch", rows=rows, inserted=inserted)
+        self._count("added", inserted)
+        self._count("skipped", rows - inserted)
+
+    def _count(self, outcome, n):
+        before = self.counts["processed"]
+        self.counts["processed"] += n
+        self.counts[outcome] += n
+        if self.counts["processed"] // PROGRESS_EVERY > before // PROGRESS_EVERY:
+            self.progress()
+
+    def progress(self, event="progress"):
+        elapsed = time.monotonic() - self.started
+        rate = self.counts["processed"] / elapsed if elapsed else 0.0
+        self.event(
+            event,
+            **self.counts,
+            elapsed_sec=round(elapsed, 3),
+            words_per_sec=round(rate, 2),
+        )
+        self.stream.flush()
+
+
+def read_words(stream):
+    """Yield the non-blank, non-comment lines of ``stream``."""
+    for line in stream:
+        word = line.strip()
+        if word and not word.startswith("#"):
+            yield word
+
+
+def load_existing_words():
+    """Return the (case-folded) set of words already in the vocabulary."""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT word FROM vocabulary")
+        return {word.casefold() for (word,) in cursor}
+
+
+def too_long(word, meaning=""):
+    """Return why (word, meaning) doesn't fit the vocabulary table, or None."""
+    if len(word) > WORD_MAX_LENGTH:
+        return f"word longer than {WORD_MAX_LENGTH} characters"
+    if len(meaning.encode("utf-8")) > MEANING_MAX_BYTES:
+        return f"meaning longer than {MEANING_MAX_BYTES} bytes"
+    return None
+
+
+def flush_batch(batch, report):
+    """Insert a batch of (word, meaning) rows in one transaction.
+
+    If the database rejects the batch, its rows are reported as failed and
+    the run goes on with the next one.
+    """
+    if not batch:
+        return
+    try:
+        with db.transaction() as cursor:
+            # A word added concurrently by someone else is skipped rather than
+            # failing the whole batch; unlike INSERT IGNORE, other errors (data
+            # too long, ...) still raise instead of being truncated.
+            cursor.executemany(
+                "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE id = id",
+                batch,
+            )
+            inserted = cursor.rowcount
+    except mysql.connector.Error as e:
+        for word, _ in batch:
+            report.record("failed", word, reason=f"insert failed: {e}")
+    else:
+        report.record_batch(len(batch), inserted)
+    batch.clear()
+
+
+def bulk_add(words, report, concurrency=4, rate=5.0, batch_size=500):
+    """Resolve meanings for ``words`` concurrently and insert them in batches."""
+    existing = load_existing_words()
+    queued = set()
+    limiter = RateLimiter(rate, burst=concurrency)
+    batch = []
+
+    def resolve(word):
+        # Cached words don't reach the dictionary API, so they aren't throttled.
+        if not dictionary.get_client().cache.contains_fresh(word):
+            limiter.acquire()
+        return fetch_meaning(word)
+
+    def collect(done):
+        for future in done:
+            word = in_flight.pop(future)
+            try:
+                meaning = future.result()
+            except Exception as e:
+                report.record("failed", word, reason=str(e))
+                continue
+            if not meaning:
+                report.record("not_found", word, reason="no meaning found")
+                continue
+            reason = too_long(word, meaning)
+            if reason:
+                report.record("failed", word, reason=reason)
+                continue
+            # Counted as added (or skipped) once its batch is committed.
+            batch.append((word, meaning))
+            if len(batch) >= batch_size:
+                flush_batch(batch, report)
+
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for word in words:
+            key = word.casefold()
+            if key in existing:
+                report.record("skipped", word, reason="already in vocabulary")
+                continue
+            if key in queued:
+                report.record("skipped", word, reason="duplicate in input")
+                continue
+            reason = too_long(word)
+            if reason:
+                report.record("failed", word, reason=reason)
+                continue
+            queued.add(key)
+
+            # Keep a bounded number of lookups queued so huge inputs stream.
+            while len(in_flight) >= concurrency * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight[executor.submit(resolve, word)] = word
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    flush_batch(batch, report)
+    report.progress("summary")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add words to the vocabulary.")
+    parser.add_argument(
+        "file",
+        nargs="?",
+        help="bulk mode: file with one word per line ('-' for stdin)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="parallel dictionary lookups"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=5.0, help="max lookups per second (0 = no limit)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="rows per insert transaction"
+    )
+    parser.add_argument(
+        "--report", default="-", help="JSONL report file ('-' for stdout)"
+    )
+    args = parser.parse_args()
+
+    if args.file is None:
+        while True:
+            add_word()
+
+    source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    sink = sys.stdout if args.report == "-" else open(args.report, "w", encoding="utf-8")
+    with source, sink:
+        bulk_add(
+            read_words(source),
+            Report(sink),
+            concurrency=args.concurrency,
+            rate=args.rate,
+            batch_size=args.batch_size,
+        )
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
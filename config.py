@@ -0,0 +1,66 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONFIG = {
+    "user": os.environ["DB_USER"],
+    "password": os.environ["DB_PASS"],
+    "host": os.environ["DB_HOST"],
+    "database": os.environ["DB_NAME"],
+}
+
+# Connection pool tuning (see db.py)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+DB_POOL_PING_INTERVAL = float(os.environ.get("DB_POOL_PING_INTERVAL", "30"))
+
+# Per-user application data (dictionary cache, activation token, ...)
+APP_DATA_DIR = os.environ.get("VOCAB_DATA_DIR") or os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "vocab-manager"
+)
+
+# Folder the export and import dialogs open in
+EXPORT_DIR = os.environ.get("EXPORT_DIR") or os.getcwd()
+
+# Where a newer window icon may be fetched from in the background (see
+# assets.py); set to an empty string to only use the bundled icon
+ICON_URL = os.environ.get(
+    "ICON_URL", "https://cdn.cloudservetechcentral.com/vocab-manager/32x32.ico"
+)
+
+DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+
+# Dictionary cache (see dictcache.py); TTLs are in seconds
+DICTIONARY_CACHE_PATH = os.environ.get(
+    "DICTIONARY_CACHE_PATH", os.path.join(APP_DATA_DIR, "dictionary.sqlite3")
+)
+DICTIONARY_CACHE_TTL = float(os.environ.get("DICTIONARY_CACHE_TTL", 30 * 86400))
+DICTIONARY_CACHE_NEGATIVE_TTL = float(
+    os.environ.get("DICTIONARY_CACHE_NEGATIVE_TTL", 86400)
+)
+DICTIONARY_CACHE_MAX_ENTRIES = int(
+    os.environ.get("DICTIONARY_CACHE_MAX_ENTRIES", "50000")
+)
+# Concurrent idle-time lookups of the words on screen (see prefetch.py); 0
+# turns prefetching off
+DICTIONARY_PREFETCH_WORKERS = int(os.environ.get("DICTIONARY_PREFETCH_WORKERS", "2"))
+
+# Offline activation token (see licensing.py); times are in seconds. The token
+# is signed with ACTIVATION_TOKEN_SECRET, or the database password if unset.
+ACTIVATION_TOKEN_PATH = os.environ.get(
+    "ACTIVATION_TOKEN_PATH", os.path.join(APP_DATA_DIR, "activation.json")
+)
+ACTIVATION_TOKEN_SECRET = os.environ.get("ACTIVATION_TOKEN_SECRET") or DB_CONFIG[
+    "password"
+]
+LICENSE_REVALIDATE_INTERVAL = float(
+    os.environ.get("LICENSE_REVALIDATE_INTERVAL", 6 * 3600)
+)
+LICENSE_OFFLINE_GRACE = float(os.environ.get("LICENSE_OFFLINE_GRACE", 14 * 86400))
+
+# Local replica of the vocabulary (see replica.py); the interval is in seconds
+REPLICA_PATH = os.environ.get(
+    "REPLICA_PATH", os.path.join(APP_DATA_DIR, "replica.sqlite3")
+)
+REPLICA_PULL_INTERVAL = float(os.environ.get("REPLICA_PULL_INTERVAL", 30))
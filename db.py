@@ -0,0 +1,218 @@
+"""Shared MySQL access layer.
+
+Every entry point (main.py and the helper scripts) goes through the bounded
+connection pool in this module instead of calling mysql.connector.connect per
+statement, so the TCP handshake and authentication are paid once per pooled
+connection rather than once per click.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errorcode
+from mysql.connector.errors import PoolError
+
+from config import DB_CONFIG, DB_POOL_PING_INTERVAL, DB_POOL_SIZE, DB_POOL_TIMEOUT
+
+# Client errors meaning the server couldn't be reached or the link dropped
+CONNECTION_ERRORS = {
+    errorcode.CR_CONNECTION_ERROR,
+    errorcode.CR_CONN_HOST_ERROR,
+    errorcode.CR_UNKNOWN_HOST,
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+}
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of MySQL connections.
+
+    Idle connections are reused most-recently-used first. A connection that has
+    been idle for longer than ``ping_interval`` seconds is health-checked with a
+    ping (reconnecting if the server dropped it) before it is handed out, so
+    recently used connections skip the extra round trip.
+    """
+
+    def __init__(
+        self,
+        config,
+        size=DB_POOL_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        ping_interval=DB_POOL_PING_INTERVAL,
+    ):
+        self.config = dict(config)
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Check out a healthy connection, blocking while the pool is exhausted."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(
+                f"No database connection available within {self.timeout} seconds."
+            )
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    # Autocommit keeps plain reads from holding a transaction
+                    # open; transaction() starts one explicitly when needed.
+                    return mysql.connector.connect(autocommit=True, **self.config)
+
+                if time.monotonic() - last_used < self.ping_interval:
+                    return conn
+                try:
+                    conn.ping(reconnect=True, attempts=1)
+                    return conn
+                except mysql.connector.Error:
+                    _close_quietly(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if it is unusable."""
+        try:
+            if not discard:
+                try:
+                    # Never leak an open transaction (or its stale snapshot)
+                    # to the next borrower.
+                    if conn.in_transaction:
+                        conn.rollback()
+                except mysql.connector.Error:
+                    discard = True
+            if discard:
+                _close_quietly(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection held by the pool."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(conn)
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except mysql.connector.Error:
+        pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(config=None):
+    """Return the shared pool for ``config`` (defaults to DB_CONFIG)."""
+    config = DB_CONFIG if config is None else config
+    key = tuple(sorted(config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(config)
+        return pool
+
+
+@contextmanager
+def connection(config=None):
+    """Borrow a pooled connection for the duration of a ``with`` block."""
+    pool = get_pool(config)
+    conn = pool.acquire()
+    discard = False
+    try:
+        yield conn
+    except mysql.connector.errors.OperationalError:
+        # The link itself is broken; don't put it back in the pool.
+        discard = True
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+
+
+@contextmanager
+def cursor(config=None):
+    """Yield a cursor on a pooled autocommit connection for read-only work."""
+    with connection(config) as conn:
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+
+@contextmanager
+def transaction(config=None):
+    """Yield a cursor inside a transaction that commits on success.
+
+    Any exception rolls the transaction back before it propagates.
+    """
+    with connection(config) as conn:
+        conn.start_transaction()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except mysql.connector.Error:
+                pass
+            raise
+        finally:
+            cursor.close()
+
+
+def stream(query, params=(), chunk_size=1000, config=None):
+    """Yield the rows of ``query`` without buffering the whole result.
+
+    Rows are read from the server ``chunk_size`` at a time through an
+    unbuffered cursor, so memory stays flat however large the result is. The
+    connection is held until the generator is exhausted or closed.
+    """
+    pool = get_pool(config)
+    conn = pool.acquire()
+    finished = False
+    try:
+        cur = conn.cursor(buffered=False)
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+        cur.close()
+        finished = True
+    finally:
+        # A result abandoned half-read would poison the connection for the
+        # next borrower, so close it instead of returning it to the pool.
+        pool.release(conn, discard=not finished)
+
+
+def is_connection_error(error):
+    """Return True if ``error`` means MySQL is unreachable, rather than that
+    a statement failed (which retrying later won't fix)."""
+    return (
+        isinstance(error, mysql.connector.InterfaceError)
+        or getattr(error, "errno", None) in CONNECTION_ERRORS
+    )
+
+
+def close_all():
+    """Close the idle connections of every pool (e.g. on application exit)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,279 @@
+"""Find and merge near-duplicate words ("Apple", "apple ", "apples").
+
+purge.py only removes words that are equal under the column collation. Here
+every word is reduced to a normalized key (NFKC, case-folded, whitespace
+collapsed) and rows sharing a key form a cluster. A plural-looking key joins
+the cluster of its singular form only when that form is itself a word in the
+table ("apples" with "apple"), so "does" or "hers" aren't merged with words
+that don't exist. Merging keeps the oldest row of each cluster, gives it the
+longest meaning in the cluster and deletes the rest.
+
+The table is streamed twice in id order and only fixed-size digests of each
+distinct key and its singular forms are held in memory, so the run is linear
+in the number of rows and its memory is bounded by the number of distinct
+keys.
+
+Usage:
+
+    python dedupe.py                  # report clusters as JSON lines
+    python dedupe.py --merge          # report them, then merge if confirmed
+    python dedupe.py --merge --yes
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import unicodedata
+
+import db
+
+DEDUPE_CHUNK_SIZE = 5000
+MERGE_BATCH_SIZE = 1000
+
+# Endings turned back into the singular, longest first: (suffix, replacement).
+# Each matching ending gives a candidate ("movies" -> "movy", "movie").
+_PLURAL_ENDINGS = (
+    ("sses", "ss"),
+    ("ches", "ch"),
+    ("shes", "sh"),
+    ("ies", "y"),
+    ("xes", "x"),
+    ("zes", "z"),
+    ("s", ""),
+)
+# Words ending like this are not plurals ("glass", "status", "analysis")
+_SINGULAR_ENDINGS = ("ss", "us", "is")
+# Words that look like plurals but aren't the plural of the shorter word
+# ("news" isn't more than one "new")
+_NOT_PLURALS = frozenset(
+    "alias always atlas athletics bias bus canvas clothes does economics ethics "
+    "gas goods hers lens mathematics means news ours perhaps physics politics "
+    "series species thanks theirs this thus whereas yes yours".split()
+)
+_MIN_STEM = 3
+
+
+def _singulars(token):
+    if token in _NOT_PLURALS or token.endswith(_SINGULAR_ENDINGS):
+        return []
+    stems = []
+    for suffix, replacement in _PLURAL_ENDINGS:
+        if not token.endswith(suffix):
+            continue
+        stem = token[: -len(suffix)] + replacement
+        if len(stem) >= _MIN_STEM and stem not in stems:
+            stems.append(stem)
+    return stems
+
+
+def normalize(word):
+    """Return the key equal spellings of ``word`` share."""
+    text = unicodedata.normalize("NFKC", word)
+    text = unicodedata.normalize("NFKC", text.casefold())
+    return " ".join(text.split())
+
+
+def singular_forms(key):
+    """Return the keys ``key`` may be the plural of, most likely first.
+
+    Only the last word of a phrase is made singular ("ice creams").
+    """
+    head, _, last = key.rpartition(" ")
+    prefix = head + " " if head else ""
+    return [prefix + stem for stem in _singulars(last)]
+
+
+def digest(key):
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+
+
+# Per-key state kept by the first pass
+_COUNT, _KEEP, _BEST, _BEST_LENGTH, _FORMS, _ROOT = range(6)
+
+
+def _fold_plurals(keys):
+    """Merge the state of each key into that of its singular form, if present.
+
+    A folded key keeps its state, with ``root`` set to the digest of the key
+    whose state now holds the whole cluster.
+    """
+    parents = {}
+    for key, state in keys.items():
+        parent = next((form for form in state[_FORMS] if form in keys), None)
+        if parent is not None:
+            parents[key] = parent
+    for key in parents:
+        # Singular forms are shorter, so following parents always ends.
+        root = parents[key]
+        while root in parents:
+            root = parents[root]
+        state, cluster = keys[key], keys[root]
+        state[_ROOT] = root
+        cluster[_COUNT] += state[_COUNT]
+        cluster[_KEEP] = min(cluster[_KEEP], state[_KEEP])
+        if state[_BEST_LENGTH] > cluster[_BEST_LENGTH]:
+            cluster[_BEST] = state[_BEST]
+            cluster[_BEST_LENGTH] = state[_BEST_LENGTH]
+
+
+def _cluster(keys, word):
+    """Return (key digest, state) of the cluster ``word`` belongs to."""
+    key = digest(normalize(word))
+    state = keys.get(key)
+    if state is not None and state[_ROOT] is not None:
+        key = state[_ROOT]
+        state = keys[key]
+    return key, state
+
+
+def clusters(keys):
+    """Yield the state of each cluster of more than one row."""
+    for state in keys.values():
+        if state[_COUNT] > 1 and state[_ROOT] is None:
+            yield state
+
+
+def find_clusters(config=None):
+    """First pass: map each key digest to [count, keep id, best id, best length,
+    singular form digests, root digest], then fold plurals into their singular.
+
+    ``keep id`` is the oldest row, ``best id`` the row with the longest meaning.
+    """
+    keys = {}
+    rows = db.stream(
+        "SELECT id, word, CHAR_LENGTH(TRIM(meaning)) FROM vocabulary ORDER BY id",
+        chunk_size=DEDUPE_CHUNK_SIZE,
+        config=config,
+    )
+    for row_id, word, length in rows:
+        key = normalize(word)
+        state = keys.get(digest(key))
+        if state is None:
+            forms = tuple(digest(form) for form in singular_forms(key))
+            keys[digest(key)] = [1, row_id, row_id, length or 0, forms, None]
+            continue
+        state[_COUNT] += 1
+        if (length or 0) > state[_BEST_LENGTH]:
+            state[_BEST] = row_id
+            state[_BEST_LENGTH] = length
+    _fold_plurals(keys)
+    return keys
+
+
+def duplicates(keys, config=None):
+    """Second pass: yield (keep id, kept word, id, word) for each row to drop."""
+    kept_words = {}
+    rows = db.stream(
+        "SELECT id, word FROM vocabulary ORDER BY id",
+        chunk_size=DEDUPE_CHUNK_SIZE,
+        config=config,
+    )
+    for row_id, word in rows:
+        key, state = _cluster(keys, word)
+        if state is None or state[_COUNT] < 2:
+            continue
+        keep = state[_KEEP]
+        if row_id == keep:
+            # Rows arrive in id order, so the kept row comes first.
+            kept_words[key] = word
+        else:
+            yield keep, kept_words.get(key), row_id, word
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def merge_meanings(keys, batch_size=MERGE_BATCH_SIZE, config=None):
+    """Copy the best meaning of each cluster onto its kept row."""
+    moves = (
+        (state[_BEST], state[_KEEP])
+        for state in clusters(keys)
+        if state[_BEST] != state[_KEEP]
+    )
+    moved = 0
+    for batch in _batches(moves, batch_size):
+        with db.transaction(config) as cursor:
+            cursor.executemany(
+                "UPDATE vocabulary k JOIN vocabulary b ON b.id = %s "
+                "SET k.meaning = b.meaning WHERE k.id = %s",
+                batch,
+            )
+        moved += len(batch)
+    return moved
+
+
+def delete_rows(ids, batch_size=MERGE_BATCH_SIZE, config=None):
+    deleted = 0
+    for batch in _batches(ids, batch_size):
+        placeholders = ", ".join(["%s"] * len(batch))
+        with db.transaction(config) as cursor:
+            cursor.execute(
+                f"DELETE FROM vocabulary WHERE id IN ({placeholders})", batch
+            )
+            deleted += cursor.rowcount
+    return deleted
+
+
+def report(keys, out, config=None):
+    count = 0
+    for count, (keep, kept_word, row_id, word) in enumerate(
+        duplicates(keys, config), 1
+    ):
+        line = {"keep": keep, "kept_word": kept_word, "id": row_id, "word": word}
+        out.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return count
+
+
+def merge(keys, batch_size=MERGE_BATCH_SIZE, config=None):
+    """Merge every cluster; returns (meanings moved, rows deleted)."""
+    # Meanings first: a best meaning may live on a row about to be deleted.
+    moved = merge_meanings(keys, batch_size, config)
+    ids = (row_id for _, _, row_id, _ in duplicates(keys, config))
+    return moved, delete_rows(ids, batch_size, config)
+
+
+def confirm(prompt):
+    """Ask on stderr; anything but yes (or no answer at all) means no."""
+    print(prompt, end="", file=sys.stderr, flush=True)
+    return sys.stdin.readline().strip().lower() in ("y", "yes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and merge near-duplicate words.")
+    parser.add_argument(
+        "--merge", action="store_true", help="merge clusters instead of reporting"
+    )
+    parser.add_argument(
+        "--yes", action="store_true", help="merge without asking for confirmation"
+    )
+    parser.add_argument("--batch-size", type=int, default=MERGE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    keys = find_clusters()
+    found = sum(1 for _ in clusters(keys))
+    print(f"{len(keys)} distinct key(s), {found} cluster(s).", file=sys.stderr)
+    rows = report(keys, sys.stdout)
+    print(f"{rows} row(s) would be merged.", file=sys.stderr)
+    if args.merge and rows:
+        if args.yes or confirm(f"Delete these {rows} row(s)? [y/N] "):
+            moved, deleted = merge(keys, args.batch_size)
+            print(
+                f"Merged {found} cluster(s): {deleted} row(s) deleted, "
+                f"{moved} meaning(s) moved."
+            )
+        else:
+            print("Nothing merged.", file=sys.stderr)
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Persistent local cache for dictionary API lookups.
+
+Entries are stored in a small SQLite database under the user profile, keyed by
+the normalized word. Each entry expires after a TTL, the cache is capped at a
+maximum number of entries (least recently used entries are evicted first) and
+404 responses are cached too, so a misspelled word doesn't go back to the
+network on every click. Expired entries stay until they are evicted, and
+get_stale() still returns them for when a fresh copy can't be fetched.
+Fetching is done by dictionary.py.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import (
+    DICTIONARY_CACHE_MAX_ENTRIES,
+    DICTIONARY_CACHE_NEGATIVE_TTL,
+    DICTIONARY_CACHE_PATH,
+    DICTIONARY_CACHE_TTL,
+)
+
+# Returned by DictionaryCache.get when there is no fresh entry for a word.
+MISS = object()
+
+
+def normalize_word(word):
+    """Return the cache key for a word."""
+    return " ".join(word.split()).lower()
+
+
+class DictionaryCache:
+    """SQLite-backed word -> API payload cache with TTL and LRU eviction."""
+
+    def __init__(
+        self,
+        path=DICTIONARY_CACHE_PATH,
+        ttl=DICTIONARY_CACHE_TTL,
+        negative_ttl=DICTIONARY_CACHE_NEGATIVE_TTL,
+        max_entries=DICTIONARY_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                word TEXT PRIMARY KEY,
+                payload TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, word):
+        """Return the cached payload for ``word``, ``None`` for a cached 404,
+        or ``MISS`` when there is no fresh entry."""
+        return self._get(word, stale=False)
+
+    def get_stale(self, word):
+        """Like get(), but also return an expired entry; ``MISS`` only when
+        there is no entry at all."""
+        return self._get(word, stale=True)
+
+    def _get(self, word, stale):
+        key = normalize_word(word)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, fetched_at FROM entries WHERE word = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISS
+
+            payload, fetched_at = row
+            ttl = self.ttl if payload is not None else self.negative_ttl
+            if now - fetched_at > ttl and not stale:
+                return MISS
+
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE word = ?", (now, key)
+            )
+            self._conn.commit()
+        return None if payload is None else json.loads(payload)
+
+    def put(self, word, payload):
+        """Store a payload for ``word``; ``None`` records a negative entry."""
+        key = normalize_word(word)
+        now = time.time()
+        text = None if payload is None else json.dumps(payload, separators=(",", ":"))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO entries (word, payload, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE entries SET payload = ?, fetched_at = ?, accessed_at = ? "
+                    "WHERE word = ?",
+                    (text, now, now, key),
+                )
+            self._evict()
+            self._conn.commit()
+
+    def contains_fresh(self, word):
+        """Return True if ``word`` has an unexpired entry (positive or negative)."""
+        return self.get(word) is not MISS
+
+    def _evict(self):
+        # Evict in batches of ~10% so a full cache doesn't pay for a DELETE on
+        # every single insert.
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - int(self.max_entries * 0.9)
+        cursor = self._conn.execute(
+            "DELETE FROM entries WHERE word IN "
+            "(SELECT word FROM entries ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        )
+        self._count -= cursor.rowcount
+
+    def stats(self):
+        """Return (entries, negative entries) currently stored."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(payload) FROM entries"
+            ).fetchone()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide dictionary cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DictionaryCache()
+        return _cache
@@ -0,0 +1,238 @@
+"""Dictionary API client.
+
+Each word is fetched at most once (over a keep-alive session, through the
+on-disk cache in dictcache.py) and parsed once into a compact DictionaryEntry
+that the add, definitions and details views all read from.
+
+Usage (prefetch a word list so the app can later run offline):
+
+    python dictionary.py warm words.txt
+    python dictionary.py stats
+"""
+
+import argparse
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import DICTIONARY_API_URL, DICTIONARY_CACHE_PATH
+from dictcache import MISS, get_cache, normalize_word
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (3.05, 10)
+
+# Parsed entries kept in memory on top of the on-disk cache
+MEMORY_CACHE_SIZE = 512
+
+
+class Definition:
+    """A single definition of a word."""
+
+    __slots__ = ("part_of_speech", "text", "example")
+
+    def __init__(self, part_of_speech, text, example):
+        self.part_of_speech = part_of_speech
+        self.text = text
+        self.example = example
+
+
+class DictionaryEntry:
+    """The parsed dictionary API entry for a word."""
+
+    __slots__ = ("word", "phonetic", "origin", "meanings", "definitions")
+
+    def __init__(self, word, phonetic, origin, meanings):
+        self.word = word
+        self.phonetic = phonetic
+        self.origin = origin
+        # Tuple of (part_of_speech, tuple of Definition) in API order
+        self.meanings = meanings
+        self.definitions = tuple(
+            definition for _, definitions in meanings for definition in definitions
+        )
+
+    @classmethod
+    def from_json(cls, data):
+        """Build an entry from the first element of the API response."""
+        meanings = []
+        for meaning in data.get("meanings", ()):
+            part_of_speech = meaning.get("partOfSpeech", "Unknown")
+            definitions = tuple(
+                Definition(
+                    part_of_speech, definition["definition"], definition.get("example")
+                )
+                for definition in meaning.get("definitions", ())
+            )
+            meanings.append((part_of_speech, definitions))
+
+        phonetic = data.get("phonetic")
+        if not phonetic:
+            phonetic = next(
+                (p["text"] for p in data.get("phonetics", ()) if p.get("text")), None
+            )
+        return cls(data.get("word", ""), phonetic, data.get("origin"), tuple(meanings))
+
+    @property
+    def meaning(self):
+        """The first definition, used as the default meaning when adding a word."""
+        return self.definitions[0].text if self.definitions else None
+
+    def details_text(self):
+        """Render the entry as the multi-line text shown in the details panel."""
+        parts = [
+            f"Word: {self.word}\n\n"
+            f"Phonetic: {self.phonetic or 'N/A'}\n\n"
+            f"Origin: {self.origin or 'N/A'}\n\n"
+            "Meanings:\n"
+        ]
+        for part_of_speech, definitions in self.meanings:
+            parts.append(f"\nPart of Speech: {part_of_speech}\n")
+            for definition in definitions:
+                parts.append(f" - {definition.text}\n")
+                if definition.example:
+                    parts.append(f"   Example: {definition.example}\n")
+        return "".join(parts)
+
+
+class DictionaryClient:
+    """Fetches and parses dictionary entries, one round trip per word at most."""
+
+    def __init__(self, cache=None, pool_size=8):
+        self._cache = cache
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_cache()
+        return self._cache
+
+    def lookup(self, word, timeout=REQUEST_TIMEOUT):
+        """Return the DictionaryEntry for ``word``, or None if it isn't found.
+
+        When the entry has to be fetched and that fails (network error, rate
+        limiting), an expired cache entry is returned if there is one, and
+        None otherwise; unlike a 404, the failure is not cached.
+        """
+        key = normalize_word(word)
+        with self._memory_lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        data = self.cache.get(key)
+        if data is MISS:
+            try:
+                data = self._fetch(key, timeout)
+            except requests.RequestException:
+                data = MISS
+            if data is MISS:
+                # Serve the expired copy, if any, without remembering it, so
+                # the next lookup tries the network again.
+                data = self.cache.get_stale(key)
+                if data is MISS or data is None:
+                    return None
+                return DictionaryEntry.from_json(data)
+            self.cache.put(key, data)
+
+        entry = None if data is None else DictionaryEntry.from_json(data)
+        self._remember(key, entry)
+        return entry
+
+    def _fetch(self, key, timeout):
+        response = self._session.get(f"{DICTIONARY_API_URL}{key}", timeout=timeout)
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            # Rate limiting and server errors are transient; don't cache them.
+            return MISS
+        return response.json()[0]
+
+    def _remember(self, key, entry):
+        with self._memory_lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            if len(self._memory) > MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+    def forget(self, word):
+        """Drop ``word`` from the in-memory layer (the disk cache keeps its TTL)."""
+        with self._memory_lock:
+            self._memory.pop(normalize_word(word), None)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide dictionary client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DictionaryClient()
+        return _client
+
+
+def lookup(word, timeout=REQUEST_TIMEOUT):
+    """Look up ``word`` with the shared client."""
+    return get_client().lookup(word, timeout=timeout)
+
+
+def warm(words, workers=4):
+    """Prefetch ``words`` into the cache, skipping ones that are already fresh."""
+    cache = get_client().cache
+    unique = list(dict.fromkeys(normalize_word(word) for word in words))
+    pending = [word for word in unique if not cache.contains_fresh(word)]
+
+    found = missing = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for word, entry in zip(pending, executor.map(lookup, pending)):
+            # A lookup that left no fresh entry got no answer from the API
+            # (offline, timeout, rate limited); running warm again retries it.
+            if not cache.contains_fresh(word):
+                failed += 1
+                print(f"failed: {word}", file=sys.stderr)
+            elif entry is None:
+                missing += 1
+                print(f"not found: {word}", file=sys.stderr)
+            else:
+                found += 1
+
+    print(
+        f"Cached {found} new word(s), {missing} not found, {failed} failed, "
+        f"{len(unique) - len(pending)} already cached."
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local dictionary cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = subparsers.add_parser("warm", help="prefetch a word list")
+    warm_parser.add_argument("file", help="file with one word per line ('-' for stdin)")
+    warm_parser.add_argument("--workers", type=int, default=4)
+
+    subparsers.add_parser("stats", help="show cache statistics")
+
+    args = parser.parse_args()
+    if args.command == "warm":
+        stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with stream:
+            words = [line.strip() for line in stream if line.strip()]
+        warm(words, workers=args.workers)
+    else:
+        entries, negative = get_cache().stats()
+        print(f"{entries} cached word(s), {negative} negative, at {DICTIONARY_CACHE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,111 @@
-import mysql.connector
+"""Print the vocabulary to stdout.
+
+Rows are streamed from an unbuffered server-side cursor and written as they
+arrive, so output starts at once and memory stays flat however large the
+table is. Filtering and limits run in SQL, and piping into head or grep
+stops the query cleanly when the reader goes away.
+
+Usage:
+
+    python display.py
+    python display.py --format csv --columns word,meaning > vocabulary.csv
+    python display.py --prefix un --limit 20
+    python display.py --format jsonl --columns id,word | grep ...
+"""
+
+import argparse
+import csv
+import json
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-DB_CONFIG = {
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "database": os.environ["DB_NAME"],
-}
-
-def get_all_words():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT word FROM vocabulary")
-    words = cursor.fetchall()
-    conn.close()
-    return [word[0] for word in words]
-
-def print_words():
-    words = get_all_words()
-    print(", ".join(words))
-
-print_words()
+import sys
+from contextlib import closing
+
+import db
+from vocabulary import escape_like
+
+COLUMNS = ("id", "word", "meaning")
+DISPLAY_CHUNK_SIZE = 1000
+
+
+def _columns(text):
+    columns = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown or not columns:
+        raise argparse.ArgumentTypeError(
+            f"expected a comma-separated list of {', '.join(COLUMNS)}"
+        )
+    return columns
+
+
+def query_words(columns=("word",), prefix=None, limit=None, config=None):
+    """Stream the selected columns, optionally only words starting ``prefix``.
+
+    Rows come in id order, or in word order when filtering by prefix so the
+    UNIQUE(word) index serves both the filter and the order.
+    """
+    query = f"SELECT {', '.join(columns)} FROM vocabulary"
+    params = []
+    if prefix:
+        query += " WHERE word LIKE %s ORDER BY word"
+        params.append(escape_like(prefix) + "%")
+    else:
+        query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+    return db.stream(query, params, DISPLAY_CHUNK_SIZE, config)
+
+
+def write_plain(rows, out, columns):
+    for row in rows:
+        out.write("\t".join(str(value) for value in row) + "\n")
+
+
+def write_csv(rows, out, columns):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(columns)
+    writer.writerows(rows)
+
+
+def write_jsonl(rows, out, columns):
+    for row in rows:
+        out.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+
+
+FORMATS = {"plain": write_plain, "csv": write_csv, "jsonl": write_jsonl}
+
+
+def print_words(fmt="plain", columns=("word",), prefix=None, limit=None, out=None):
+    out = out or sys.stdout
+    with closing(query_words(columns, prefix, limit)) as rows:
+        FORMATS[fmt](rows, out, columns)
+        out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the vocabulary.")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="plain")
+    parser.add_argument(
+        "--columns",
+        type=_columns,
+        default=["word"],
+        help=f"comma-separated, from {', '.join(COLUMNS)} (default: word)",
+    )
+    parser.add_argument("--prefix", help="only words starting with this")
+    parser.add_argument("--limit", type=int, help="print at most this many rows")
+    args = parser.parse_args()
+
+    try:
+        print_words(args.format, args.columns, args.prefix, args.limit)
+    except BrokenPipeError:
+        # The reader (head, grep -m) has gone. Point stdout at devnull so
+        # the interpreter's final flush doesn't raise again, and exit quietly.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""Vocabulary exports.
+
+Every format is a streaming sink registered in FORMATS: a ``write(rows,
+stream)`` function that consumes (word, meaning) rows as they arrive and
+returns how many it wrote. From the command line they are fed by
+vocabulary_rows(), which reads the table in id ranges over several pooled
+connections at once, and in the GUI by the local replica (see replica.py), so
+neither the rows nor the finished document are ever held in memory and a
+large export isn't bound by one query. The GUI runs exports as a
+tasks.BackgroundTask so the window stays responsive and can show progress
+and cancel.
+
+Usage (headless):
+
+    python export.py xlsx vocabulary.xlsx
+    python export.py csv vocabulary.csv --workers 4
+"""
+
+import argparse
+import csv
+import html
+import io
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from pdfwriter import MM, PAGE_HEIGHT, PAGE_WIDTH, PdfWriter, text_width, wrap
+from tasks import Cancelled
+
+# Rows read from the server per round trip by the single-query reader
+EXPORT_CHUNK_SIZE = 1000
+# Parallel range reads: connections used (leave some of the pool for the GUI)
+# and ids per range
+EXPORT_WORKERS = 3
+EXPORT_RANGE_SIZE = 5000
+# Rows written between progress reports
+PROGRESS_EVERY = 500
+
+XLSX_SHEET_TITLE = "Vocabulary List"
+XLSX_HEADER = ("Word", "Meaning")
+
+# PDF layout, matching the FPDF defaults the export used before (in points)
+PDF_MARGIN = 10 * MM
+PDF_BOTTOM_MARGIN = 15 * MM
+PDF_CELL_MARGIN = 1 * MM
+PDF_LINE_HEIGHT = 10 * MM
+PDF_ENTRY_GAP = 5 * MM
+
+
+class ExportFormat:
+    """A registered export format."""
+
+    __slots__ = ("key", "label", "extension", "write")
+
+    def __init__(self, key, label, extension, write):
+        self.key = key
+        self.label = label
+        self.extension = extension
+        # write(rows, binary_stream) -> number of rows written
+        self.write = write
+
+
+FORMATS = {}
+
+
+def register_format(key, label, extension):
+    """Decorator registering ``write(rows, stream)`` as an export format."""
+
+    def decorator(write):
+        FORMATS[key] = ExportFormat(key, label, extension, write)
+        return write
+
+    return decorator
+
+
+# db is imported by the functions that read MySQL, so that the writers can be
+# used without database settings (see bench_export.py)
+
+
+def count_rows(config=None):
+    import db
+
+    with db.cursor(config) as cursor:
+        cursor.execute("SELECT COUNT(*) FROM vocabulary")
+        return cursor.fetchone()[0]
+
+
+def _read_range(low, high, config):
+    import db
+
+    with db.cursor(config) as cursor:
+        cursor.execute(
+            "SELECT word, meaning FROM vocabulary "
+            "WHERE id BETWEEN %s AND %s ORDER BY id",
+            (low, high),
+        )
+        return cursor.fetchall()
+
+
+def _parallel_rows(workers, range_size, config):
+    import db
+
+    with db.cursor(config) as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM vocabulary")
+        first, last = cursor.fetchone()
+    if first is None:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+    try:
+        # Keep a bounded number of ranges in flight and hand them out in id
+        # order, so memory is capped at a few ranges however big the table is.
+        pending = deque()
+        for low in range(first, last + 1, range_size):
+            high = min(low + range_size - 1, last)
+            pending.append(executor.submit(_read_range, low, high, config))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def vocabulary_rows(workers=EXPORT_WORKERS, range_size=EXPORT_RANGE_SIZE, config=None):
+    """Yield every (word, meaning) pair in id order.
+
+    With more than one worker the id space is split into ranges read over
+    that many pooled connections in parallel (each range is its own
+    autocommit read, so a concurrent edit may land in one range but not
+    another). One worker streams a single query from an unbuffered cursor.
+    """
+    import db
+
+    if workers > 1:
+        return _parallel_rows(workers, range_size, config)
+    return db.stream(
+        "SELECT word, meaning FROM vocabulary ORDER BY id",
+        chunk_size=EXPORT_CHUNK_SIZE,
+        config=config,
+    )
+
+
+def _tracked(rows, progress, cancelled):
+    """Pass ``rows`` through, reporting progress and honouring cancellation."""
+    for count, row in enumerate(rows, 1):
+        if cancelled is not None and cancelled.is_set():
+            raise Cancelled()
+        yield row
+        if progress is not None and count % PROGRESS_EVERY == 0:
+            progress(count)
+
+
+def write_atomically(path, write):
+    """Call ``write(stream)`` on a temporary file and move it to ``path``.
+
+    A failed or cancelled export leaves no partial file behind.
+    """
+    partial = f"{path}.part"
+    try:
+        with open(partial, "wb") as stream:
+            result = write(stream)
+        os.replace(partial, path)
+        return result
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def export(
+    key,
+    path,
+    progress=None,
+    cancelled=None,
+    workers=EXPORT_WORKERS,
+    config=None,
+    rows=None,
+):
+    """Export the vocabulary as format ``key`` to ``path``; returns the row count.
+
+    ``rows`` are the (word, meaning) pairs to write, if not vocabulary_rows()
+    (e.g. the GUI's local replica).
+    """
+    write = FORMATS[key].write
+    if rows is None:
+        rows = vocabulary_rows(workers, config=config)
+    with closing(rows):
+        return write_atomically(
+            path, lambda stream: write(_tracked(rows, progress, cancelled), stream)
+        )
+
+
+class _PdfLayout:
+    """Flow lines of text down A4 pages, breaking pages like FPDF does."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.y = PDF_MARGIN
+
+    def line(self, text, size=12, style="regular", center=False):
+        if self.y + PDF_LINE_HEIGHT > PAGE_HEIGHT - PDF_BOTTOM_MARGIN:
+            self.writer.new_page()
+            self.y = PDF_MARGIN
+        if center:
+            x = (PAGE_WIDTH - text_width(text, size)) / 2
+        else:
+            x = PDF_MARGIN + PDF_CELL_MARGIN
+        baseline = self.y + PDF_LINE_HEIGHT / 2 + 0.3 * size
+        self.writer.text(x, baseline, text, size, style)
+        self.y += PDF_LINE_HEIGHT
+
+    def paragraph(self, text, size=12):
+        width = PAGE_WIDTH - 2 * (PDF_MARGIN + PDF_CELL_MARGIN)
+        for line in wrap(text, width, size):
+            self.line(line, size)
+
+    def gap(self, height):
+        self.y += height
+
+
+@register_format("pdf", "PDF", ".pdf")
+def write_pdf(rows, stream):
+    """Write the vocabulary list PDF, one page at a time."""
+    writer = PdfWriter(stream)
+    layout = _PdfLayout(writer)
+    layout.line("Vocabulary List", size=14, style="bold", center=True)
+    layout.gap(PDF_LINE_HEIGHT)
+
+    count = 0
+    for count, (word, meaning) in enumerate(rows, 1):
+        layout.line(f"Word: {word}")
+        layout.paragraph(f"Meaning: {meaning}")
+        layout.gap(PDF_ENTRY_GAP)
+
+    writer.close()
+    return count
+
+
+@register_format("xlsx", "XLSX", ".xlsx")
+def write_xlsx(rows, stream):
+    """Write an XLSX workbook.
+
+    The workbook is write-only: openpyxl spools appended rows to disk instead
+    of keeping a cell object per value.
+    """
+    # openpyxl takes a while to import; only pay for it when exporting XLSX
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(XLSX_SHEET_TITLE)
+    sheet.append(XLSX_HEADER)
+    count = 0
+    for count, row in enumerate(rows, 1):
+        sheet.append(row)
+    workbook.save(stream)
+    return count
+
+
+def _text_sink(stream, encoding="utf-8"):
+    return io.TextIOWrapper(stream, encoding=encoding, newline="")
+
+
+@register_format("csv", "CSV", ".csv")
+def write_csv(rows, stream):
+    """Write CSV with a header row (BOM-prefixed UTF-8 so Excel detects it)."""
+    text = _text_sink(stream, "utf-8-sig")
+    writer = csv.writer(text)
+    writer.writerow(XLSX_HEADER)
+    count = 0
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+    text.detach()
+    return count
+
+
+@register_format("jsonl", "JSON Lines", ".jsonl")
+def write_jsonl(rows, stream):
+    """Write one {"word": ..., "meaning": ...} object per line."""
+    text = _text_sink(stream)
+    count = 0
+    for count, (word, meaning) in enumerate(rows, 1):
+        text.write(json.dumps({"word": word, "meaning": meaning}, ensure_ascii=False))
+        text.write("\n")
+    text.detach()
+    return count
+
+
+@register_format("anki", "Anki deck (TSV)", ".txt")
+def write_anki(rows, stream):
+    """Write tab-separated Front/Back notes for Anki's text importer."""
+    text = _text_sink(stream)
+    text.write("#separator:tab\n#html:true\n#columns:Front\tBack\n")
+    count = 0
+    for count, (word, meaning) in enumerate(rows, 1):
+        front, back = (
+            html.escape(field).replace("\t", " ").replace("\n", "<br>")
+            for field in (word, meaning)
+        )
+        text.write(f"{front}\t{back}\n")
+    text.detach()
+    return count
+
+
+def main():
+    import db
+
+    parser = argparse.ArgumentParser(description="Export the vocabulary.")
+    parser.add_argument("format", choices=sorted(FORMATS))
+    parser.add_argument("path", help="output file")
+    parser.add_argument(
+        "--workers", type=int, default=EXPORT_WORKERS, help="parallel range readers"
+    )
+    args = parser.parse_args()
+
+    count = export(
+        args.format,
+        args.path,
+        progress=lambda done: print(f"{done} rows...", file=sys.stderr),
+        workers=args.workers,
+    )
+    print(f"Exported {count} word(s) to {args.path}")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
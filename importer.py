@@ -0,0 +1,179 @@
+"""Bulk import of words and meanings from .xlsx or .csv files.
+
+Files are read row by row (openpyxl in read-only mode, or the csv module) and
+inserted in batched transactions with executemany. ON DUPLICATE KEY UPDATE
+lets the UNIQUE(word) index skip words that already exist, or repeat within
+the file, so nothing has to be held in memory beyond the current batch. Rows
+that don't fit the columns are counted and left out rather than truncated.
+
+Usage:
+
+    python importer.py vocabulary.xlsx
+    python importer.py words.csv --batch-size 2000
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import db
+from export import XLSX_HEADER, XLSX_SHEET_TITLE
+from tasks import Cancelled
+
+IMPORT_BATCH_SIZE = 1000
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".csv")
+
+# Column sizes of vocabulary.word (VARCHAR(255)) and vocabulary.meaning (TEXT)
+WORD_MAX_LENGTH = 255
+MEANING_MAX_BYTES = 65535
+
+
+def _xlsx_rows(path):
+    from openpyxl import load_workbook  # slow to import, only needed for .xlsx
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        if XLSX_SHEET_TITLE in workbook.sheetnames:
+            sheet = workbook[XLSX_SHEET_TITLE]
+        else:
+            sheet = workbook.active
+        yield from sheet.iter_rows(max_col=2, values_only=True)
+    finally:
+        workbook.close()
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as stream:
+        yield from csv.reader(stream)
+
+
+def read_rows(path):
+    """Yield the (word, meaning) cells of each row of an .xlsx or .csv file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".xlsx":
+        return _xlsx_rows(path)
+    if extension == ".csv":
+        return _csv_rows(path)
+    raise ValueError(f"Unsupported file type '{extension}'; expected .xlsx or .csv.")
+
+
+def _clean(rows, counts):
+    """Yield (word, meaning) pairs, skipping the header, incomplete rows and
+    rows too long for the vocabulary table."""
+    header = tuple(name.casefold() for name in XLSX_HEADER)
+    for index, row in enumerate(rows):
+        row = tuple(row or ())
+        word = str(row[0]).strip() if len(row) > 0 and row[0] is not None else ""
+        meaning = str(row[1]).strip() if len(row) > 1 and row[1] is not None else ""
+        if index == 0 and (word.casefold(), meaning.casefold()) == header:
+            continue
+        counts["read"] += 1
+        if not word or not meaning:
+            counts["invalid"] += 1
+            continue
+        if (
+            len(word) > WORD_MAX_LENGTH
+            or len(meaning.encode("utf-8")) > MEANING_MAX_BYTES
+        ):
+            counts["too_long"] += 1
+            continue
+        yield word, meaning
+
+
+def insert_batch(batch, config=None):
+    """Insert (word, meaning) rows in one transaction; returns how many were new."""
+    # Unlike INSERT IGNORE, this only skips duplicate words: in strict mode
+    # anything else wrong with a row still fails loudly instead of being
+    # truncated or coerced. The no-op update leaves the affected row count at
+    # 1 per new word and 0 per duplicate.
+    with db.transaction(config) as cursor:
+        cursor.executemany(
+            "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE id = id",
+            batch,
+        )
+        return cursor.rowcount
+
+
+def import_rows(
+    rows,
+    batch_size=IMPORT_BATCH_SIZE,
+    progress=None,
+    cancelled=None,
+    config=None,
+    insert=None,
+):
+    """Insert (word, meaning) cells from ``rows``; returns a dict of counts.
+
+    The counts are ``read`` (data rows), ``inserted``, ``duplicates`` (already
+    in the vocabulary or repeated in the file), ``invalid`` (missing a word
+    or meaning) and ``too_long`` (longer than the columns allow). Batches
+    committed before a cancellation are kept.
+
+    ``insert(batch)`` stores a batch and returns how many of its words were
+    new; it defaults to insert_batch (MySQL), the GUI passes its replica's.
+    """
+    counts = {"read": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "too_long": 0}
+    batch = []
+
+    def flush():
+        if insert is None:
+            inserted = insert_batch(batch, config)
+        else:
+            inserted = insert(batch)
+        counts["inserted"] += inserted
+        counts["duplicates"] += len(batch) - inserted
+        batch.clear()
+        if progress is not None:
+            progress(counts["read"])
+
+    for pair in _clean(rows, counts):
+        if cancelled is not None and cancelled.is_set():
+            raise Cancelled()
+        batch.append(pair)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return counts
+
+
+def import_file(
+    path,
+    batch_size=IMPORT_BATCH_SIZE,
+    progress=None,
+    cancelled=None,
+    config=None,
+    insert=None,
+):
+    """Import an .xlsx or .csv file; see import_rows for the result."""
+    rows = read_rows(path)
+    try:
+        return import_rows(rows, batch_size, progress, cancelled, config, insert)
+    finally:
+        rows.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import words from .xlsx or .csv.")
+    parser.add_argument("file", help="file with word and meaning columns")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    counts = import_file(
+        args.file,
+        batch_size=args.batch_size,
+        progress=lambda done: print(f"{done} rows...", file=sys.stderr),
+    )
+    print(
+        f"Imported {counts['inserted']} word(s) from {counts['read']} row(s): "
+        f"{counts['duplicates']} duplicate(s), {counts['invalid']} incomplete, "
+        f"{counts['too_long']} too long."
+    )
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Offline activation tokens.
+
+Once a machine's license has been checked against the database it gets a
+small signed token in the user profile: an HMAC-SHA256 over the license key,
+the machine id and an expiry. Startup only has to verify that token, which
+takes no network round trip, and the GUI re-checks the database in the
+background every LICENSE_REVALIDATE_INTERVAL seconds. A token is refused once
+it is older than LICENSE_OFFLINE_GRACE without a successful re-check, or once
+the license itself expires.
+
+Activation itself is a single INSERT into machine_activations. A BEFORE
+INSERT trigger (see migrations.py) claims a slot on the license row (status, expiry and
+activation_count < max_machines, under the row lock) or refuses the insert,
+so concurrent activations can't exceed max_machines and nothing has to count
+the activations.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+
+import db
+from config import (
+    ACTIVATION_TOKEN_PATH,
+    ACTIVATION_TOKEN_SECRET,
+    LICENSE_OFFLINE_GRACE,
+    LICENSE_REVALIDATE_INTERVAL,
+)
+
+# Seconds before retrying a revalidation that couldn't reach the database
+REVALIDATE_RETRY_DELAY = 300
+
+# MySQL error raised by SIGNAL, which the activation trigger uses to refuse
+ER_SIGNAL_EXCEPTION = 1644
+
+_SIGNING_KEY = hashlib.sha256(
+    b"vocab-manager activation\n" + ACTIVATION_TOKEN_SECRET.encode("utf-8")
+).digest()
+
+
+def _signature(license_key, machine_id, issued, expires):
+    message = f"{license_key}\n{machine_id}\n{issued}\n{expires}".encode("utf-8")
+    return hmac.new(_SIGNING_KEY, message, hashlib.sha256).hexdigest()
+
+
+def license_end(expiry_date):
+    """Return the timestamp a license expiring on ``expiry_date`` stops at."""
+    if expiry_date is None:
+        return None
+    if isinstance(expiry_date, str):
+        expiry_date = datetime.strptime(expiry_date, "%Y-%m-%d").date()
+    elif isinstance(expiry_date, datetime):
+        expiry_date = expiry_date.date()
+    # The license is valid through its expiry day.
+    end = datetime.combine(expiry_date + timedelta(days=1), datetime.min.time())
+    return end.timestamp()
+
+
+def is_current(status, expiry_date):
+    """Return True if a license with this status and expiry can be used now."""
+    end = license_end(expiry_date)
+    return status == "active" and (end is None or end > time.time())
+
+
+def issue_token(license_key, machine_id, expiry_date=None, path=ACTIVATION_TOKEN_PATH):
+    """Sign and save a token for a license just checked against the database."""
+    issued = int(time.time())
+    expires = issued + int(LICENSE_OFFLINE_GRACE)
+    end = license_end(expiry_date)
+    if end is not None:
+        expires = min(expires, int(end))
+    token = {
+        "license_key": license_key,
+        "machine_id": machine_id,
+        "issued": issued,
+        "expires": expires,
+        "signature": _signature(license_key, machine_id, issued, expires),
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial = f"{path}.part"
+    with open(partial, "w", encoding="utf-8") as stream:
+        json.dump(token, stream)
+    os.replace(partial, path)
+    return token
+
+
+def load_token(machine_id, path=ACTIVATION_TOKEN_PATH):
+    """Return the saved token if it is genuine, for this machine and unexpired."""
+    try:
+        with open(path, encoding="utf-8") as stream:
+            token = json.load(stream)
+        signature = _signature(
+            token["license_key"], token["machine_id"], token["issued"], token["expires"]
+        )
+        genuine = hmac.compare_digest(signature, token["signature"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not genuine or token["machine_id"] != machine_id:
+        return None
+    if token["expires"] <= time.time():
+        return None
+    return token
+
+
+def clear_token(path=ACTIVATION_TOKEN_PATH):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def seconds_until_revalidation(token):
+    """Return how long a freshly loaded token can go before the next check."""
+    return max(0, token["issued"] + LICENSE_REVALIDATE_INTERVAL - time.time())
+
+
+def find_activation(machine_id, config=None):
+    """Return (license_key, expiry_date) of a usable activation of this machine."""
+    with db.cursor(config) as cursor:
+        cursor.execute(
+            "SELECT a.license_key, l.status, l.expiry_date "
+            "FROM machine_activations a "
+            "JOIN license_keys l ON l.license_key = a.license_key "
+            "WHERE a.machine_id = %s",
+            (machine_id,),
+        )
+        rows = cursor.fetchall()
+    for license_key, status, expiry_date in rows:
+        if is_current(status, expiry_date):
+            return license_key, expiry_date
+    return None
+
+
+def revalidate(machine_id, config=None):
+    """Re-check this machine against the database and refresh its token.
+
+    Returns False (and removes the token) if the machine no longer has a usable
+    activation. Database errors propagate and leave the token alone, so the
+    app keeps working offline until the token expires.
+    """
+    activation = find_activation(machine_id, config)
+    if activation is None:
+        clear_token()
+        return False
+    license_key, expiry_date = activation
+    issue_token(license_key, machine_id, expiry_date)
+    return True
+
+
+def _refusal(license_key, machine_id, config=None):
+    """Explain why an activation was refused (the slow path only)."""
+    with db.cursor(config) as cursor:
+        cursor.execute(
+            "SELECT l.status, l.expiry_date, l.max_machines, a.activation_id "
+            "FROM license_keys l LEFT JOIN machine_activations a "
+            "ON a.license_key = l.license_key AND a.machine_id = %s "
+            "WHERE l.license_key = %s",
+            (machine_id, license_key),
+        )
+        row = cursor.fetchone()
+
+    if not row:
+        return False, "Invalid license key."
+    status, expiry_date, max_machines, activation_id = row
+    if activation_id is not None and is_current(status, expiry_date):
+        return True, "Machine is already activated with this license key."
+    if status != "active":
+        return False, "License key is not active."
+    if not is_current(status, expiry_date):
+        return False, "License key has expired."
+    if activation_id is None:
+        return (
+            False,
+            f"Maximum number of machines ({max_machines}) already activated "
+            "for this license key.",
+        )
+    return False, "An error occurred while activating the machine."
+
+
+def activate(license_key, machine_id, config=None):
+    """Activate this machine for ``license_key``; returns (valid, message).
+
+    A new activation is one INSERT, checked and counted by the trigger. Only
+    when it is refused is the license read to say why.
+    """
+    try:
+        with db.cursor(config) as cursor:
+            cursor.execute(
+                "INSERT INTO machine_activations (license_key, machine_id) "
+                "VALUES (%s, %s)",
+                (license_key, machine_id),
+            )
+    except mysql.connector.Error as e:
+        if (
+            not isinstance(e, mysql.connector.IntegrityError)
+            and e.errno != ER_SIGNAL_EXCEPTION
+        ):
+            raise
+        return _refusal(license_key, machine_id, config)
+    return True, "License key validated successfully and machine activated."
@@ -0,0 +1,144 @@
+"""Background dictionary lookups for the Tk GUI.
+
+Lookups run on a small thread pool so the window never freezes on the network.
+Tk widgets may only be touched from the main thread, so workers push results
+onto a queue that the main loop drains with root.after and hands to each
+request's callback there.
+"""
+
+import itertools
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LOOKUP_WORKERS = 4
+# Overall deadline for a single lookup, in seconds
+LOOKUP_TIMEOUT = 15
+POLL_INTERVAL_MS = 50
+
+
+class LookupTimeout(Exception):
+    """Raised (passed to the callback) when a lookup exceeds its deadline."""
+
+
+class _Request:
+    __slots__ = ("word", "callback", "future", "deadline")
+
+    def __init__(self, word, callback, deadline):
+        self.word = word
+        self.callback = callback
+        self.future = None
+        self.deadline = deadline
+
+
+class LookupService:
+    """Run dictionary lookups off the Tk main thread.
+
+    ``submit`` returns a ticket that can be passed to ``cancel``. Callbacks are
+    called on the main thread as ``callback(entry, error)``: ``entry`` is the
+    DictionaryEntry (or None if the word was not found) and ``error`` is the
+    exception that ended the lookup, if any. Cancelled lookups never call back.
+    ``on_change`` is called with the number of lookups in flight whenever it
+    changes, to drive a busy indicator.
+    """
+
+    def __init__(
+        self,
+        root,
+        workers=LOOKUP_WORKERS,
+        timeout=LOOKUP_TIMEOUT,
+        on_change=None,
+    ):
+        self.root = root
+        self.timeout = timeout
+        self.on_change = on_change
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="lookup"
+        )
+        self._results = queue.SimpleQueue()
+        self._pending = {}
+        self._tickets = itertools.count(1)
+        self._poll_id = None
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def submit(self, word, callback, timeout=None):
+        """Queue a lookup of ``word`` and return its ticket."""
+        timeout = self.timeout if timeout is None else timeout
+        ticket = next(self._tickets)
+        request = _Request(word, callback, time.monotonic() + timeout)
+        self._pending[ticket] = request
+        request.future = self._executor.submit(self._run, ticket, word, timeout)
+        self._schedule_poll()
+        self._notify()
+        return ticket
+
+    def cancel(self, ticket):
+        """Cancel a lookup; its callback will not be called."""
+        request = self._pending.pop(ticket, None)
+        if request is None:
+            return False
+        request.future.cancel()
+        self._notify()
+        return True
+
+    def cancel_all(self):
+        for ticket in list(self._pending):
+            self.cancel(ticket)
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, ticket, word, timeout):
+        # Runs on a worker thread: no Tk calls here. The dictionary client
+        # (requests, sqlite3) is imported on the first lookup rather than
+        # at startup.
+        try:
+            import dictionary
+
+            entry = dictionary.lookup(word, timeout=(min(3.05, timeout), timeout))
+            self._results.put((ticket, entry, None))
+        except Exception as e:
+            self._results.put((ticket, None, e))
+
+    def _schedule_poll(self):
+        if self._poll_id is None:
+            self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        finished = []
+
+        while True:
+            try:
+                ticket, entry, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            request = self._pending.pop(ticket, None)
+            if request is not None:
+                finished.append((request, entry, error))
+
+        now = time.monotonic()
+        for ticket, request in list(self._pending.items()):
+            if now > request.deadline:
+                del self._pending[ticket]
+                request.future.cancel()
+                error = LookupTimeout(f"Lookup of '{request.word}' timed out.")
+                finished.append((request, None, error))
+
+        if self._pending:
+            self._schedule_poll()
+        if finished:
+            self._notify()
+        for request, entry, error in finished:
+            request.callback(entry, error)
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change(self.in_flight)
@@ -1,26 +1,31 @@
 import tkinter as tk
-from tkinter import messagebox, ttk
+from tkinter import filedialog, messagebox, ttk
 import mysql.connector
-import requests
-import os
 import uuid
-from dotenv import load_dotenv
+from contextlib import closing
 from datetime import datetime
-from fpdf import FPDF
-from openpyxl import Workbook
 
-load_dotenv()
+import assets
+import db
+import export
+import importer
+import tasks
+from config import EXPORT_DIR, LICENSE_REVALIDATE_INTERVAL
+import licensing
+import migrations
+from lookups import LookupService
+from prefetch import ADJACENT_ROWS, Prefetcher
+from replica import SYNC_RETRY_DELAY, DuplicateWord, Replica, SyncWorker
+from vocabview import VirtualTreeview
+from vocabulary import preview
 
-DB_CONFIG = {
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "database": os.environ["DB_NAME"],
-}
+TIMESTAMP = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
-DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+# Larger batches of pulled changes re-read the list instead of patching it
+MAX_IN_PLACE_CHANGES = 200
 
-TIMESTAMP = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+# Milliseconds after the main loop starts before a newer icon is fetched
+ICON_REFRESH_DELAY_MS = 2000
 
 
 def generate_machine_id():
@@ -33,136 +38,101 @@ MACHINE_ID = generate_machine_id()
 
 def init_db():
     """Initialize the database schema with the required tables."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # Create vocabulary table
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            word VARCHAR(255) NOT NULL,
-            meaning TEXT NOT NULL,
-            UNIQUE(word)
-        )
-    """
-    )
+    return migrations.migrate()
 
-    # Create license_keys table with machine_id feature and max_machines
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS license_keys (
-            key_id INT AUTO_INCREMENT PRIMARY KEY,
-            license_key VARCHAR(255) NOT NULL UNIQUE,
-            max_machines INT NOT NULL DEFAULT 1,
-            status ENUM('active', 'revoked') NOT NULL DEFAULT 'active',
-            expiry_date DATE DEFAULT NULL
-        )
-    """
-    )
-
-    # Create machine_activations table
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS machine_activations (
-            activation_id INT AUTO_INCREMENT PRIMARY KEY,
-            license_key VARCHAR(255) NOT NULL,
-            machine_id VARCHAR(255) NOT NULL,
-            activation_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(license_key, machine_id),
-            FOREIGN KEY (license_key) REFERENCES license_keys(license_key)
-        )
-    """
-    )
 
-    conn.commit()
-    conn.close()
+# Set once the schema check has finished; startup stages that failed before
+# then (on a new database the tables may not exist yet) wait in
+# startup_retries and run again
+schema_ready = False
+startup_retries = []
 
 
-# Global variable to track the open definition window
-definition_window = None
+def show_database_error(error):
+    messagebox.showerror("Database Error", f"An error occurred: {error}")
 
 
-def validate_license_key(license_key):
-    """Validate the license key and ensure it matches the machine."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
+def run_startup_stage(func, on_success, on_error=show_database_error):
+    """Run ``func()`` on a worker thread and pass its result to ``on_success``.
 
-    # Check if the current machine is already activated
-    cursor.execute(
-        "SELECT activation_id FROM machine_activations WHERE license_key = %s AND machine_id = %s",
-        (license_key, MACHINE_ID),
-    )
-    existing_activation = cursor.fetchone()
+    Failures are passed to ``on_error``, except that one before the schema is
+    ready is retried once it is; an unreachable database is reported at once.
+    """
+    started_with_schema = schema_ready
+
+    def on_done(result, error):
+        if error is None:
+            on_success(result)
+        elif started_with_schema or db.is_connection_error(error):
+            on_error(error)
+        elif schema_ready:
+            run_startup_stage(func, on_success, on_error)
+        else:
+            startup_retries.append(
+                lambda: run_startup_stage(func, on_success, on_error)
+            )
 
-    if existing_activation:
-        conn.close()
-        return True, "Machine is already activated with this license key."
+    tasks.BackgroundTask(
+        root, lambda progress, cancelled: func(), on_done=on_done
+    ).start()
 
-    # Check license key status and max_machines
-    cursor.execute(
-        "SELECT status, expiry_date, max_machines FROM license_keys WHERE license_key = %s",
-        (license_key,),
-    )
-    result = cursor.fetchone()
 
-    if not result:
-        conn.close()
-        return False, "Invalid license key."
+def check_schema():
+    """Apply any pending migrations on a worker thread."""
+    tasks.BackgroundTask(
+        root, lambda progress, cancelled: init_db(), on_done=on_schema_checked
+    ).start()
 
-    status, expiry_date, max_machines = result
 
-    # Check status
-    if status != "active":
-        conn.close()
-        return False, "License key is not active."
+def on_schema_checked(applied, error):
+    """Release the startup stages waiting on the schema and start syncing."""
+    global schema_ready
+    if error is not None and db.is_connection_error(error):
+        # MySQL is unreachable: keep working on the local replica.
+        update_sync_status(False, vocabulary_replica.pending())
+        root.after(SYNC_RETRY_DELAY * 1000, check_schema)
+        return
+    if error is not None:
+        messagebox.showerror(
+            "Database Error", f"Could not prepare the database: {error}"
+        )
+        root.destroy()
+        return
+    schema_ready = True
+    while startup_retries:
+        startup_retries.pop(0)()
+    sync_worker.start()
 
-    # Check expiry
-    if expiry_date and datetime.strptime(expiry_date, "%Y-%m-%d") < datetime.now():
-        conn.close()
-        return False, "License key has expired."
 
-    # Check number of activated machines
-    cursor.execute(
-        "SELECT COUNT(*) FROM machine_activations WHERE license_key = %s",
-        (license_key,),
-    )
-    activated_machines = cursor.fetchone()[0]
+def start_up():
+    """Show the local vocabulary, and check the schema and license.
 
-    if activated_machines >= max_machines:
-        conn.close()
-        return (
-            False,
-            f"Maximum number of machines ({max_machines}) already activated for this license key.",
-        )
+    The list comes from the local replica, so it is shown straight away; the
+    schema and license checks run concurrently in the background, and the
+    replica starts syncing once the schema is ready.
+    """
+    check_schema()
+    show_license_key_entry()
+    load_vocabulary()
+    prefetcher.start()
 
-    # Activate the machine
-    try:
-        cursor.execute(
-            "INSERT INTO machine_activations (license_key, machine_id) VALUES (%s, %s)",
-            (license_key, MACHINE_ID),
-        )
-        conn.commit()
-    except mysql.connector.IntegrityError:
-        conn.close()
-        return False, "An error occurred while activating the machine."
 
-    conn.close()
-    return True, "License key validated successfully and machine activated."
+# Global variable to track the open definition window
+definition_window = None
 
+# Words waiting on a background dictionary lookup, mapped to their ticket
+pending_words = {}
 
-def fetch_meaning(word):
-    """Fetch the meaning of a word using the dictionary API."""
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    return data[0]["meanings"][0]["definitions"][0]["definition"]
+# Ticket of the in-flight definitions lookup (superseded by the next request)
+definitions_ticket = None
 
 
 def add_word(event=None):
-    """Add a new word and its meaning to the database."""
+    """Add a new word and its meaning to the database.
+
+    Without a meaning, the word is looked up in the background and added when
+    the dictionary answers, so more words can be queued in the meantime.
+    """
     word = entry_word.get().strip()
     meaning = entry_meaning.get().strip()
 
@@ -170,54 +140,111 @@ def add_word(event=None):
         messagebox.showwarning("Input Error", "Please provide a word.")
         return
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
+    if word in pending_words:
+        messagebox.showwarning("Input Error", f"'{word}' is already being looked up.")
+        return
 
     # Check if the word already exists
-    cursor.execute("SELECT COUNT(*) FROM vocabulary WHERE word = %s", (word,))
-    exists = cursor.fetchone()[0]
-
-    if exists:
-        conn.close()
+    if vocabulary_replica.word_exists(word):
         messagebox.showerror(
             "Error", f"The word '{word}' already exists in the database."
         )
         return
 
     if not meaning:
-        set_cursor("wait")  # Show loading cursor
-        meaning = fetch_meaning(word)
-        set_cursor("")  # Reset cursor
-        if not meaning:
-            messagebox.showwarning(
-                "Fetch Error", "Could not fetch meaning from the dictionary."
-            )
-            conn.close()
-            return
-
-    try:
-        cursor.execute(
-            "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s)", (word, meaning)
+        pending_words[word] = lookup_service.submit(
+            word, lambda entry, error: on_meaning_fetched(word, entry)
         )
-        conn.commit()
-        conn.close()
+        entry_word.delete(0, tk.END)
+        entry_meaning.delete(0, tk.END)
+        return
+
+    if insert_word(word, meaning):
         messagebox.showinfo("Success", f"'{word}' added successfully!")
         entry_word.delete(0, tk.END)
         entry_meaning.delete(0, tk.END)
-        load_vocabulary()
-    except mysql.connector.Error as e:
-        conn.close()
-        messagebox.showerror("Database Error", f"An error occurred: {e}")
+
+
+def on_meaning_fetched(word, entry):
+    """Finish adding a word once its background lookup completes."""
+    pending_words.pop(word, None)
+    meaning = entry.meaning if entry else None
+    if not meaning:
+        messagebox.showwarning(
+            "Fetch Error",
+            f"Could not fetch the meaning of '{word}' from the dictionary.",
+        )
+        return
+
+    if insert_word(word, meaning):
+        status_var.set(f"'{word}' added successfully!")
+
+
+def insert_word(word, meaning):
+    """Insert a word into the local replica and show it in the list.
+
+    The sync worker pushes it to the database in the background.
+    """
+    try:
+        word_id = vocabulary_replica.insert(word, meaning)
+    except DuplicateWord:
+        messagebox.showerror(
+            "Error", f"The word '{word}' already exists in the database."
+        )
+        return False
+
+    vocabulary_view.insert_row((word_id, word, preview(meaning)))
+    return True
+
+
+def update_lookup_status(in_flight):
+    """Show how many dictionary lookups are running in the status bar."""
+    if in_flight:
+        status_var.set(f"Looking up {in_flight} word(s)...")
+        button_cancel_lookups.state(["!disabled"])
+    else:
+        status_var.set("")
+        button_cancel_lookups.state(["disabled"])
+
+
+def cancel_lookups():
+    """Cancel every queued or running dictionary lookup."""
+    global definitions_ticket
+    lookup_service.cancel_all()
+    pending_words.clear()
+    definitions_ticket = None
+
+
+def request_definitions(word, show):
+    """Look up ``word`` in the background and pass its entry to ``show``.
+
+    A newer request supersedes one that is still in flight.
+    """
+    global definitions_ticket
+
+    def on_result(entry, error):
+        global definitions_ticket
+        definitions_ticket = None
+        if not entry or not entry.definitions:
+            messagebox.showerror(
+                "Error", "Could not fetch definitions for the selected word."
+            )
+            return
+        show(word, entry)
+
+    if definitions_ticket is not None:
+        lookup_service.cancel(definitions_ticket)
+    definitions_ticket = lookup_service.submit(word, on_result)
 
 
 def edit_word():
     """Edit the selected word and update the database."""
-    selected_item = tree_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         messagebox.showwarning("Selection Error", "Please select a word to edit.")
         return
 
-    word = tree_vocabulary.item(selected_item, "values")[0]
+    word = selected[1]
 
     # Prompt user for new word and meaning
     edit_window = tk.Toplevel(root)
@@ -233,13 +260,10 @@ def edit_word():
     entry_new_meaning = ttk.Entry(edit_window, font=("Verdana", 12))
     entry_new_meaning.pack(pady=5, padx=10, fill=tk.X)
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT meaning FROM vocabulary WHERE word = %s", (word,))
-    old_meaning = cursor.fetchone()
+    # The list only holds a preview of the meaning; edit the full text.
+    old_meaning = vocabulary_replica.full_meaning(selected[0])
     if old_meaning:
-        entry_new_meaning.insert(0, old_meaning[0])
-    conn.close()
+        entry_new_meaning.insert(0, old_meaning)
 
     def save_changes():
         new_word = entry_new_word.get().strip()
@@ -251,21 +275,17 @@ def edit_word():
             )
             return
 
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
         try:
-            cursor.execute(
-                "UPDATE vocabulary SET word = %s, meaning = %s WHERE word = %s",
-                (new_word, new_meaning, word),
-            )
-            conn.commit()
-            conn.close()
-            messagebox.showinfo("Success", "Word updated successfully!")
-            edit_window.destroy()
-            load_vocabulary()
-        except mysql.connector.IntegrityError:
-            conn.close()
+            vocabulary_replica.update(selected[0], new_word, new_meaning)
+        except DuplicateWord:
             messagebox.showerror("Error", "This word already exists in the database.")
+            return
+
+        messagebox.showinfo("Success", "Word updated successfully!")
+        edit_window.destroy()
+        vocabulary_view.update_row(
+            selected, (selected[0], new_word, preview(new_meaning))
+        )
 
     ttk.Button(edit_window, text="Save Changes", command=save_changes).pack(pady=10)
 
@@ -273,45 +293,99 @@ def edit_word():
 
 
 def delete_word():
-    selected_item = tree_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         messagebox.showwarning("Selection Error", "Please select a word to delete.")
         return
 
-    word = tree_vocabulary.item(selected_item, "values")[0]
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM vocabulary WHERE word = %s", (word,))
-    conn.commit()
-    conn.close()
+    vocabulary_replica.delete(selected[0])
 
     messagebox.showinfo("Success", "Word deleted successfully.")
-    load_vocabulary()
+    vocabulary_view.remove_row(selected)
+
+
+def on_search(event=None):
+    load_vocabulary(entry_search.get().strip())
 
 
-def on_search():
-    search_term = entry_search.get().strip()
-    load_vocabulary(search_term)
+def refresh_vocabulary():
+    """Pull the database's changes; they are shown when they arrive."""
+    sync_worker.request_pull()
 
 
 def load_vocabulary(search_term=""):
     """Load vocabulary words and meanings into the Treeview."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    query = "SELECT word, meaning FROM vocabulary"
-    if search_term:
-        query += " WHERE word LIKE %s"
-        cursor.execute(query, (f"%{search_term}%",))
+    # Only the rows on screen are materialized; pages are read from the local
+    # replica on demand as the list scrolls. A search term is matched against
+    # words and meanings and ranked by relevance.
+    vocabulary_view.set_source(vocabulary_replica.search(search_term))
+
+
+def update_sync_status(online, pending, error=None):
+    """Show whether local changes are waiting to reach the database."""
+    if error:
+        sync_var.set(f"Sync error ({error}); retrying in {SYNC_RETRY_DELAY} s")
+    elif online and not pending:
+        sync_var.set("")
+    elif online:
+        sync_var.set(f"Syncing {pending} change(s)...")
     else:
-        cursor.execute(query)
-    words = cursor.fetchall()
-    conn.close()
+        sync_var.set(f"Offline: {pending} change(s) waiting to sync")
+
+
+def on_replica_changed(changes):
+    """Show rows changed in the database by other machines, in place."""
+    ranked = getattr(vocabulary_view.source, "ranked", False)
+    if ranked or len(changes) > MAX_IN_PLACE_CHANGES:
+        # A ranked search is re-read on any change anyway.
+        vocabulary_view.refresh()
+    else:
+        for old_row, new_row in changes:
+            if old_row is None:
+                vocabulary_view.insert_row(new_row)
+            elif new_row is None:
+                vocabulary_view.remove_row(old_row)
+            else:
+                vocabulary_view.update_row(old_row, new_row)
+    prefetcher.schedule()
+
+
+def on_replica_pulled():
+    """Show the list again after the whole table was copied."""
+    vocabulary_view.refresh()
+    prefetcher.schedule()
 
-    for row in tree_vocabulary.get_children():
-        tree_vocabulary.delete(row)
 
-    for word in words:
-        tree_vocabulary.insert("", "end", values=word)
+def on_list_scrolled():
+    """The list keeps its scroll keys and wheel events to itself, so it tells
+    the prefetcher about them."""
+    prefetcher.note_input()
+
+
+def words_to_prefetch():
+    """The selected word and its neighbours first, then the rest of the screen."""
+    rows = vocabulary_view.rows_near_selection(ADJACENT_ROWS)
+    rows += vocabulary_view.visible_rows()
+    return list(dict.fromkeys(row[1] for row in rows))
+
+
+def on_sync_conflict(word, reason):
+    """Report a local change the database refused (the database's row wins)."""
+    status_var.set(f"'{word}' could not be synced: {reason}.")
+    vocabulary_view.refresh()
+
+
+def show_sync_conflicts():
+    """List the latest local changes the database refused."""
+    rows = vocabulary_replica.conflicts(limit=20)
+    if not rows:
+        messagebox.showinfo("Sync Conflicts", "No sync conflicts.")
+        return
+    message = "\n".join(
+        f"{datetime.fromtimestamp(recorded_at):%Y-%m-%d %H:%M}  {word}: {reason}"
+        for word, meaning, reason, recorded_at in rows
+    )
+    messagebox.showinfo("Sync Conflicts", message)
 
 
 def set_cursor(cursor_type):
@@ -321,29 +395,103 @@ def set_cursor(cursor_type):
 
 
 def show_license_key_entry():
-    """Prompt user to enter a license key for validation or skip if already validated."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # Check if the machine is already activated
-    cursor.execute(
-        "SELECT license_key FROM machine_activations WHERE machine_id = %s",
-        (MACHINE_ID,),
-    )
-    result = cursor.fetchone()
-    conn.close()
+    """Show the main window if this machine is activated, else ask for a key.
 
-    if result:
-        # If the machine is already activated, skip the license key input
+    A valid local activation token is enough to start; the database is only
+    asked when there is none, and re-checked in the background afterwards.
+    """
+    token = licensing.load_token(MACHINE_ID)
+    if token:
         root.deiconify()  # Show the main application window
+        schedule_license_check(licensing.seconds_until_revalidation(token))
+        return
+
+    # No token yet (or it expired): the main window stays hidden while the
+    # database is checked for an activation.
+    root.withdraw()
+    run_startup_stage(
+        lambda: licensing.find_activation(MACHINE_ID),
+        on_activation,
+        on_error=on_activation_error,
+    )
+
+
+def on_activation(activation):
+    """Show the main window for an activated machine, else ask for a key."""
+    if activation:
+        license_key, expiry_date = activation
+        licensing.issue_token(license_key, MACHINE_ID, expiry_date)
+        root.deiconify()
+        schedule_license_check(LICENSE_REVALIDATE_INTERVAL)
         return
 
-    # Prompt for license key if the machine is not activated
+    prompt_license_key()
+
+
+def on_activation_error(error):
+    """Explain why the activation couldn't be checked, then ask for a key."""
+    messagebox.showerror(
+        "License Validation",
+        f"Could not check this machine's activation with the database: {error}",
+    )
+    prompt_license_key()
+
+
+def schedule_license_check(delay):
+    """Re-check the activation against the database in ``delay`` seconds."""
+    root.after(int(delay * 1000), check_license)
+
+
+def check_license():
+    """Revalidate the activation on a worker thread."""
+    tasks.BackgroundTask(
+        root,
+        lambda progress, cancelled: licensing.revalidate(MACHINE_ID),
+        on_done=on_license_checked,
+    ).start()
+
+
+def on_license_checked(valid, error):
+    if error is not None:
+        # Database unreachable: keep running on the token and try again soon.
+        schedule_license_check(licensing.REVALIDATE_RETRY_DELAY)
+    elif valid:
+        schedule_license_check(LICENSE_REVALIDATE_INTERVAL)
+    else:
+        messagebox.showerror(
+            "License Validation", "This machine's license is no longer active."
+        )
+        prompt_license_key()
+
+
+def prompt_license_key():
+    """Hide the main window until a valid license key is entered."""
+
+    def activate(license_key):
+        # Runs on a worker thread: both calls go to the database.
+        valid, message = licensing.activate(license_key, MACHINE_ID)
+        if valid:
+            licensing.revalidate(MACHINE_ID)
+        return valid, message
+
     def submit_key():
         license_key = entry_license.get().strip()
-        valid, message = validate_license_key(license_key)
+        button_submit.config(state=tk.DISABLED)
+        tasks.BackgroundTask(
+            root,
+            lambda progress, cancelled: activate(license_key),
+            on_done=on_activated,
+        ).start()
+
+    def on_activated(result, error):
+        button_submit.config(state=tk.NORMAL)
+        if error is not None:
+            show_database_error(error)
+            return
 
+        valid, message = result
         if valid:
+            schedule_license_check(LICENSE_REVALIDATE_INTERVAL)
             messagebox.showinfo("License Validation", message)
             license_window.destroy()
             root.deiconify()  # Show the main application window
@@ -362,52 +510,36 @@ def show_license_key_entry():
     entry_license = ttk.Entry(license_window, font=("Verdana", 12))
     entry_license.pack(pady=5, padx=10, fill=tk.X)
 
-    ttk.Button(license_window, text="Submit", command=submit_key).pack(pady=10)
+    button_submit = ttk.Button(license_window, text="Submit", command=submit_key)
+    button_submit.pack(pady=10)
 
     license_window.protocol("WM_DELETE_WINDOW", root.destroy)
 
 
-def fetch_all_definitions(word):
-    """Fetch all available definitions and examples of a word using the dictionary API."""
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-
-    # Extract all definitions and examples
-    definitions = []
-    for meaning in data[0]["meanings"]:
-        part_of_speech = meaning.get("partOfSpeech", "Unknown")
-        for definition in meaning["definitions"]:
-            definitions.append(
-                {
-                    "partOfSpeech": part_of_speech,
-                    "definition": definition["definition"],
-                    "example": definition.get("example", "No example available"),
-                }
-            )
-    return definitions
+def definitions_text(entry):
+    """Format every definition and example of a dictionary entry for display."""
+    return "".join(
+        f"{idx}. ({definition.part_of_speech}) {definition.text}\n"
+        f"   Example: {definition.example or 'No example available'}\n\n"
+        for idx, definition in enumerate(entry.definitions, start=1)
+    )
 
 
 def view_definitions():
     """Display all definitions and examples for the selected word in a popup window."""
-    selected_item = tree_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         messagebox.showwarning(
             "Selection Error", "Please select a word to view its definitions."
         )
         return
 
-    word = tree_vocabulary.item(selected_item, "values")[0]
-    definitions = fetch_all_definitions(word)
+    word = selected[1]
+    request_definitions(word, show_definitions)
 
-    if not definitions:
-        messagebox.showerror(
-            "Error", "Could not fetch definitions for the selected word."
-        )
-        return
 
+def show_definitions(word, entry):
+    """Display the definitions popup for a looked-up word."""
     # Create a popup window
     definitions_window = tk.Toplevel(root)
     definitions_window.title(f"Definitions and Examples for '{word}'")
@@ -432,14 +564,7 @@ def view_definitions():
     text_widget.config(yscrollcommand=scrollbar.set)
 
     # Insert definitions and examples into the text widget
-    for idx, definition in enumerate(definitions, start=1):
-        part_of_speech = definition["partOfSpeech"]
-        definition_text = definition["definition"]
-        example_text = definition["example"]
-        text_widget.insert(
-            tk.END,
-            f"{idx}. ({part_of_speech}) {definition_text}\n   Example: {example_text}\n\n",
-        )
+    text_widget.insert(tk.END, definitions_text(entry))
 
     text_widget.config(state=tk.DISABLED)  # Make the text widget read-only
 
@@ -450,21 +575,18 @@ def view_definitions():
 
 def show_license_status():
     """Display the license status linked to the current machine."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        """
-        SELECT lk.license_key, lk.status, lk.expiry_date, lk.max_machines, COUNT(ma.machine_id) as activated_machines
-        FROM license_keys lk
-        JOIN machine_activations ma ON lk.license_key = ma.license_key
-        WHERE ma.machine_id = %s
-        GROUP BY lk.license_key
-    """,
-        (MACHINE_ID,),
-    )
-    row = cursor.fetchone()
-    conn.close()
+    with db.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT lk.license_key, lk.status, lk.expiry_date, lk.max_machines, COUNT(ma.machine_id) as activated_machines
+            FROM license_keys lk
+            JOIN machine_activations ma ON lk.license_key = ma.license_key
+            WHERE ma.machine_id = %s
+            GROUP BY lk.license_key
+        """,
+            (MACHINE_ID,),
+        )
+        row = cursor.fetchone()
 
     if not row:
         messagebox.showinfo(
@@ -489,8 +611,9 @@ def show_about():
 def check_db_connection():
     """Test the database connection."""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        conn.close()
+        with db.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
         messagebox.showinfo("Database Connection", "Database connection is active.")
     except mysql.connector.Error as e:
         messagebox.showerror("Database Connection", f"Database connection failed: {e}")
@@ -508,28 +631,28 @@ def adjust_column_widths(event):
 
 def clear_selection(event=None):
     """Clear the current selection in the Treeview."""
-    tree_vocabulary.selection_remove(tree_vocabulary.selection())
+    vocabulary_view.clear_selection()
 
 
 def on_double_click(event):
     """Handle double-click event on a row to display word definitions and examples."""
-    global definition_window
-
-    selected_item = tree_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         messagebox.showwarning(
             "Selection Error", "Please select a word to view its definitions."
         )
         return
 
-    word = tree_vocabulary.item(selected_item, "values")[0]
-    definitions = fetch_all_definitions(word)
+    word = selected[1]
+    meaning = vocabulary_replica.full_meaning(selected[0])
+    request_definitions(
+        word, lambda word, entry: show_definition_window(word, entry, meaning)
+    )
 
-    if not definitions:
-        messagebox.showerror(
-            "Error", "Could not fetch definitions for the selected word."
-        )
-        return
+
+def show_definition_window(word, entry, meaning=None):
+    """Display the single reusable definition window for a looked-up word."""
+    global definition_window
 
     # Check if a definition window is already open
     if definition_window and tk.Toplevel.winfo_exists(definition_window):
@@ -560,15 +683,11 @@ def on_double_click(event):
     scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     text_widget.config(yscrollcommand=scrollbar.set)
 
-    # Insert definitions and examples into the text widget
-    for idx, definition in enumerate(definitions, start=1):
-        part_of_speech = definition["partOfSpeech"]
-        definition_text = definition["definition"]
-        example_text = definition["example"]
-        text_widget.insert(
-            tk.END,
-            f"{idx}. ({part_of_speech}) {definition_text}\n   Example: {example_text}\n\n",
-        )
+    # Insert the saved meaning (the list only shows its start), then the
+    # dictionary's definitions and examples
+    if meaning:
+        text_widget.insert(tk.END, f"Saved meaning:\n{meaning}\n\n")
+    text_widget.insert(tk.END, definitions_text(entry))
 
     text_widget.config(state=tk.DISABLED)  # Make the text widget read-only
 
@@ -597,88 +716,140 @@ def clear_definition_window(window):
         definition_window = None
 
 
-def export_to_pdf():
-    """Export the vocabulary list to a PDF file."""
-    # Fetch vocabulary data
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT word, meaning FROM vocabulary")
-    vocabulary = cursor.fetchall()
-    conn.close()
+def run_task(title, func, on_success, count=None):
+    """Run ``func`` as a background task with a progress and cancel window."""
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.geometry("360x130")
+    window.resizable(False, False)
 
-    if not vocabulary:
-        messagebox.showinfo("Export PDF", "No words found to export.")
-        return
+    label = ttk.Label(window, text="Starting...")
+    label.pack(pady=10)
+    progress_bar = ttk.Progressbar(window, length=300, mode="determinate")
+    progress_bar.pack(pady=5)
 
-    # Create a PDF instance
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    # Add a title
-    pdf.set_font("Arial", style="B", size=14)
-    pdf.cell(200, 10, txt="Vocabulary List", ln=True, align="C")
-    pdf.ln(10)  # Add a line break
-
-    # Add vocabulary data
-    pdf.set_font("Arial", size=12)
-    for word, meaning in vocabulary:
-        pdf.cell(0, 10, txt=f"Word: {word}", ln=True)
-        pdf.multi_cell(0, 10, txt=f"Meaning: {meaning}", align="L")
-        pdf.ln(5)  # Add a small space between entries
-
-    # Save the PDF
-    try:
-        pdf.output("Vocabulary_List.pdf")
-        messagebox.showinfo(
-            "Export PDF", "Vocabulary list has been exported to 'Vocabulary_List.pdf'."
-        )
-    except Exception as e:
-        messagebox.showerror("Export PDF", f"An error occurred: {e}")
+    def on_progress(done, total):
+        if total:
+            progress_bar.config(maximum=total, value=done)
+            label.config(text=f"{done:,} of {total:,} words...")
+        else:
+            progress_bar.config(mode="indeterminate")
+            progress_bar.step()
+            label.config(text=f"{done:,} words...")
 
+    def on_done(result, error):
+        window.destroy()
+        if isinstance(error, tasks.Cancelled):
+            status_var.set(f"{title} cancelled.")
+        elif error is not None:
+            messagebox.showerror(title, f"An error occurred: {error}")
+        else:
+            on_success(result)
 
-def export_to_xlsx():
-    """Export the vocabulary list to an XLSX file."""
-    # Fetch vocabulary data
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT word, meaning FROM vocabulary")
-    vocabulary = cursor.fetchall()
-    conn.close()
+    def cancel():
+        task.cancel()
+        button_cancel.config(state=tk.DISABLED)
+        label.config(text="Cancelling...")
 
-    if not vocabulary:
-        messagebox.showinfo("Export XLSX", "No words found to export.")
+    task = tasks.BackgroundTask(
+        root, func, on_progress=on_progress, on_done=on_done, count=count
+    )
+    button_cancel = ttk.Button(window, text="Cancel", command=cancel)
+    button_cancel.pack(pady=5)
+    window.protocol("WM_DELETE_WINDOW", cancel)
+    task.start()
+
+
+def export_vocabulary(key):
+    """Ask for a path and export the vocabulary there in the given format."""
+    export_format = export.FORMATS[key]
+    title = f"Export {export_format.label}"
+    path = filedialog.asksaveasfilename(
+        title=title,
+        initialdir=EXPORT_DIR,
+        initialfile=f"Vocabulary_List_{TIMESTAMP}{export_format.extension}",
+        defaultextension=export_format.extension,
+        filetypes=[(export_format.label, f"*{export_format.extension}")],
+    )
+    if not path:
         return
 
-    # Create a new Workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Vocabulary List"
-
-    # Add headers to the Excel file
-    ws.append(["Word", "Meaning"])
+    def on_success(count):
+        if not count:
+            messagebox.showinfo(title, "No words found to export.")
+        else:
+            messagebox.showinfo(
+                title, f"Vocabulary list has been exported to '{path}'."
+            )
 
-    # Add data rows
-    for word, meaning in vocabulary:
-        ws.append([word, meaning])
+    # The export reads the replica, so it includes changes not synced yet.
+    # Rows are written as they are read, on a worker thread (with its own
+    # replica connection), so memory stays flat and the window responsive.
+    def count_words():
+        with closing(Replica()) as replica:
+            return replica.count()
+
+    def export_words(progress, cancelled):
+        with closing(Replica()) as replica:
+            return export.export(key, path, progress, cancelled, rows=replica.rows())
+
+    run_task(title, export_words, on_success, count=count_words)
+
+
+def import_vocabulary():
+    """Import words and meanings from an XLSX or CSV file."""
+    path = filedialog.askopenfilename(
+        title="Import Vocabulary",
+        initialdir=EXPORT_DIR,
+        filetypes=[
+            ("Vocabulary files", " ".join(importer.SUPPORTED_EXTENSIONS)),
+            ("All files", "*.*"),
+        ],
+    )
+    if not path:
+        return
 
-    # Save the workbook to a file
-    try:
-        file_path = os.path.join(os.getcwd(), f"Vocabulary_List_{TIMESTAMP}.xlsx")
-        wb.save(file_path)
+    def on_success(counts):
+        vocabulary_view.refresh()
         messagebox.showinfo(
-            "Export XLSX",
-            f"Vocabulary list has been exported to '{file_path}'.",
+            "Import Vocabulary",
+            f"Imported {counts['inserted']:,} of {counts['read']:,} words.\n"
+            f"{counts['duplicates']:,} were already in the vocabulary, "
+            f"{counts['invalid']:,} rows had no word or meaning and "
+            f"{counts['too_long']:,} were too long to store.",
         )
-    except Exception as e:
-        messagebox.showerror("Export XLSX", f"An error occurred: {e}")
+
+    # Imported words go into the replica and its outbox like any other
+    # addition; the sync worker pushes them.
+    def import_words(progress, cancelled):
+        with closing(Replica()) as replica:
+            replica.on_change = sync_worker.notify
+            return importer.import_file(
+                path, progress=progress, cancelled=cancelled, insert=replica.insert_many
+            )
+
+    run_task("Import Vocabulary", import_words, on_success)
 
 
-url = "https://cdn.cloudservetechcentral.com/vocab-manager/32x32.ico"
-response = requests.get(url)
-with open("icon.ico", "wb") as file:
-    file.write(response.content)
+def set_icon(path):
+    """Use the icon file at ``path`` for the main window."""
+    try:
+        root.iconbitmap(path)
+    except tk.TclError:
+        pass  # a damaged icon file shouldn't stop the app
+
+
+def refresh_icon():
+    """Fetch a newer window icon, if there is one, on a worker thread."""
+    tasks.BackgroundTask(
+        root, lambda progress, cancelled: assets.refresh_icon(), on_done=on_icon_refreshed
+    ).start()
+
+
+def on_icon_refreshed(path, error):
+    """Switch to a newly downloaded icon (failures keep the bundled one)."""
+    if path:
+        set_icon(path)
 
 
 # Main Application Window
@@ -686,7 +857,7 @@ root = tk.Tk()
 root.title("Vocabulary Manager")
 root.state("zoomed")
 root.geometry("900x600")
-root.iconbitmap("icon.ico")
+set_icon(assets.icon_path())
 root.option_add("*Font", "Verdana 10")
 
 # Menu Bar
@@ -696,9 +867,13 @@ menubar = tk.Menu(root)
 file_menu = tk.Menu(menubar, tearoff=0)
 
 export_menu = tk.Menu(file_menu, tearoff=0)
-export_menu.add_command(label="Export to PDF", command=export_to_pdf)
-export_menu.add_command(label="Export to XLSX", command=export_to_xlsx)
+for export_format in export.FORMATS.values():
+    export_menu.add_command(
+        label=f"Export to {export_format.label}",
+        command=lambda key=export_format.key: export_vocabulary(key),
+    )
 
+file_menu.add_command(label="Import from XLSX/CSV...", command=import_vocabulary)
 file_menu.add_cascade(label="Export", menu=export_menu)
 
 menubar.add_cascade(label="File", menu=file_menu)
@@ -711,7 +886,8 @@ menubar.add_cascade(label="License", menu=license_menu)
 # Database Tools Menu
 db_menu = tk.Menu(menubar, tearoff=0)
 db_menu.add_command(label="Check Database Connection", command=check_db_connection)
-db_menu.add_command(label="Refresh Data", command=lambda: load_vocabulary())
+db_menu.add_command(label="Refresh Data", command=refresh_vocabulary)
+db_menu.add_command(label="Show Sync Conflicts", command=show_sync_conflicts)
 menubar.add_cascade(label="Database", menu=db_menu)
 
 # About Menu
@@ -744,10 +920,15 @@ tree_vocabulary.bind("<Escape>", clear_selection)
 # Bind the double-click event to show definitions
 tree_vocabulary.bind("<Double-1>", on_double_click)
 
-# Scrollbar for Treeview
-scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL, command=tree_vocabulary.yview)
-tree_vocabulary.configure(yscrollcommand=scrollbar.set)
+# Scrollbar for Treeview, driven by the virtual view (row id as item id)
+scrollbar = ttk.Scrollbar(root, orient=tk.VERTICAL)
 scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+vocabulary_view = VirtualTreeview(
+    tree_vocabulary,
+    scrollbar,
+    format_row=lambda row: (str(row[0]), row[1:3]),
+    on_scroll=on_list_scrolled,
+)
 
 # Search Frame
 frame_search = ttk.Frame(root, padding=10)
@@ -756,6 +937,7 @@ frame_search.pack(fill=tk.X)
 ttk.Label(frame_search, text="Search:").pack(side=tk.LEFT, padx=5)
 entry_search = ttk.Entry(frame_search)
 entry_search.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+entry_search.bind("<Return>", on_search)
 ttk.Button(frame_search, text="Search", command=on_search).pack(side=tk.LEFT, padx=5)
 
 # Input Frame
@@ -781,9 +963,48 @@ ttk.Button(frame_input, text="View Definitions", command=view_definitions).pack(
     side=tk.LEFT, padx=5
 )
 
+# Status Bar (background lookup progress)
+frame_status = ttk.Frame(root, padding=(10, 0, 10, 5))
+frame_status.pack(fill=tk.X)
+
+status_var = tk.StringVar()
+ttk.Label(frame_status, textvariable=status_var).pack(side=tk.LEFT, padx=5)
+button_cancel_lookups = ttk.Button(
+    frame_status, text="Cancel Lookups", command=cancel_lookups, state="disabled"
+)
+button_cancel_lookups.pack(side=tk.RIGHT, padx=5)
+sync_var = tk.StringVar()
+ttk.Label(frame_status, textvariable=sync_var).pack(side=tk.RIGHT, padx=5)
+
+lookup_service = LookupService(root, on_change=update_lookup_status)
+
+# Look up the words on screen while the window is idle, so opening their
+# definitions is answered from the cache
+prefetcher = Prefetcher(
+    root, words_to_prefetch, busy=lambda: lookup_service.in_flight > 0
+)
+
+# All reads and writes go to the local replica; the sync worker pushes local
+# changes to the database and pulls everyone else's
+vocabulary_replica = Replica()
+sync_worker = SyncWorker(
+    root,
+    on_status=update_sync_status,
+    on_changed=on_replica_changed,
+    on_pulled=on_replica_pulled,
+    on_conflict=on_sync_conflict,
+)
+vocabulary_replica.on_change = sync_worker.notify
+
+# Fetch a newer icon once the window is up: the fetch imports requests,
+# which would otherwise compete with the first paint
+root.after(ICON_REFRESH_DELAY_MS, refresh_icon)
+
 # Initialize and Run Application
-init_db()
-show_license_key_entry()
-load_vocabulary()
+start_up()
 
 root.mainloop()
+sync_worker.stop()
+prefetcher.shutdown()
+lookup_service.shutdown()
+db.close_all()
@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('.env', '.')],
+    datas=[('.env', '.'), ('32x32.ico', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,403 @@
+"""Versioned schema migrations shared by every entry point.
+
+The schema is built by the ordered migrations below, and schema_version
+records the ones that have been applied. When the schema is current, startup
+costs a single primary-key read of that table. Otherwise the missing
+migrations run in order under a named lock, so two clients starting at the
+same time don't apply one twice.
+
+Databases created before schema_version existed are brought up to date by
+running every migration from the start. Migrations therefore check for what
+they add (IF NOT EXISTS, information_schema) instead of assuming an empty
+database. Once released, a migration must never change; add a new one.
+
+Usage:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status
+"""
+
+import argparse
+
+import mysql.connector
+
+import db
+
+# Held while migrating so concurrent starts apply each migration once
+MIGRATION_LOCK = "vocab_manager_schema"
+MIGRATION_LOCK_TIMEOUT = 60
+
+ER_NO_SUCH_TABLE = 1146
+
+# FULLTEXT index over word and meaning, added by migration 3 and dropped by 9
+FULLTEXT_INDEX = "ft_word_meaning"
+
+# (version, description, apply(cursor)) in the order they run
+MIGRATIONS = []
+
+
+class MigrationError(Exception):
+    """A migration could not be applied."""
+
+
+def migration(version):
+    """Decorator registering ``apply(cursor)`` as migration ``version``."""
+
+    def decorator(apply):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migration {version} is out of order.")
+        MIGRATIONS.append((version, apply.__doc__.strip(), apply))
+        return apply
+
+    return decorator
+
+
+def _exists(cursor, query, params):
+    cursor.execute(query, params)
+    return cursor.fetchone()[0] > 0
+
+
+def has_index(cursor, table, column=None, index=None, unique=False):
+    """Return True if ``table`` has an index named ``index`` or led by ``column``."""
+    query = (
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s"
+    )
+    params = [table]
+    if index is not None:
+        query += " AND index_name = %s"
+        params.append(index)
+    if column is not None:
+        query += " AND column_name = %s AND seq_in_index = 1"
+        params.append(column)
+    if unique:
+        query += " AND non_unique = 0"
+    return _exists(cursor, query, params)
+
+
+def has_column(cursor, table, column):
+    return _exists(
+        cursor,
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column),
+    )
+
+
+def has_trigger(cursor, name):
+    return _exists(
+        cursor,
+        "SELECT COUNT(*) FROM information_schema.triggers "
+        "WHERE trigger_schema = DATABASE() AND trigger_name = %s",
+        (name,),
+    )
+
+
+# Claim an activation slot or refuse the insert. The UPDATE locks the license
+# row, so concurrent activations of one key run one at a time.
+CLAIM_TRIGGER = """
+    CREATE TRIGGER machine_activations_claim
+    BEFORE INSERT ON machine_activations FOR EACH ROW
+    BEGIN
+        UPDATE license_keys
+        SET activation_count = activation_count + 1
+        WHERE license_key = NEW.license_key
+            AND status = 'active'
+            AND (expiry_date IS NULL OR expiry_date >= CURDATE())
+            AND activation_count < max_machines;
+        IF ROW_COUNT() = 0 THEN
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'License key cannot be activated.';
+        END IF;
+    END
+"""
+
+# Free the slot when an activation is removed.
+RELEASE_TRIGGER = """
+    CREATE TRIGGER machine_activations_release
+    AFTER DELETE ON machine_activations FOR EACH ROW
+        UPDATE license_keys
+        SET activation_count = activation_count - 1
+        WHERE license_key = OLD.license_key
+"""
+
+
+@migration(1)
+def create_vocabulary(cursor):
+    """Create the vocabulary table."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vocabulary (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            word VARCHAR(255) NOT NULL,
+            meaning TEXT NOT NULL
+        )
+    """
+    )
+
+
+@migration(2)
+def unique_word(cursor):
+    """Make words unique."""
+    # Tables created by the old purge.py have no such index and may hold
+    # duplicate words, which purge.py removes.
+    if has_index(cursor, "vocabulary", column="word", unique=True):
+        return
+    try:
+        cursor.execute("ALTER TABLE vocabulary ADD UNIQUE KEY word (word)")
+    except mysql.connector.IntegrityError as e:
+        raise MigrationError(
+            f"The vocabulary has duplicate words; run purge.py first. ({e})"
+        ) from e
+
+
+@migration(3)
+def fulltext_word_meaning(cursor):
+    """Add the full-text index used by search."""
+    if not has_index(cursor, "vocabulary", index=FULLTEXT_INDEX):
+        cursor.execute(
+            f"ALTER TABLE vocabulary ADD FULLTEXT KEY {FULLTEXT_INDEX} (word, meaning)"
+        )
+
+
+@migration(4)
+def create_licenses(cursor):
+    """Create the license_keys and machine_activations tables."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS license_keys (
+            key_id INT AUTO_INCREMENT PRIMARY KEY,
+            license_key VARCHAR(255) NOT NULL UNIQUE,
+            max_machines INT NOT NULL DEFAULT 1,
+            status ENUM('active', 'revoked') NOT NULL DEFAULT 'active',
+            expiry_date DATE DEFAULT NULL
+        )
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS machine_activations (
+            activation_id INT AUTO_INCREMENT PRIMARY KEY,
+            license_key VARCHAR(255) NOT NULL,
+            machine_id VARCHAR(255) NOT NULL,
+            activation_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(license_key, machine_id),
+            FOREIGN KEY (license_key) REFERENCES license_keys(license_key)
+        )
+    """
+    )
+
+
+@migration(5)
+def guarded_activation(cursor):
+    """Count activations per license and guard them with triggers."""
+    if not has_column(cursor, "license_keys", "activation_count"):
+        cursor.execute(
+            "ALTER TABLE license_keys "
+            "ADD COLUMN activation_count INT NOT NULL DEFAULT 0"
+        )
+        cursor.execute(
+            "UPDATE license_keys l SET activation_count = ("
+            "SELECT COUNT(*) FROM machine_activations a "
+            "WHERE a.license_key = l.license_key)"
+        )
+
+    # Startup looks activations up by machine alone.
+    if not has_index(cursor, "machine_activations", column="machine_id"):
+        cursor.execute("ALTER TABLE machine_activations ADD KEY machine_id (machine_id)")
+
+    # The triggers need max_machines, which an old new.py table lacks;
+    # migration 8 converts such a table and then adds them.
+    if has_column(cursor, "license_keys", "machine_id"):
+        return
+    if not has_trigger(cursor, "machine_activations_claim"):
+        cursor.execute(CLAIM_TRIGGER)
+    if not has_trigger(cursor, "machine_activations_release"):
+        cursor.execute(RELEASE_TRIGGER)
+
+
+@migration(6)
+def create_user_vocabularies(cursor):
+    """Create the per-license word lists used by new.py."""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_vocabularies (
+            user_id INT AUTO_INCREMENT PRIMARY KEY,
+            license_key_id INT,
+            word VARCHAR(255) NOT NULL,
+            meaning TEXT NOT NULL,
+            KEY license_word (license_key_id, word),
+            FOREIGN KEY (license_key_id) REFERENCES license_keys(key_id)
+                ON DELETE CASCADE
+        )
+    """
+    )
+    # new.py looks words up per license.
+    if not has_index(cursor, "user_vocabularies", index="license_word"):
+        cursor.execute(
+            "ALTER TABLE user_vocabularies "
+            "ADD KEY license_word (license_key_id, word)"
+        )
+
+
+@migration(7)
+def vocabulary_change_log(cursor):
+    """Log vocabulary changes for incremental sync."""
+    # One row per inserted, updated or deleted word. replica.py reads the
+    # rows after the last seq it applied (see CHANGE_SETTLE_TIME there).
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS vocabulary_changes (
+            seq BIGINT AUTO_INCREMENT PRIMARY KEY,
+            vocabulary_id INT NOT NULL,
+            changed_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            KEY changed_at (changed_at)
+        )
+    """
+    )
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        name = f"vocabulary_log_{event.lower()}"
+        if not has_trigger(cursor, name):
+            cursor.execute(
+                f"""
+                CREATE TRIGGER {name}
+                AFTER {event} ON vocabulary FOR EACH ROW
+                    INSERT INTO vocabulary_changes (vocabulary_id) VALUES ({row}.id)
+            """
+            )
+
+
+@migration(8)
+def convert_legacy_licenses(cursor):
+    """Move old new.py activations to machine_activations."""
+    # new.py used to keep one activation on the license row itself
+    # (machine_id, status 'used') and its limit in max_computers, so a
+    # license_keys table it created skipped migration 4's layout.
+    if not has_column(cursor, "license_keys", "machine_id"):
+        return
+
+    legacy_limit = has_column(cursor, "license_keys", "max_computers")
+    if not has_column(cursor, "license_keys", "max_machines"):
+        cursor.execute(
+            "ALTER TABLE license_keys ADD COLUMN max_machines INT NOT NULL DEFAULT 1"
+        )
+        if legacy_limit:
+            cursor.execute("UPDATE license_keys SET max_machines = max_computers")
+
+    # The claim trigger would refuse the copies ('used' isn't 'active'), and
+    # the counts are recomputed below anyway.
+    cursor.execute("DROP TRIGGER IF EXISTS machine_activations_claim")
+    cursor.execute("DROP TRIGGER IF EXISTS machine_activations_release")
+    cursor.execute(
+        """
+        INSERT INTO machine_activations (license_key, machine_id)
+        SELECT license_key, machine_id FROM license_keys
+        WHERE machine_id IS NOT NULL AND machine_id != ''
+        ON DUPLICATE KEY UPDATE activation_id = activation_id
+    """
+    )
+    cursor.execute("UPDATE license_keys SET status = 'active' WHERE status = 'used'")
+    cursor.execute(
+        "ALTER TABLE license_keys "
+        "MODIFY status ENUM('active', 'revoked') NOT NULL DEFAULT 'active', "
+        "DROP COLUMN machine_id"
+        + (", DROP COLUMN max_computers" if legacy_limit else "")
+    )
+    cursor.execute(
+        "UPDATE license_keys l SET activation_count = ("
+        "SELECT COUNT(*) FROM machine_activations a "
+        "WHERE a.license_key = l.license_key)"
+    )
+    cursor.execute(CLAIM_TRIGGER)
+    cursor.execute(RELEASE_TRIGGER)
+
+
+@migration(9)
+def drop_fulltext_word_meaning(cursor):
+    """Drop the full-text index search no longer uses."""
+    # Search runs on the replica's FTS5 table, so nothing queries the index,
+    # and every insert and update of a meaning still paid to maintain it.
+    if has_index(cursor, "vocabulary", index=FULLTEXT_INDEX):
+        cursor.execute(f"ALTER TABLE vocabulary DROP INDEX {FULLTEXT_INDEX}")
+
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(cursor):
+    """Return the applied schema version, 0 for a database without one."""
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except mysql.connector.Error as e:
+        if e.errno != ER_NO_SUCH_TABLE:
+            raise
+        return 0
+    return cursor.fetchone()[0] or 0
+
+
+def migrate(config=None, target=None):
+    """Apply pending migrations up to ``target`` (default: all).
+
+    Returns the list of versions applied, empty when the schema was current.
+    """
+    target = LATEST_VERSION if target is None else target
+    with db.cursor(config) as cursor:
+        if current_version(cursor) >= target:
+            return []
+
+        cursor.execute(
+            "SELECT GET_LOCK(%s, %s)", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT)
+        )
+        if cursor.fetchone()[0] != 1:
+            raise MigrationError("Timed out waiting for another client to migrate.")
+        try:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """
+            )
+            # Another client may have migrated while we waited for the lock.
+            version = current_version(cursor)
+            applied = []
+            for number, description, apply in MIGRATIONS:
+                if number <= version or number > target:
+                    continue
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) "
+                    "VALUES (%s, %s)",
+                    (number, description),
+                )
+                applied.append(number)
+            return applied
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+            cursor.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply schema migrations.")
+    parser.add_argument(
+        "--status", action="store_true", help="only show the schema version"
+    )
+    args = parser.parse_args()
+
+    if args.status:
+        with db.cursor() as cursor:
+            version = current_version(cursor)
+        print(f"Schema version {version} of {LATEST_VERSION}.")
+    else:
+        applied = migrate()
+        if applied:
+            print(f"Applied migration(s) {', '.join(map(str, applied))}.")
+        else:
+            print(f"Schema is current (version {LATEST_VERSION}).")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import mysql.connector
-import requests
-import os
 import uuid
-from dotenv import load_dotenv
 from datetime import datetime
 
-load_dotenv()
+import db
+import dictionary
+import licensing
+import migrations
+from config import DB_CONFIG as BASE_DB_CONFIG
 
-DB_CONFIG = {
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "database": "vocab-manager-dev",
-}
-
-DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+DB_CONFIG = {**BASE_DB_CONFIG, "database": "vocab-manager-dev"}
 
 
 def generate_machine_id():
@@ -32,124 +26,13 @@ MACHINE_ID = generate_machine_id()
 
 
 def init_db():
-    """Initialize the database schema with the required tables."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # Create vocabulary table
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            word VARCHAR(255) NOT NULL,
-            meaning TEXT NOT NULL,
-            UNIQUE(word)
-        )
-    """
-    )
-
-    # Create license_keys table with machine_id feature and max_computers column
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS license_keys (
-            key_id INT AUTO_INCREMENT PRIMARY KEY,
-            license_key VARCHAR(255) NOT NULL UNIQUE,
-            machine_id VARCHAR(255),
-            status ENUM('active', 'used', 'revoked') NOT NULL DEFAULT 'active',
-            expiry_date DATE DEFAULT NULL,
-            max_computers INT NOT NULL DEFAULT 1  -- New column to track number of computers it can activate
-        )
-    """
-    )
-
-    # Create user_vocabularies table to link words with users and license keys
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS user_vocabularies (
-            user_id INT AUTO_INCREMENT PRIMARY KEY,
-            license_key_id INT,  -- Foreign key to the license_key
-            word VARCHAR(255) NOT NULL,
-            meaning TEXT NOT NULL,
-            FOREIGN KEY (license_key_id) REFERENCES license_keys(key_id) ON DELETE CASCADE
-        )
-    """
-    )
-
-    conn.close()
+    """Bring the database schema up to date."""
+    migrations.migrate(DB_CONFIG)
 
 
 def validate_license_key(license_key):
-    """Validate the license key and ensure it matches the machine."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    # Check if the current machine has a used license
-    cursor.execute(
-        "SELECT license_key FROM license_keys WHERE machine_id = %s AND status = 'used'",
-        (MACHINE_ID,),
-    )
-    used_license = cursor.fetchone()
-
-    if used_license:
-        conn.close()
-        return (
-            True,
-            "Machine is already associated with a used license, skipping validation.",
-        )
-
-    # Proceed with regular license validation
-    cursor.execute(
-        "SELECT status, expiry_date, machine_id, max_computers FROM license_keys WHERE license_key = %s",
-        (license_key,),
-    )
-    result = cursor.fetchone()
-
-    if not result:
-        conn.close()
-        return False, "Invalid license key."
-
-    status, expiry_date, machine_id, max_computers = result
-
-    # Check status
-    if status != "active":
-        conn.close()
-        return False, "License key is not active."
-    elif machine_id and machine_id != MACHINE_ID:
-        conn.close()
-        return False, "License key is already linked to another machine."
-
-    # Check if the number of activated computers exceeds max_computers
-    cursor.execute(
-        "SELECT COUNT(DISTINCT machine_id) FROM license_keys WHERE license_key = %s",
-        (license_key,),
-    )
-    active_computers = cursor.fetchone()[0]
-
-    if active_computers >= max_computers:
-        conn.close()
-        return (
-            False,
-            "This license has already been activated on the maximum number of computers.",
-        )
-
-    # Mark as used and associate with the machine if valid
-    cursor.execute(
-        "UPDATE license_keys SET status = 'used', machine_id = %s WHERE license_key = %s",
-        (MACHINE_ID, license_key),
-    )
-    conn.commit()
-    conn.close()
-    return True, "License key validated successfully and linked to this machine."
-
-
-def fetch_meaning(word):
-    """Fetch the meaning of a word using the dictionary API."""
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    return data[0]["meanings"][0]["definitions"][0]["definition"]
+    """Validate the license key and activate it for this machine."""
+    return licensing.activate(license_key, MACHINE_ID, DB_CONFIG)
 
 
 def add_word(event=None):
@@ -161,18 +44,15 @@ def add_word(event=None):
         messagebox.showwarning("Input Error", "Please provide a word.")
         return
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
     # Check if the word already exists for the user's license
-    cursor.execute(
-        "SELECT COUNT(*) FROM user_vocabularies WHERE license_key_id = %s AND word = %s",
-        (license_key_id, word),
-    )
-    exists = cursor.fetchone()[0]
+    with db.cursor(DB_CONFIG) as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM user_vocabularies WHERE license_key_id = %s AND word = %s",
+            (license_key_id, word),
+        )
+        exists = cursor.fetchone()[0]
 
     if exists:
-        conn.close()
         messagebox.showerror(
             "Error",
             f"The word '{word}' already exists in the database for this license.",
@@ -181,7 +61,8 @@ def add_word(event=None):
 
     if not meaning:
         set_cursor("wait")  # Show loading cursor
-        meaning = fetch_meaning(word)
+        entry = dictionary.lookup(word)
+        meaning = entry.meaning if entry else None
         set_cursor("")  # Reset cursor
         if not meaning:
             messagebox.showwarning(
@@ -190,21 +71,19 @@ def add_word(event=None):
             return
 
     try:
-        cursor.execute(
-            "INSERT INTO user_vocabularies (license_key_id, word, meaning) VALUES (%s, %s, %s)",
-            (license_key_id, word, meaning),
-        )
-        conn.commit()
-        conn.close()
-        messagebox.showinfo(
-            "Success", f"'{word}' added successfully to your vocabulary!"
-        )
-        entry_word.delete(0, tk.END)
-        entry_meaning.delete(0, tk.END)
-        load_vocabulary()
+        with db.transaction(DB_CONFIG) as cursor:
+            cursor.execute(
+                "INSERT INTO user_vocabularies (license_key_id, word, meaning) VALUES (%s, %s, %s)",
+                (license_key_id, word, meaning),
+            )
     except mysql.connector.Error as e:
-        conn.close()
         messagebox.showerror("Database Error", f"An error occurred: {e}")
+        return
+
+    messagebox.showinfo("Success", f"'{word}' added successfully to your vocabulary!")
+    entry_word.delete(0, tk.END)
+    entry_meaning.delete(0, tk.END)
+    load_vocabulary()
 
 
 def edit_word():
@@ -230,13 +109,11 @@ def edit_word():
     entry_new_meaning = ttk.Entry(edit_window, font=("Verdana", 12))
     entry_new_meaning.pack(pady=5, padx=10, fill=tk.X)
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT meaning FROM vocabulary WHERE word = %s", (word,))
-    old_meaning = cursor.fetchone()
+    with db.cursor(DB_CONFIG) as cursor:
+        cursor.execute("SELECT meaning FROM vocabulary WHERE word = %s", (word,))
+        old_meaning = cursor.fetchone()
     if old_meaning:
         entry_new_meaning.insert(0, old_meaning[0])
-    conn.close()
 
     def save_changes():
         new_word = entry_new_word.get().strip()
@@ -248,21 +125,19 @@ def edit_word():
             )
             return
 
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
         try:
-            cursor.execute(
-                "UPDATE vocabulary SET word = %s, meaning = %s WHERE word = %s",
-                (new_word, new_meaning, word),
-            )
-            conn.commit()
-            conn.close()
-            messagebox.showinfo("Success", "Word updated successfully!")
-            edit_window.destroy()
-            load_vocabulary()
+            with db.transaction(DB_CONFIG) as cursor:
+                cursor.execute(
+                    "UPDATE vocabulary SET word = %s, meaning = %s WHERE word = %s",
+                    (new_word, new_meaning, word),
+                )
         except mysql.connector.IntegrityError:
-            conn.close()
             messagebox.showerror("Error", "This word already exists in the database.")
+            return
+
+        messagebox.showinfo("Success", "Word updated successfully!")
+        edit_window.destroy()
+        load_vocabulary()
 
     ttk.Button(edit_window, text="Save Changes", command=save_changes).pack(pady=10)
 
@@ -276,11 +151,8 @@ def delete_word():
         return
 
     word = tree_vocabulary.item(selected_item, "values")[0]
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM vocabulary WHERE word = %s", (word,))
-    conn.commit()
-    conn.close()
+    with db.transaction(DB_CONFIG) as cursor:
+        cursor.execute("DELETE FROM vocabulary WHERE word = %s", (word,))
 
     messagebox.showinfo("Success", "Word deleted successfully.")
     load_vocabulary()
@@ -293,16 +165,14 @@ def on_search():
 
 def load_vocabulary(search_term=""):
     """Load vocabulary words and meanings into the Treeview."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
     query = "SELECT word, meaning FROM vocabulary"
-    if search_term:
-        query += " WHERE word LIKE %s"
-        cursor.execute(query, (f"%{search_term}%",))
-    else:
-        cursor.execute(query)
-    words = cursor.fetchall()
-    conn.close()
+    with db.cursor(DB_CONFIG) as cursor:
+        if search_term:
+            query += " WHERE word LIKE %s"
+            cursor.execute(query, (f"%{search_term}%",))
+        else:
+            cursor.execute(query)
+        words = cursor.fetchall()
 
     for row in tree_vocabulary.get_children():
         tree_vocabulary.delete(row)
@@ -319,18 +189,8 @@ def set_cursor(cursor_type):
 
 def show_license_key_entry():
     """Prompt user to enter a license key for validation or skip if already validated."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
     # Check if the machine already has a valid license
-    cursor.execute(
-        "SELECT status FROM license_keys WHERE machine_id = %s AND status IN ('active', 'used')",
-        (MACHINE_ID,),
-    )
-    result = cursor.fetchone()
-    conn.close()
-
-    if result:
+    if licensing.find_activation(MACHINE_ID, DB_CONFIG):
         # If a valid license is found, skip the license key input
         root.deiconify()  # Show the main application window
         return
@@ -364,28 +224,6 @@ def show_license_key_entry():
     license_window.protocol("WM_DELETE_WINDOW", root.destroy)
 
 
-def fetch_all_definitions(word):
-    """Fetch all available definitions of a word using the dictionary API."""
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-
-    # Extract all definitions
-    definitions = []
-    for meaning in data[0]["meanings"]:
-        part_of_speech = meaning.get("partOfSpeech", "Unknown")
-        definitions.extend(
-            {
-                "partOfSpeech": part_of_speech,
-                "definition": definition["definition"],
-            }
-            for definition in meaning["definitions"]
-        )
-    return definitions
-
-
 def view_definitions():
     """Display all definitions for the selected word in a popup window."""
     selected_item = tree_vocabulary.selection()
@@ -396,9 +234,9 @@ def view_definitions():
         return
 
     word = tree_vocabulary.item(selected_item, "values")[0]
-    definitions = fetch_all_definitions(word)
+    entry = dictionary.lookup(word)
 
-    if not definitions:
+    if not entry or not entry.definitions:
         messagebox.showerror(
             "Error", "Could not fetch definitions for the selected word."
         )
@@ -428,10 +266,13 @@ def view_definitions():
     text_widget.config(yscrollcommand=scrollbar.set)
 
     # Insert definitions into the text widget
-    for idx, definition in enumerate(definitions, start=1):
-        part_of_speech = definition["partOfSpeech"]
-        definition_text = definition["definition"]
-        text_widget.insert(tk.END, f"{idx}. ({part_of_speech}) {definition_text}\n\n")
+    text_widget.insert(
+        tk.END,
+        "".join(
+            f"{idx}. ({definition.part_of_speech}) {definition.text}\n\n"
+            for idx, definition in enumerate(entry.definitions, start=1)
+        ),
+    )
 
     text_widget.config(state=tk.DISABLED)  # Make the text widget read-only
 
@@ -442,19 +283,19 @@ def view_definitions():
 
 def show_license_status():
     """Display the license status linked to the current machine."""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "SELECT license_key, status, expiry_date FROM license_keys WHERE machine_id = %s",
-        (MACHINE_ID,),
-    )
-    row = cursor.fetchone()
-    conn.close()
+    with db.cursor(DB_CONFIG) as cursor:
+        cursor.execute(
+            "SELECT l.license_key, l.status, l.expiry_date "
+            "FROM machine_activations a "
+            "JOIN license_keys l ON l.license_key = a.license_key "
+            "WHERE a.machine_id = %s",
+            (MACHINE_ID,),
+        )
+        row = cursor.fetchone()
 
     if not row:
         messagebox.showinfo(
-            "License Status", "No active or used license found for this machine."
+            "License Status", "No license is activated on this machine."
         )
         return
 
@@ -475,8 +316,9 @@ def show_about():
 def check_db_connection():
     """Test the database connection."""
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        conn.close()
+        with db.cursor(DB_CONFIG) as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
         messagebox.showinfo("Database Connection", "Database connection is active.")
     except mysql.connector.Error as e:
         messagebox.showerror("Database Connection", f"Database connection failed: {e}")
@@ -588,3 +430,4 @@ show_license_key_entry()
 load_vocabulary()
 
 root.mainloop()
+db.close_all()
@@ -1,51 +1,23 @@
 import tkinter as tk
 from tkinter import messagebox, ttk
 import mysql.connector
-import requests
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
+import db
+import dictionary
+import migrations
+from vocabulary import preview
+from vocabview import VirtualTreeview
+from wordindex import IndexQuery, WordIndex
 
-DB_CONFIG = {
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "database": os.environ["DB_NAME"],
-}
+# Quiet period after the last keystroke before the list is filtered
+SEARCH_DEBOUNCE_MS = 120
 
-DICTIONARY_API_URL = "https://api.dictionaryapi.dev/api/v2/entries/en/"
+# In-memory index of the vocabulary that live search runs against
+word_index = WordIndex()
+search_after_id = None
 
 def init_db():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            word VARCHAR(255) NOT NULL,
-            meaning TEXT NOT NULL,
-            UNIQUE(word)
-        )
-    """
-    )
-    conn.close()
-
-def fetch_meaning(word):
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    return data[0]["meanings"][0]["definitions"][0]["definition"]
-
-def fetch_full_details(word):
-    url = f"{DICTIONARY_API_URL}{word.lower()}"
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    return data[0]
+    migrations.migrate()
 
 def add_word(event=None):
     word = entry_word.get()
@@ -56,7 +28,8 @@ def add_word(event=None):
         return
     
     if not meaning:
-        meaning = fetch_meaning(word)
+        entry = dictionary.lookup(word)
+        meaning = entry.meaning if entry else None
 
     if not meaning:
         messagebox.showwarning(
@@ -64,30 +37,29 @@ def add_word(event=None):
         )
         return
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
     try:
-        cursor.execute(
-            "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s)", (word, meaning)
-        )
-        conn.commit()
+        with db.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s)",
+                (word, meaning),
+            )
+            row = (cursor.lastrowid, word, preview(meaning))
+        word_index.add(row)
+        vocabulary_view.insert_row(row)
         messagebox.showinfo("Success", "Word added successfully")
     except mysql.connector.IntegrityError:
         messagebox.showerror("Error", "Word already exists in the database")
-    conn.close()
 
     entry_word.delete(0, tk.END)
     entry_meaning.delete(0, tk.END)
 
-    load_vocabulary()
-
 def update_word():
-    selected_item = listbox_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         messagebox.showwarning("Selection Error", "Please select an item to update")
         return
 
-    word_id = listbox_vocabulary.item(selected_item)["values"][0]
+    word_id = selected[0]
     new_word = entry_word.get()
     new_meaning = entry_meaning.get()
 
@@ -95,58 +67,57 @@ def update_word():
         messagebox.showwarning("Input Error", "Please fill in both fields")
         return
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE vocabulary SET word = %s, meaning = %s WHERE id = %s",
-        (new_word, new_meaning, word_id),
-    )
-    conn.commit()
-    conn.close()
+    with db.transaction() as cursor:
+        cursor.execute(
+            "UPDATE vocabulary SET word = %s, meaning = %s WHERE id = %s",
+            (new_word, new_meaning, word_id),
+        )
+
+    row = (word_id, new_word, preview(new_meaning))
+    word_index.update(row)
+    vocabulary_view.update_row(selected, row)
 
     entry_word.delete(0, tk.END)
     entry_meaning.delete(0, tk.END)
 
     messagebox.showinfo("Success", "Word updated successfully")
-    load_vocabulary()
 
 def delete_word(event=None):
-    selected_item = listbox_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         messagebox.showwarning("Selection Error", "Please select an item to delete")
         return
 
-    word_id = listbox_vocabulary.item(selected_item)["values"][0]
+    word_id = selected[0]
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM vocabulary WHERE id = %s", (word_id,))
-    conn.commit()
-    conn.close()
+    with db.transaction() as cursor:
+        cursor.execute("DELETE FROM vocabulary WHERE id = %s", (word_id,))
 
+    word_index.remove(word_id)
+    vocabulary_view.remove_row(selected)
     messagebox.showinfo("Success", "Word deleted successfully")
-    load_vocabulary()
 
-def load_vocabulary(search_term=""):
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    if search_term:
-        cursor.execute(
-            "SELECT id, word, meaning FROM vocabulary WHERE word LIKE %s",
-            (f"%{search_term}%",),
-        )
-    else:
-        cursor.execute("SELECT id, word, meaning FROM vocabulary")
-    words = cursor.fetchall()
-    conn.close()
+def load_vocabulary():
+    """Re-read the vocabulary into the search index and show the current search."""
+    global word_index
+    word_index = WordIndex.load()
+    run_search()
 
-    listbox_vocabulary.delete(*listbox_vocabulary.get_children())
-    for word in words:
-        listbox_vocabulary.insert("", "end", values=word)
+def run_search():
+    global search_after_id
+    search_after_id = None
+    vocabulary_view.set_source(IndexQuery(word_index, entry_search.get()))
 
 def search_vocabulary(event=None):
-    search_term = entry_search.get()
-    load_vocabulary(search_term)
+    # Filter once typing pauses; a newer keystroke cancels the pending search,
+    # so results never arrive out of order.
+    global search_after_id
+    source = vocabulary_view.source
+    if source is not None and source.term == entry_search.get():
+        return
+    if search_after_id is not None:
+        root.after_cancel(search_after_id)
+    search_after_id = root.after(SEARCH_DEBOUNCE_MS, run_search)
 
 def resize_columns(event):
     total_width = listbox_vocabulary.winfo_width()
@@ -155,26 +126,15 @@ def resize_columns(event):
     listbox_vocabulary.column("Meaning", width=int(total_width * 0.70))
 
 def show_word_details(event):
-    selected_item = listbox_vocabulary.selection()
-    if not selected_item:
+    selected = vocabulary_view.selected_row()
+    if not selected:
         if side_panel.winfo_ismapped():
             side_panel.pack_forget()
         return
 
-    word = listbox_vocabulary.item(selected_item)["values"][1]
-    if details := fetch_full_details(word):
-        detail_text = f"Word: {details['word']}\n\nPhonetic: {details.get('phonetic', 'N/A')}\n\nOrigin: {details.get('origin', 'N/A')}\n\nMeanings:\n"
-
-        for meaning in details["meanings"]:
-            part_of_speech = meaning.get("partOfSpeech", "N/A")
-            definitions = meaning["definitions"]
-            detail_text += f"\nPart of Speech: {part_of_speech}\n"
-            for definition in definitions:
-                detail_text += f" - {definition['definition']}\n"
-                if "example" in definition:
-                    detail_text += f"   Example: {definition['example']}\n"
-
-        detail_label.config(text=detail_text)
+    word = selected[1]
+    if entry := dictionary.lookup(word):
+        detail_label.config(text=entry.details_text())
     else:
         detail_label.config(text="Unknown word")
 
@@ -187,16 +147,14 @@ def show_word_details(event):
 
 def close_panel(event=None):
     # Deselect any selected item
-    listbox_vocabulary.selection_remove(*listbox_vocabulary.selection())
+    vocabulary_view.clear_selection()
     # Hide the side panel
     if side_panel.winfo_ismapped():
         side_panel.pack_forget()
 
 def search_dictionary():
-    selected_item = listbox_vocabulary.selection()
-    selected_word = ""
-    if selected_item:
-        selected_word = listbox_vocabulary.item(selected_item)["values"][1]
+    selected = vocabulary_view.selected_row()
+    selected_word = selected[1] if selected else ""
     
     search_window = tk.Toplevel(root)
     search_window.title("Search Dictionary")
@@ -218,17 +176,9 @@ def search_dictionary():
 
     def perform_search(event=None):
         word = entry_search_word.get()
-        details = fetch_full_details(word)
-        if details:
-            detail_text = f"Word: {details['word']}\n\nPhonetic: {details.get('phonetic', 'N/A')}\n\nOrigin: {details.get('origin', 'N/A')}\n\nMeanings:\n"
-            for meaning in details["meanings"]:
-                part_of_speech = meaning.get("partOfSpeech", "N/A")
-                definitions = meaning["definitions"]
-                detail_text += f"\nPart of Speech: {part_of_speech}\n"
-                for definition in definitions:
-                    detail_text += f" - {definition['definition']}\n"
-                    if "example" in definition:
-                        detail_text += f"   Example: {definition['example']}\n"
+        entry = dictionary.lookup(word)
+        if entry:
+            detail_text = entry.details_text()
         else:
             detail_text = "Unknown word"
 
@@ -302,12 +252,22 @@ listbox_vocabulary.heading("Meaning", text="Meaning", anchor="w")
 listbox_vocabulary.column("ID", anchor="w", width=int(frame.winfo_width() * 0.10))
 listbox_vocabulary.column("Word", anchor="w", width=int(frame.winfo_width() * 0.20))
 listbox_vocabulary.column("Meaning", anchor="w", width=int(frame.winfo_width() * 0.70))
+scrollbar_vocabulary = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+scrollbar_vocabulary.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
 listbox_vocabulary.pack(fill=tk.BOTH, expand=True, pady=10)
 
 listbox_vocabulary.bind("<Delete>", delete_word)
-listbox_vocabulary.bind("<<TreeviewSelect>>", show_word_details)
 listbox_vocabulary.bind("<Configure>", resize_columns)
 
+# Only the visible rows are Treeview items (row id as item id); the view's own
+# bindings are added first so show_word_details sees the updated selection.
+vocabulary_view = VirtualTreeview(
+    listbox_vocabulary,
+    scrollbar_vocabulary,
+    format_row=lambda row: (str(row[0]), row[:3]),
+)
+listbox_vocabulary.bind("<<TreeviewSelect>>", show_word_details, add="+")
+
 frame_add = ttk.Frame(main_frame)
 frame_add.pack(fill=tk.X, pady=5)
 lbl_word = ttk.Label(frame_add, text="Word:")
@@ -361,3 +321,4 @@ load_vocabulary()
 root.bind("<Escape>", close_panel)
 
 root.mainloop()
+db.close_all()
@@ -0,0 +1,176 @@
+"""Minimal streaming PDF writer.
+
+FPDF keeps every page of a document in memory until output(), so exporting a
+large vocabulary grows with the table. This writer emits each page to the
+file as soon as it is finished; only the byte offsets of the objects written
+so far are kept, so memory stays flat whatever the page count.
+
+It supports what the vocabulary export needs: A4 pages, the built-in
+Helvetica fonts (WinAnsi encoded) and word-wrapped text.
+"""
+
+import zlib
+
+# A4 in points; 1 mm = 72 / 25.4 pt
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MM = 72 / 25.4
+
+FONTS = {"regular": ("F1", "Helvetica"), "bold": ("F2", "Helvetica-Bold")}
+
+# Helvetica advance widths (1/1000 em) for printable ASCII, from the AFM;
+# other characters use the average lowercase width.
+_ASCII_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278,
+    278, 556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584,
+    584, 556, 1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556,
+    833, 722, 778, 667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278,
+    278, 278, 469, 556, 333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222,
+    500, 222, 833, 556, 556, 556, 556, 333, 500, 278, 556, 500, 722, 500, 500,
+    500, 334, 260, 334, 584,
+)  # fmt: skip
+CHAR_WIDTHS = {chr(32 + index): width for index, width in enumerate(_ASCII_WIDTHS)}
+DEFAULT_WIDTH = 556
+
+
+def text_width(text, size):
+    """Width of ``text`` in points when set in Helvetica at ``size``."""
+    return sum(CHAR_WIDTHS.get(char, DEFAULT_WIDTH) for char in text) * size / 1000
+
+
+def wrap(text, width, size):
+    """Split ``text`` into lines no wider than ``width`` points.
+
+    Breaks at spaces where possible (and always at newlines); a single word
+    wider than the line is broken between characters.
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if text_width(candidate, size) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            line = ""
+            for char in word:
+                if line and text_width(line + char, size) > width:
+                    lines.append(line)
+                    line = ""
+                line += char
+        lines.append(line)
+    return lines
+
+
+def _escape(text):
+    data = text.encode("cp1252", "replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class PdfWriter:
+    """Write a PDF to a binary ``stream`` one page at a time.
+
+    Call ``text()`` to place lines on the current page, ``new_page()`` to start
+    the next one and ``close()`` to finish the document. Coordinates are in
+    points from the top-left corner.
+    """
+
+    # Objects reserved up front: catalog, page tree, two fonts
+    _CATALOG, _PAGES, _FIRST_FONT = 1, 2, 3
+
+    def __init__(self, stream, compress=True):
+        self.stream = stream
+        self.compress = compress
+        self._offsets = {}
+        self._kids = []
+        self._next_object = self._FIRST_FONT + len(FONTS)
+        self._content = []
+        self._position = 0
+
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        for number, (_, base_font) in enumerate(FONTS.values(), self._FIRST_FONT):
+            self._object(
+                number,
+                f"<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} "
+                "/Encoding /WinAnsiEncoding >>".encode(),
+            )
+
+    def text(self, x, y, text, size, style="regular"):
+        """Draw one line of ``text`` with its baseline at (``x``, ``y``)."""
+        font = FONTS[style][0]
+        self._content.append(
+            b"BT /%s %.2f Tf %.2f %.2f Td (%s) Tj ET"
+            % (font.encode(), size, x, PAGE_HEIGHT - y, _escape(text))
+        )
+
+    def new_page(self):
+        self._flush_page()
+
+    @property
+    def page_count(self):
+        return len(self._kids) + 1
+
+    def close(self):
+        """Write the last page, the page tree and the cross-reference table."""
+        if self._content or not self._kids:
+            self._flush_page()
+
+        kids = " ".join(f"{number} 0 R" for number in self._kids)
+        self._object(
+            self._PAGES,
+            f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>".encode(),
+        )
+        self._object(
+            self._CATALOG, f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>".encode()
+        )
+
+        size = self._next_object
+        xref = self._position
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        lines.extend(
+            f"{self._offsets[number]:010d} 00000 n \n" for number in range(1, size)
+        )
+        lines.append(
+            f"trailer\n<< /Size {size} /Root {self._CATALOG} 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n"
+        )
+        self._write("".join(lines).encode())
+
+    def _flush_page(self):
+        content = b"\n".join(self._content)
+        self._content = []
+        if self.compress:
+            content = zlib.compress(content)
+            header = b"<< /Length %d /Filter /FlateDecode >>" % len(content)
+        else:
+            header = b"<< /Length %d >>" % len(content)
+        contents = self._allocate()
+        self._object(contents, header + b"\nstream\n" + content + b"\nendstream")
+
+        fonts = " ".join(
+            f"/{name} {number} 0 R"
+            for number, (name, _) in enumerate(FONTS.values(), self._FIRST_FONT)
+        )
+        page = self._allocate()
+        self._object(
+            page,
+            f"<< /Type /Page /Parent {self._PAGES} 0 R "
+            f"/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << {fonts} >> >> /Contents {contents} 0 R >>".encode(),
+        )
+        self._kids.append(page)
+
+    def _allocate(self):
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def _object(self, number, body):
+        self._offsets[number] = self._position
+        self._write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+    def _write(self, data):
+        self.stream.write(data)
+        self._position += len(data)
@@ -0,0 +1,141 @@
+"""Idle-time prefetching of dictionary entries for the words on screen.
+
+While the user isn't interacting with the window, the words near the
+selection and the visible rows of the list are looked up in the background
+so that opening their definitions is answered from the cache instead of the
+network. Prefetching runs on its own small thread pool, separate from the
+one in lookups.py, so it never delays a lookup the user asked for. It pauses
+while the user types, clicks or scrolls, while user lookups are in flight,
+and for a growing delay after the dictionary fails to answer.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DICTIONARY_PREFETCH_WORKERS
+
+# Milliseconds without keyboard or mouse input before prefetching resumes
+IDLE_DELAY_MS = 750
+POLL_INTERVAL_MS = 100
+# Rows on each side of the selection prefetched before the rest of the screen
+ADJACENT_ROWS = 5
+PREFETCH_TIMEOUT = 10
+# Seconds to pause after a failed fetch, doubling up to the maximum
+FAILURE_BACKOFF = 30
+MAX_FAILURE_BACKOFF = 600
+
+
+def _prefetch(word):
+    # Runs on a worker thread. Returns False if the dictionary couldn't be
+    # reached (nothing was cached), True otherwise.
+    import dictionary
+
+    cache = dictionary.get_client().cache
+    if cache.contains_fresh(word):
+        # Parse it into the client's memory layer too.
+        dictionary.lookup(word)
+        return True
+    dictionary.lookup(word, timeout=(3.05, PREFETCH_TIMEOUT))
+    return cache.contains_fresh(word)
+
+
+class Prefetcher:
+    """Look up ``words()`` in the background whenever the window is idle.
+
+    ``words`` is called on the main thread and returns the words worth
+    prefetching, most likely to be opened first. ``busy``, if given, returns
+    True while prefetching should wait (e.g. user lookups are running). Each
+    word is prefetched at most once per session.
+    """
+
+    def __init__(self, root, words, busy=None, workers=DICTIONARY_PREFETCH_WORKERS):
+        self.root = root
+        self.words = words
+        self.busy = busy
+        self.workers = workers
+        self._executor = None
+        if workers > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="prefetch"
+            )
+        # word -> future of the prefetches in flight
+        self._in_flight = {}
+        self._attempted = set()
+        self._last_input = 0.0
+        self._paused_until = 0.0
+        self._backoff = FAILURE_BACKOFF
+        self._after_id = None
+
+    def start(self):
+        """Watch for input on every widget and prefetch once idle."""
+        if self._executor is None:
+            return
+        for sequence in ("<Key>", "<Button>", "<MouseWheel>"):
+            self.root.bind_all(sequence, self._on_input, add="+")
+        self.schedule()
+
+    def schedule(self, delay=IDLE_DELAY_MS):
+        """Check for words to prefetch after ``delay`` ms (e.g. the list changed)."""
+        if self._executor is None:
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(delay, self._tick)
+
+    def shutdown(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def note_input(self):
+        """Record user input that widgets keep from ``bind_all`` (e.g. the
+        list's own scrolling), delaying prefetching like any other input."""
+        self._last_input = time.monotonic()
+        self.schedule()
+
+    def _on_input(self, event):
+        self.note_input()
+
+    def _tick(self):
+        self._after_id = None
+        now = time.monotonic()
+        self._collect(now)
+
+        idle_for = (now - self._last_input) * 1000
+        if idle_for < IDLE_DELAY_MS:
+            self.schedule(int(IDLE_DELAY_MS - idle_for))
+            return
+        if now < self._paused_until:
+            self.schedule(int((self._paused_until - now) * 1000))
+            return
+        if self.busy is not None and self.busy():
+            self.schedule()
+            return
+
+        for word in self.words():
+            if len(self._in_flight) >= self.workers:
+                break
+            if word in self._attempted:
+                continue
+            self._attempted.add(word)
+            self._in_flight[word] = self._executor.submit(_prefetch, word)
+
+        if self._in_flight:
+            self.schedule(POLL_INTERVAL_MS)
+
+    def _collect(self, now):
+        for word, future in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[word]
+            if future.cancelled() or future.exception() or not future.result():
+                # Offline or rate limited: try this word again later and
+                # leave the dictionary alone for a while.
+                self._attempted.discard(word)
+                self._paused_until = now + self._backoff
+                self._backoff = min(self._backoff * 2, MAX_FAILURE_BACKOFF)
+            else:
+                self._backoff = FAILURE_BACKOFF
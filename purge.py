@@ -1,60 +1,115 @@
-import mysql.connector
-import os
-from dotenv import load_dotenv
+"""Remove duplicate words from the vocabulary, keeping the oldest row of each.
 
-load_dotenv()
+Usage: python purge.py [--dry-run] [--batch-size N]
 
-DB_CONFIG = {
-    "user": os.environ["DB_USER"],
-    "password": os.environ["DB_PASS"],
-    "host": os.environ["DB_HOST"],
-    "database": os.environ["DB_NAME"],
-}
+Duplicates are found and deleted inside MySQL: one ROW_NUMBER() pass marks
+every row after the first of each word, then they are deleted in batches of
+--batch-size rows, each its own short transaction, so locks are only held
+briefly. Words compare under the column's collation, the same rule the
+UNIQUE(word) index uses, which is added once the table is clean.
+"""
+
+import argparse
+
+import db
+import migrations
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Every row after the first (lowest id) of each word
+DUPLICATE_IDS = """
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (PARTITION BY word ORDER BY id) AS copy
+        FROM vocabulary
+    ) ranked
+    WHERE copy > 1
+"""
 
 def init_db():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
+    # Only create the table (migration 1): adding UNIQUE(word) has to wait
+    # until the duplicates are gone.
+    migrations.migrate(target=1)
+
+def count_duplicates(cursor):
+    """Return (duplicate rows, distinct words that have duplicates)."""
     cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS vocabulary (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            word VARCHAR(255) NOT NULL,
-            meaning TEXT NOT NULL
-        )
+        f"""
+        SELECT COUNT(*), COUNT(DISTINCT v.word)
+        FROM vocabulary v JOIN ({DUPLICATE_IDS}) dup ON dup.id = v.id
     """
     )
-    conn.close()
-
-def fetch_words():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, word FROM vocabulary")
-    words = cursor.fetchall()
-    conn.close()
-    return words
-
-def delete_word(word_id):
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM vocabulary WHERE id = %s", (word_id,))
-    conn.commit()
-    conn.close()
-
-def purge_duplicates():
-    words = fetch_words()
-    seen = set()
-    duplicates = []
-
-    for word_id, word in words:
-        if word in seen:
-            duplicates.append(word_id)
-        else:
-            seen.add(word)
-
-    for word_id in duplicates:
-        delete_word(word_id)
-
-    print(f"Purged {len(duplicates)} duplicate words from the database.")
-
-init_db()
-purge_duplicates()
+    return cursor.fetchone()
+
+def purge_duplicates(batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+
+        duplicates, words = count_duplicates(cursor)
+        if dry_run:
+            print(f"Would purge {duplicates} duplicate rows of {words} words.")
+            return duplicates
+
+        # Mark the duplicates once; the batches below then only touch those
+        # ids instead of re-ranking the whole table each time. The temporary
+        # table lives on this connection.
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS purge_ids")
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE purge_ids (id INT PRIMARY KEY) {DUPLICATE_IDS}"
+        )
+
+        purged = 0
+        last_id = 0
+        while True:
+            cursor.execute(
+                "SELECT MAX(id) FROM (SELECT id FROM purge_ids WHERE id > %s "
+                "ORDER BY id LIMIT %s) batch",
+                (last_id, batch_size),
+            )
+            batch_end = cursor.fetchone()[0]
+            if batch_end is None:
+                break
+            conn.start_transaction()
+            try:
+                cursor.execute(
+                    "DELETE v FROM vocabulary v JOIN purge_ids p ON p.id = v.id "
+                    "WHERE p.id > %s AND p.id <= %s",
+                    (last_id, batch_end),
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            purged += cursor.rowcount
+            last_id = batch_end
+            print(f"Purged {purged} of {duplicates} duplicate rows...")
+
+        cursor.execute("DROP TEMPORARY TABLE purge_ids")
+        print(f"Purged {purged} duplicate words from the database.")
+        cursor.close()
+        return purged
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only count the duplicates"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="rows deleted per transaction",
+    )
+    args = parser.parse_args()
+
+    init_db()
+    purge_duplicates(args.batch_size, args.dry_run)
+    if not args.dry_run:
+        # Adds UNIQUE(word) now that the table is clean, and the rest of the
+        # schema.
+        applied = migrations.migrate()
+        if applied:
+            print(f"Applied migration(s) {', '.join(map(str, applied))}.")
+    db.close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,932 @@
+"""Local SQLite replica of the vocabulary, synced with MySQL in the background.
+
+The GUI reads and writes a copy of the vocabulary table kept in REPLICA_PATH,
+so the list, searches and edits never wait on the network and keep working
+while MySQL is unreachable. Each change is written together with an entry in
+a durable outbox, in one SQLite transaction. SyncWorker pushes the outbox to
+MySQL in batched transactions, with consecutive new words in one multi-row
+INSERT, and pulls other machines' changes back, on its own thread; like
+lookups.py it reports to the GUI through a queue drained with root.after.
+
+Pulls are incremental: triggers log every change to the server's vocabulary
+in vocabulary_changes (migration 7), and the replica reads the log from the
+last seq it applied. Only a new replica, or one that has not synced for
+longer than the log is kept, copies the whole table.
+
+Rows are identified locally by ``local_id``; ``remote_id`` is their MySQL id
+once pushed. Words are unique on the server, so pushing a word that was added
+elsewhere in the meantime is a conflict: the server's row wins, and the local
+version is kept in the ``conflicts`` table and reported.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import mysql.connector
+
+import db
+from config import REPLICA_PATH, REPLICA_PULL_INTERVAL
+from vocabulary import MEANING_PREVIEW_LENGTH, escape_like, preview
+
+# Outbox entries sent to MySQL per transaction
+PUSH_BATCH_SIZE = 200
+# Seconds to wait after a change before pushing, so bursts go in one batch
+PUSH_DELAY = 0.5
+# Seconds between attempts while MySQL is unreachable
+SYNC_RETRY_DELAY = 30
+PULL_CHUNK_SIZE = 5000
+
+# Change-log seqs are allocated when a change is made but become visible when
+# it commits, so a slow transaction can commit a seq below one already read.
+# Changes younger than this many seconds are therefore read again next time.
+CHANGE_SETTLE_TIME = 60
+# Log rows older than this are pruned; a replica that hasn't synced for half
+# of it copies the whole table instead
+CHANGE_LOG_RETENTION = 30 * 86400
+PRUNE_INTERVAL = 86400
+PRUNE_BATCH_SIZE = 10000
+
+# The changes after a seq, with each row's current state (NULL once deleted)
+CHANGES = """
+    SELECT c.seq, c.vocabulary_id, v.word, v.meaning,
+        c.changed_at < NOW(6) - INTERVAL %s SECOND
+    FROM vocabulary_changes c LEFT JOIN vocabulary v ON v.id = c.vocabulary_id
+    WHERE c.seq > %s ORDER BY c.seq
+"""
+POLL_INTERVAL_MS = 200
+
+PREVIEW = f"substr(meaning, 1, {MEANING_PREVIEW_LENGTH})"
+
+# Search terms: a word or a "quoted phrase", each optionally preceded by +
+# (required anyway) or - (excluded); a word ending in * matches as a prefix
+_TERM = re.compile(r'([+-]?)(?:"([^"]*)"?|([^\s"]+))')
+_TOKEN = re.compile(r"\w+")
+
+_SCHEMA = """
+-- AUTOINCREMENT: a deleted row's id may still be referenced by a push in
+-- flight, so it must never be reused
+CREATE TABLE IF NOT EXISTS vocabulary (
+    local_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    remote_id INTEGER UNIQUE,
+    word TEXT NOT NULL,
+    meaning TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vocabulary_word ON vocabulary (word COLLATE NOCASE);
+
+-- Full-text index of the words and meanings for searches, kept current by
+-- the triggers below
+CREATE VIRTUAL TABLE IF NOT EXISTS vocabulary_fts USING fts5 (
+    word, meaning, content = 'vocabulary', content_rowid = 'local_id',
+    prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS vocabulary_fts_insert AFTER INSERT ON vocabulary
+BEGIN
+    INSERT INTO vocabulary_fts (rowid, word, meaning)
+    VALUES (new.local_id, new.word, new.meaning);
+END;
+CREATE TRIGGER IF NOT EXISTS vocabulary_fts_delete AFTER DELETE ON vocabulary
+BEGIN
+    INSERT INTO vocabulary_fts (vocabulary_fts, rowid, word, meaning)
+    VALUES ('delete', old.local_id, old.word, old.meaning);
+END;
+CREATE TRIGGER IF NOT EXISTS vocabulary_fts_update
+AFTER UPDATE OF word, meaning ON vocabulary
+BEGIN
+    INSERT INTO vocabulary_fts (vocabulary_fts, rowid, word, meaning)
+    VALUES ('delete', old.local_id, old.word, old.meaning);
+    INSERT INTO vocabulary_fts (rowid, word, meaning)
+    VALUES (new.local_id, new.word, new.meaning);
+END;
+
+-- At most one entry per local row: later changes are folded into it
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete')),
+    local_id INTEGER NOT NULL UNIQUE,
+    remote_id INTEGER,
+    word TEXT,
+    meaning TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    value
+);
+
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY,
+    word TEXT NOT NULL,
+    meaning TEXT,
+    reason TEXT NOT NULL,
+    recorded_at REAL NOT NULL
+);
+"""
+
+
+class DuplicateWord(Exception):
+    """Raised when a word is already in the vocabulary."""
+
+
+def match_query(term):
+    """Translate a search box entry into an FTS5 query.
+
+    Every word or phrase must match, except those preceded by -, which must
+    not. The last word is matched as a prefix too, as it is usually still
+    being typed. Returns ``(query, text)``, where ``text`` is the searched
+    words, or None if nothing is searched for. The query is None when only
+    excluded words were given, which matches nothing, as in MySQL.
+    """
+    terms = _TERM.findall(term)
+    required, excluded, words = [], [], []
+    for index, (operator, phrase, word) in enumerate(terms):
+        tokens = _TOKEN.findall(phrase or word)
+        if not tokens:
+            continue
+        query = '"' + " ".join(tokens) + '"'
+        if word.endswith("*") or (word and index == len(terms) - 1):
+            query += "*"
+        if operator == "-":
+            excluded.append(query)
+        else:
+            required.append(query)
+            words.extend(tokens)
+    if not required and not excluded:
+        return None
+    query = " AND ".join(required) or None
+    if query and excluded:
+        query += f" NOT ({' OR '.join(excluded)})"
+    return query, " ".join(words)
+
+
+class Replica:
+    """One connection to the replica database.
+
+    SQLite connections belong to the thread that opened them, so the GUI and
+    SyncWorker each open their own; WAL mode lets the GUI keep reading while
+    the worker writes.
+    """
+
+    def __init__(self, path=REPLICA_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # The outbox must survive a power cut, not just a crash
+        self._conn.execute("PRAGMA synchronous=FULL")
+        indexed = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'vocabulary_fts'"
+        ).fetchone()
+        self._conn.executescript(_SCHEMA)
+        if not indexed:
+            # A replica from before the search index: index what it holds.
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO vocabulary_fts (vocabulary_fts) VALUES ('rebuild')"
+                )
+        # Called after every local change, e.g. to wake the sync worker
+        self.on_change = None
+
+    def close(self):
+        self._conn.close()
+
+    # Reads
+
+    def count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM vocabulary").fetchone()[0]
+
+    def word_exists(self, word, exclude=None):
+        """Return True if ``word`` (ignoring case) is in the vocabulary."""
+        return (
+            self._conn.execute(
+                "SELECT 1 FROM vocabulary WHERE word = ? COLLATE NOCASE "
+                "AND local_id IS NOT ?",
+                (word, exclude),
+            ).fetchone()
+            is not None
+        )
+
+    def full_meaning(self, local_id):
+        """Return the complete meaning of a word, or None if it is gone."""
+        row = self._conn.execute(
+            "SELECT meaning FROM vocabulary WHERE local_id = ?", (local_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def pending(self):
+        """Return the number of local changes not yet pushed to MySQL."""
+        return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def conflicts(self, limit=100):
+        """Return the latest conflicts as (word, meaning, reason, recorded_at)."""
+        return self._conn.execute(
+            "SELECT word, meaning, reason, recorded_at FROM conflicts "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def sync_state(self, name):
+        """Return a value recorded by the last pull (None if there was none)."""
+        row = self._conn.execute(
+            "SELECT value FROM sync_state WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_sync_state(self, name, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)",
+            (name, value),
+        )
+
+    def rows(self):
+        """Yield every (word, meaning) pair in local id order."""
+        return self._conn.execute(
+            "SELECT word, meaning FROM vocabulary ORDER BY local_id"
+        )
+
+    def search(self, term):
+        """Return the list source for a search box entry."""
+        match = match_query(term)
+        if match is None:
+            return ReplicaQuery(self)
+        return ReplicaSearch(self, *match)
+
+    # Local changes: each one also records (or amends) its outbox entry
+
+    def insert(self, word, meaning):
+        """Add a word; returns its local id."""
+        with self._conn:
+            if self.word_exists(word):
+                raise DuplicateWord(word)
+            local_id = self._insert(word, meaning)
+        self._changed()
+        return local_id
+
+    def insert_many(self, rows):
+        """Add (word, meaning) rows in one transaction, skipping words already
+        in the vocabulary; returns how many were added."""
+        added = 0
+        with self._conn:
+            for word, meaning in rows:
+                if not self.word_exists(word):
+                    self._insert(word, meaning)
+                    added += 1
+        if added:
+            self._changed()
+        return added
+
+    def _insert(self, word, meaning):
+        local_id = self._conn.execute(
+            "INSERT INTO vocabulary (word, meaning) VALUES (?, ?)", (word, meaning)
+        ).lastrowid
+        self._conn.execute(
+            "INSERT INTO outbox (op, local_id, word, meaning) "
+            "VALUES ('insert', ?, ?, ?)",
+            (local_id, word, meaning),
+        )
+        return local_id
+
+    def update(self, local_id, word, meaning):
+        with self._conn:
+            if self.word_exists(word, exclude=local_id):
+                raise DuplicateWord(word)
+            self._conn.execute(
+                "UPDATE vocabulary SET word = ?, meaning = ? WHERE local_id = ?",
+                (word, meaning, local_id),
+            )
+            # An insert or update still waiting to be pushed just carries the
+            # new values; bumping its version tells an in-flight push that it
+            # changed.
+            self._conn.execute(
+                """
+                INSERT INTO outbox (op, local_id, word, meaning)
+                VALUES ('update', ?, ?, ?)
+                ON CONFLICT (local_id) DO UPDATE SET
+                    word = excluded.word,
+                    meaning = excluded.meaning,
+                    version = version + 1
+            """,
+                (local_id, word, meaning),
+            )
+        self._changed()
+
+    def delete(self, local_id):
+        with self._conn:
+            row = self._conn.execute(
+                "SELECT remote_id FROM vocabulary WHERE local_id = ?", (local_id,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM vocabulary WHERE local_id = ?", (local_id,))
+            # A word that never reached the server just disappears.
+            self._conn.execute("DELETE FROM outbox WHERE local_id = ?", (local_id,))
+            if row and row[0] is not None:
+                self._conn.execute(
+                    "INSERT INTO outbox (op, local_id, remote_id) "
+                    "VALUES ('delete', ?, ?)",
+                    (local_id, row[0]),
+                )
+        self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    # Used by SyncWorker
+
+    def outbox_batch(self, limit):
+        """Return the oldest outbox entries as
+        (seq, version, op, local_id, remote_id, word, meaning) rows."""
+        return self._conn.execute(
+            """
+            SELECT o.seq, o.version, o.op, o.local_id,
+                   COALESCE(o.remote_id, v.remote_id), o.word, o.meaning
+            FROM outbox o LEFT JOIN vocabulary v ON v.local_id = o.local_id
+            ORDER BY o.seq LIMIT ?
+        """,
+            (limit,),
+        ).fetchall()
+
+    def apply_push(self, results):
+        """Record the outcome of a pushed batch (see SyncWorker._push_entry)."""
+        conn = self._conn
+        with conn:
+            for seq, version, local_id, outcome, detail in results:
+                if outcome == "inserted":
+                    conn.execute(
+                        "UPDATE vocabulary SET remote_id = ? WHERE local_id = ?",
+                        (detail, local_id),
+                    )
+                    entry = conn.execute(
+                        "SELECT version FROM outbox WHERE seq = ?", (seq,)
+                    ).fetchone()
+                    if entry is None:
+                        # Deleted locally while the insert was in flight.
+                        conn.execute(
+                            "INSERT OR IGNORE INTO outbox (op, local_id, remote_id) "
+                            "VALUES ('delete', ?, ?)",
+                            (local_id, detail),
+                        )
+                    elif entry[0] != version:
+                        # Edited while in flight: push the edit next.
+                        conn.execute(
+                            "UPDATE outbox SET op = 'update' WHERE seq = ?", (seq,)
+                        )
+                    else:
+                        conn.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+                elif outcome in ("updated", "deleted"):
+                    conn.execute(
+                        "DELETE FROM outbox WHERE seq = ? AND version = ?",
+                        (seq, version),
+                    )
+                else:
+                    # A conflict: the server's row (or its absence) wins.
+                    word, meaning, reason, server_row = detail
+                    conn.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+                    conn.execute(
+                        "INSERT INTO conflicts (word, meaning, reason, recorded_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (word, meaning, reason, time.time()),
+                    )
+                    self._adopt(local_id, server_row)
+
+    def _adopt(self, local_id, server_row):
+        # Make the local row a copy of ``server_row`` (remote_id, word,
+        # meaning), or drop it if the server has no such row or another local
+        # row already mirrors it.
+        if server_row is not None:
+            remote_id, word, meaning = server_row
+            mirrored = self._conn.execute(
+                "SELECT 1 FROM vocabulary WHERE remote_id = ? AND local_id != ?",
+                (remote_id, local_id),
+            ).fetchone()
+            if not mirrored:
+                self._conn.execute(
+                    "UPDATE vocabulary SET remote_id = ?, word = ?, meaning = ? "
+                    "WHERE local_id = ?",
+                    (remote_id, word, meaning, local_id),
+                )
+                return
+        self._conn.execute("DELETE FROM vocabulary WHERE local_id = ?", (local_id,))
+
+    def apply_pull(self, rows, change_seq):
+        """Make the replica match ``rows`` (remote_id, word, meaning), the whole
+        server table, except for rows with local changes still to push.
+
+        ``change_seq`` is the change-log seq the copy is current with. Returns
+        the number of local rows added, changed or removed.
+        """
+        conn = self._conn
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS pulled "
+            "(remote_id INTEGER PRIMARY KEY, word TEXT, meaning TEXT)"
+        )
+        with conn:
+            conn.execute("DELETE FROM pulled")
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == PULL_CHUNK_SIZE:
+                    conn.executemany("INSERT INTO pulled VALUES (?, ?, ?)", chunk)
+                    chunk = []
+            conn.executemany("INSERT INTO pulled VALUES (?, ?, ?)", chunk)
+
+        # The rows were staged in a temporary table, which doesn't lock the
+        # replica; applying them is one transaction, so readers never see a
+        # half-applied pull.
+        unpushed = "local_id NOT IN (SELECT local_id FROM outbox)"
+        with conn:
+            changed = conn.execute(
+                f"""
+                UPDATE vocabulary SET (word, meaning) = (
+                    SELECT p.word, p.meaning FROM pulled p
+                    WHERE p.remote_id = vocabulary.remote_id
+                )
+                WHERE {unpushed} AND EXISTS (
+                    SELECT 1 FROM pulled p
+                    WHERE p.remote_id = vocabulary.remote_id
+                    AND (p.word IS NOT vocabulary.word
+                         OR p.meaning IS NOT vocabulary.meaning)
+                )
+            """
+            ).rowcount
+            changed += conn.execute(
+                f"""
+                DELETE FROM vocabulary
+                WHERE remote_id IS NOT NULL AND {unpushed}
+                AND remote_id NOT IN (SELECT remote_id FROM pulled)
+            """
+            ).rowcount
+            # New rows, except ones deleted here and not yet pushed
+            changed += conn.execute(
+                """
+                INSERT INTO vocabulary (remote_id, word, meaning)
+                SELECT p.remote_id, p.word, p.meaning FROM pulled p
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM vocabulary v WHERE v.remote_id = p.remote_id
+                ) AND NOT EXISTS (
+                    SELECT 1 FROM outbox o WHERE o.remote_id = p.remote_id
+                )
+                ORDER BY p.remote_id
+            """
+            ).rowcount
+            conn.execute("DELETE FROM pulled")
+            self.set_sync_state("change_seq", change_seq)
+            self.set_sync_state("synced_at", time.time())
+        return changed
+
+    def apply_changes(self, changes):
+        """Apply change-log rows read with CHANGES, in seq order.
+
+        Rows with local changes still to push are left alone; the push
+        decides their fate. Returns ``(old_row, new_row)`` list rows for what
+        really changed, with None for an added or removed row.
+        """
+        conn = self._conn
+        change_seq = self.sync_state("change_seq")
+        latest = {}
+        unsettled = False
+        for seq, remote_id, word, meaning, settled in changes:
+            latest[remote_id] = (word, meaning)
+            if not settled:
+                unsettled = True
+            elif not unsettled:
+                change_seq = seq
+
+        applied = []
+        with conn:
+            for remote_id, (word, meaning) in latest.items():
+                if conn.execute(
+                    "SELECT 1 FROM outbox WHERE remote_id = ? OR local_id IN "
+                    "(SELECT local_id FROM vocabulary WHERE remote_id = ?)",
+                    (remote_id, remote_id),
+                ).fetchone():
+                    continue
+                local = conn.execute(
+                    "SELECT local_id, word, meaning FROM vocabulary "
+                    "WHERE remote_id = ?",
+                    (remote_id,),
+                ).fetchone()
+                if word is None:
+                    if local:
+                        conn.execute(
+                            "DELETE FROM vocabulary WHERE local_id = ?", (local[0],)
+                        )
+                        applied.append((_list_row(*local), None))
+                elif local is None:
+                    local_id = conn.execute(
+                        "INSERT INTO vocabulary (remote_id, word, meaning) "
+                        "VALUES (?, ?, ?)",
+                        (remote_id, word, meaning),
+                    ).lastrowid
+                    applied.append((None, _list_row(local_id, word, meaning)))
+                elif local[1:] != (word, meaning):
+                    conn.execute(
+                        "UPDATE vocabulary SET word = ?, meaning = ? "
+                        "WHERE local_id = ?",
+                        (word, meaning, local[0]),
+                    )
+                    applied.append(
+                        (_list_row(*local), _list_row(local[0], word, meaning))
+                    )
+            self.set_sync_state("change_seq", change_seq)
+            self.set_sync_state("synced_at", time.time())
+        return applied
+
+
+def _list_row(local_id, word, meaning):
+    return local_id, word, preview(meaning)
+
+
+class ReplicaQuery:
+    """The replica in local id order, read page by page.
+
+    Rows are ``(local_id, word, meaning preview)``, keyed by local_id. Pages
+    are fetched with keyset pagination (``WHERE local_id > last``), so the
+    cost of a page doesn't grow with how far down the list it is; only a jump
+    to an arbitrary scroll position uses an OFFSET.
+    """
+
+    def __init__(self, replica):
+        self.replica = replica
+
+    @staticmethod
+    def key(row):
+        return row[0]
+
+    @staticmethod
+    def matches(row):
+        return True
+
+    def count(self):
+        return self.replica.count()
+
+    def rows_after(self, key, limit):
+        return self._fetch(
+            f"SELECT local_id, word, {PREVIEW} FROM vocabulary "
+            "WHERE local_id > ? ORDER BY local_id LIMIT ?",
+            (-1 if key is None else key, limit),
+        )
+
+    def rows_before(self, key, limit):
+        rows = self._fetch(
+            f"SELECT local_id, word, {PREVIEW} FROM vocabulary "
+            "WHERE local_id < ? ORDER BY local_id DESC LIMIT ?",
+            (key, limit),
+        )
+        rows.reverse()
+        return rows
+
+    def rows_at(self, offset, limit):
+        return self._fetch(
+            f"SELECT local_id, word, {PREVIEW} FROM vocabulary "
+            "ORDER BY local_id LIMIT ? OFFSET ?",
+            (limit, offset),
+        )
+
+    def _fetch(self, query, params):
+        return self.replica._conn.execute(query, params).fetchall()
+
+
+class ReplicaSearch:
+    """Words and meanings matching an FTS5 ``query``, best matches first.
+
+    Words equal to the searched ``text`` rank first, then words starting
+    with it, then the rest by relevance (bm25, with matches in the word
+    weighing more than matches in the meaning). Relevance order has no
+    stable key to seek from, so rows are keyed by their position in the
+    ranking; positions shift when rows change, so ``ranked`` tells the view
+    to re-read instead of patching its buffer.
+    """
+
+    ranked = True
+
+    def __init__(self, replica, query, text):
+        self.replica = replica
+        self.query = query
+        self._boost = (
+            "CASE WHEN v.word = ? COLLATE NOCASE THEN 2 "
+            "WHEN v.word LIKE ? || '%' ESCAPE '\\' THEN 1 ELSE 0 END"
+        )
+        self._boost_params = (text, escape_like(text))
+
+    @staticmethod
+    def key(row):
+        return row[3]
+
+    @staticmethod
+    def matches(row):
+        return False
+
+    def count(self):
+        if self.query is None:
+            return 0
+        return self.replica._conn.execute(
+            "SELECT COUNT(*) FROM vocabulary_fts WHERE vocabulary_fts MATCH ?",
+            (self.query,),
+        ).fetchone()[0]
+
+    def rows_after(self, key, limit):
+        return self.rows_at(0 if key is None else key + 1, limit)
+
+    def rows_before(self, key, limit):
+        start = max(0, key - limit)
+        return self.rows_at(start, key - start)
+
+    def rows_at(self, offset, limit):
+        """Return up to ``limit`` (local_id, word, preview, position) rows."""
+        if limit <= 0 or self.query is None:
+            return []
+        rows = self.replica._conn.execute(
+            f"""
+            SELECT v.local_id, v.word, substr(v.meaning, 1, {MEANING_PREVIEW_LENGTH})
+            FROM vocabulary_fts JOIN vocabulary v ON v.local_id = vocabulary_fts.rowid
+            WHERE vocabulary_fts MATCH ?
+            ORDER BY {self._boost} DESC, bm25(vocabulary_fts, 10.0, 1.0),
+                v.local_id
+            LIMIT ? OFFSET ?
+        """,
+            (self.query,) + self._boost_params + (limit, offset),
+        ).fetchall()
+        return [
+            (local_id, word, text, offset + index)
+            for index, (local_id, word, text) in enumerate(rows)
+        ]
+
+
+class SyncWorker:
+    """Push the outbox to MySQL and pull the server's changes, on a thread.
+
+    Pending changes are pushed shortly after they are made; changes are
+    pulled at start, every REPLICA_PULL_INTERVAL seconds and on
+    ``request_pull()``. While MySQL is unreachable it retries every
+    SYNC_RETRY_DELAY seconds, and so it does after any other error, which
+    is reported. Callbacks run on the Tk main thread:
+    ``on_status(online, pending, error)`` after every attempt, with the
+    message of the error that stopped it, if any,
+    ``on_changed(changes)`` with the ``(old_row, new_row)`` pairs of an
+    incremental pull, ``on_pulled()`` when a copy of the whole table changed
+    local rows and ``on_conflict(word, reason)`` for each local change the
+    server refused.
+    """
+
+    def __init__(
+        self,
+        root,
+        path=REPLICA_PATH,
+        on_status=None,
+        on_changed=None,
+        on_pulled=None,
+        on_conflict=None,
+        config=None,
+    ):
+        self.root = root
+        self.path = path
+        self.config = config
+        self.on_status = on_status
+        self.on_changed = on_changed
+        self.on_pulled = on_pulled
+        self.on_conflict = on_conflict
+        self._messages = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._pull_requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sync", daemon=True)
+        self._poll_id = None
+
+    def start(self):
+        self._pull_requested.set()
+        self._thread.start()
+        self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def notify(self):
+        """Push pending changes soon (safe to call from any thread)."""
+        self._wake.set()
+
+    def request_pull(self):
+        self._pull_requested.set()
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        """Stop after the batch in flight, if any, has been recorded."""
+        self._stopped.set()
+        self._wake.set()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self):
+        # Runs on the sync thread: no Tk calls here.
+        try:
+            replica = Replica(self.path)
+        except sqlite3.Error as e:
+            self._messages.put(("status", False, None, f"local replica: {e}"))
+            return
+        next_pull = 0
+        try:
+            while not self._stopped.is_set():
+                delay = max(0, next_pull - time.monotonic())
+                online, error = True, None
+                try:
+                    while self._push_batch(replica):
+                        pass
+                    if self._pull_requested.is_set() or not delay:
+                        self._pull_requested.clear()
+                        self._pull(replica)
+                        next_pull = time.monotonic() + REPLICA_PULL_INTERVAL
+                        delay = REPLICA_PULL_INTERVAL
+                except mysql.connector.Error as e:
+                    if db.is_connection_error(e):
+                        online = False
+                    else:
+                        error = f"database: {e}"
+                    delay = SYNC_RETRY_DELAY
+                except sqlite3.Error as e:
+                    error = f"local replica: {e}"
+                    delay = SYNC_RETRY_DELAY
+                try:
+                    pending = replica.pending()
+                except sqlite3.Error:
+                    pending = None
+                self._messages.put(("status", online, pending, error))
+
+                self._wake.wait(delay)
+                self._wake.clear()
+                # Let a burst of edits settle into one batch.
+                self._stopped.wait(PUSH_DELAY)
+        finally:
+            replica.close()
+
+    def _push_batch(self, replica):
+        """Push one batch; returns True if more entries may be waiting."""
+        entries = replica.outbox_batch(PUSH_BATCH_SIZE)
+        if not entries:
+            return False
+        results = []
+        with db.transaction(self.config) as cursor:
+            inserts = []
+            for entry in entries:
+                if entry[2] == "insert":
+                    inserts.append(entry)
+                    continue
+                # Consecutive new words go in one statement.
+                results.extend(self._push_inserts(cursor, inserts))
+                inserts = []
+                results.append(self._push_entry(cursor, *entry))
+            results.extend(self._push_inserts(cursor, inserts))
+        # Once MySQL has committed the batch; if this process dies before
+        # the line below, the batch is pushed again: the inserts then come
+        # back as conflicts with their own rows and are resolved to them.
+        replica.apply_push(results)
+        for seq, version, local_id, outcome, detail in results:
+            if outcome == "conflict":
+                self._messages.put(("conflict", detail[0], detail[2]))
+        return len(entries) == PUSH_BATCH_SIZE
+
+    def _push_inserts(self, cursor, entries):
+        # Insert a run of outbox inserts with one multi-row INSERT and read
+        # their ids back by word. If any word is already on the server, the
+        # statement inserts nothing and the run is pushed row by row to find
+        # the conflicts.
+        if len(entries) < 2:
+            return [self._push_entry(cursor, *entry) for entry in entries]
+        words = [entry[5] for entry in entries]
+        values = ", ".join(["(%s, %s)"] * len(entries))
+        try:
+            cursor.execute(
+                f"INSERT INTO vocabulary (word, meaning) VALUES {values}",
+                [value for entry in entries for value in entry[5:]],
+            )
+        except mysql.connector.IntegrityError:
+            return [self._push_entry(cursor, *entry) for entry in entries]
+        placeholders = ", ".join(["%s"] * len(words))
+        cursor.execute(
+            f"SELECT id, word FROM vocabulary WHERE word IN ({placeholders})", words
+        )
+        ids = {word: remote_id for remote_id, word in cursor.fetchall()}
+        return [
+            (seq, version, local_id, "inserted", ids[word])
+            for seq, version, _, local_id, _, word, _ in entries
+        ]
+
+    def _push_entry(self, cursor, seq, version, op, local_id, remote_id, word, meaning):
+        # Returns (seq, version, local_id, outcome, detail) for apply_push.
+        if op == "delete":
+            cursor.execute("DELETE FROM vocabulary WHERE id = %s", (remote_id,))
+            return seq, version, local_id, "deleted", None
+
+        if op == "update" and remote_id is not None:
+            try:
+                cursor.execute(
+                    "UPDATE vocabulary SET word = %s, meaning = %s WHERE id = %s",
+                    (word, meaning, remote_id),
+                )
+            except mysql.connector.IntegrityError:
+                reason = "the new word is already in the database"
+                detail = (word, meaning, reason, _server_row(cursor, "id", remote_id))
+                return seq, version, local_id, "conflict", detail
+            if cursor.rowcount or _server_row(cursor, "id", remote_id):
+                return seq, version, local_id, "updated", None
+            # Deleted on the server meanwhile: the edit brings it back.
+
+        try:
+            cursor.execute(
+                "INSERT INTO vocabulary (word, meaning) VALUES (%s, %s)",
+                (word, meaning),
+            )
+        except mysql.connector.IntegrityError:
+            reason = "the word was already added from another machine"
+            detail = (word, meaning, reason, _server_row(cursor, "word", word))
+            return seq, version, local_id, "conflict", detail
+        return seq, version, local_id, "inserted", cursor.lastrowid
+
+    def _pull(self, replica):
+        synced_at = replica.sync_state("synced_at")
+        if (
+            replica.sync_state("change_seq") is None
+            or synced_at is None
+            or time.time() - synced_at > CHANGE_LOG_RETENTION / 2
+        ):
+            if self._pull_all(replica):
+                self._messages.put(("pulled",))
+            return
+
+        changes = db.stream(
+            CHANGES,
+            (CHANGE_SETTLE_TIME, replica.sync_state("change_seq")),
+            chunk_size=PULL_CHUNK_SIZE,
+            config=self.config,
+        )
+        with closing(changes):
+            applied = replica.apply_changes(changes)
+        if applied:
+            self._messages.put(("changed", applied))
+        self._prune(replica)
+
+    def _pull_all(self, replica):
+        # The log position is read first: changes made while the table is
+        # copied are applied again by the next incremental pull.
+        with db.cursor(self.config) as cursor:
+            cursor.execute(
+                "SELECT seq FROM vocabulary_changes "
+                "WHERE changed_at < NOW(6) - INTERVAL %s SECOND "
+                "ORDER BY changed_at DESC LIMIT 1",
+                (CHANGE_SETTLE_TIME,),
+            )
+            row = cursor.fetchone()
+        rows = db.stream(
+            "SELECT id, word, meaning FROM vocabulary ORDER BY id",
+            chunk_size=PULL_CHUNK_SIZE,
+            config=self.config,
+        )
+        with closing(rows):
+            return replica.apply_pull(rows, row[0] if row else 0)
+
+    def _prune(self, replica):
+        # Any replica may trim the shared log, at most once a day.
+        pruned_at = replica.sync_state("pruned_at") or 0
+        if time.time() - pruned_at < PRUNE_INTERVAL:
+            return
+        with db.cursor(self.config) as cursor:
+            while True:
+                cursor.execute(
+                    "DELETE FROM vocabulary_changes "
+                    "WHERE changed_at < NOW() - INTERVAL %s SECOND LIMIT %s",
+                    (CHANGE_LOG_RETENTION, PRUNE_BATCH_SIZE),
+                )
+                if cursor.rowcount < PRUNE_BATCH_SIZE:
+                    break
+        with replica._conn:
+            replica.set_sync_state("pruned_at", time.time())
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            kind, args = message[0], message[1:]
+            callback = {
+                "status": self.on_status,
+                "changed": self.on_changed,
+                "pulled": self.on_pulled,
+                "conflict": self.on_conflict,
+            }[kind]
+            if callback is not None:
+                callback(*args)
+        if not self._stopped.is_set():
+            self._poll_id = self.root.after(POLL_INTERVAL_MS, self._poll)
+
+
+def _server_row(cursor, column, value):
+    cursor.execute(
+        f"SELECT id, word, meaning FROM vocabulary WHERE {column} = %s", (value,)
+    )
+    return cursor.fetchone()
+
@@ -0,0 +1,143 @@
+"""Measure the cold start of main.py and fail when it goes over budget.
+
+Each run starts main.py in a fresh interpreter with ``-X importtime`` and
+stops it as soon as the first window has been painted. It reports:
+
+- the wall-clock time from launching the process to that first paint
+- the time spent importing modules, and the slowest top-level imports
+- any module meant to be loaded on first use that was already imported
+
+The medians over ``--runs`` runs are checked against the budgets, and the
+exit status is 1 when one is exceeded, so a change that slows startup
+fails the check. It needs a display and the usual database settings.
+
+Usage:
+
+    python startup_budget.py
+    python startup_budget.py --runs 5 --window-budget 2000 --import-budget 600
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Median budgets in milliseconds
+WINDOW_BUDGET_MS = 1500
+IMPORT_BUDGET_MS = 500
+
+# Only needed by exports, imports, lookups or the icon refresh, so they must
+# not be imported before the window appears (sqlite3 is: the first page is
+# read from the local replica)
+DEFERRED_MODULES = ("openpyxl", "requests", "fpdf")
+
+RUN_TIMEOUT = 60
+SLOWEST_IMPORTS = 10
+
+_MARKER = "STARTUP_BUDGET "
+
+# Runs the script given as argv[1] and reports back on its first mainloop()
+_PROBE = f"""
+import json, runpy, sys, time, tkinter
+
+def first_paint(root, *args, **kwargs):
+    root.update()
+    report = {{"painted_at": time.time(), "modules": sorted(sys.modules)}}
+    print({_MARKER!r} + json.dumps(report), flush=True)
+    root.destroy()
+
+tkinter.Tk.mainloop = first_paint
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def parse_importtime(stderr):
+    """Return [(module, cumulative_us)] for the top-level imports in ``stderr``."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, _, fields = line.partition(":")
+        _, cumulative, name = fields.split("|")
+        # Nested imports are indented under the module that triggered them.
+        if not name.startswith("  "):
+            imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+def measure(script):
+    """Start ``script`` once; returns (window_ms, imports, modules)."""
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE, script],
+        capture_output=True,
+        text=True,
+        timeout=RUN_TIMEOUT,
+        cwd=os.path.dirname(os.path.abspath(script)),
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith(_MARKER):
+            report = json.loads(line[len(_MARKER) :])
+            break
+    else:
+        tail = "\n".join(result.stderr.splitlines()[-20:])
+        raise RuntimeError(f"{script} never reached its main loop:\n{tail}")
+
+    window_ms = (report["painted_at"] - started) * 1000
+    return window_ms, parse_importtime(result.stderr), set(report["modules"])
+
+
+def deferred_loaded(modules):
+    return sorted(
+        name
+        for name in DEFERRED_MODULES
+        if any(module == name or module.startswith(name + ".") for module in modules)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--script", default="main.py")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--window-budget", type=float, default=WINDOW_BUDGET_MS)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    window_times, import_times = [], []
+    slowest = {}
+    early = set()
+    for _ in range(args.runs):
+        window_ms, imports, modules = measure(args.script)
+        window_times.append(window_ms)
+        import_times.append(sum(cumulative for _, cumulative in imports) / 1000)
+        for name, cumulative in imports:
+            slowest[name] = max(slowest.get(name, 0), cumulative)
+        early.update(deferred_loaded(modules))
+
+    window_ms = statistics.median(window_times)
+    import_ms = statistics.median(import_times)
+    print(f"first window  {window_ms:8.0f} ms  (budget {args.window_budget:.0f})")
+    print(f"imports       {import_ms:8.0f} ms  (budget {args.import_budget:.0f})")
+    print("slowest imports:")
+    ranked = sorted(slowest.items(), key=lambda item: -item[1])
+    for name, cumulative in ranked[:SLOWEST_IMPORTS]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if window_ms > args.window_budget:
+        failures.append("first window is over budget")
+    if import_ms > args.import_budget:
+        failures.append("imports are over budget")
+    if early:
+        failures.append(f"imported before the window: {', '.join(sorted(early))}")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
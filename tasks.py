@@ -0,0 +1,77 @@
+"""Long-running jobs (exports, imports) run off the Tk main thread.
+
+Like lookups.py, the worker never touches Tk: it posts progress and the
+result onto a queue that the main loop drains with root.after.
+"""
+
+import queue
+import threading
+
+POLL_INTERVAL_MS = 100
+
+
+class Cancelled(Exception):
+    """Raised inside a task when the user cancels it."""
+
+
+class BackgroundTask:
+    """Run ``func`` on a worker thread and report back on the Tk thread.
+
+    ``func`` is called as ``func(progress, cancelled)``: ``progress(done)``
+    reports the rows handled so far and ``cancelled`` is a threading.Event it
+    should check, raising Cancelled when set. ``on_progress(done, total)`` and
+    ``on_done(result, error)`` are called on the main thread. If ``count`` is
+    given it is called first (on the worker) for the total, and a total of
+    zero finishes with a result of 0 without calling ``func``.
+    """
+
+    def __init__(self, root, func, on_progress=None, on_done=None, count=None):
+        self.root = root
+        self.func = func
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.count = count
+        self.cancelled = threading.Event()
+        self.total = None
+        self._messages = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="task", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _run(self):
+        # Runs on the worker thread: no Tk calls here.
+        try:
+            if self.count is not None:
+                total = self.count()
+                self._messages.put(("total", total))
+                if not total:
+                    self._messages.put(("done", 0, None))
+                    return
+            result = self.func(
+                lambda done: self._messages.put(("progress", done)), self.cancelled
+            )
+            self._messages.put(("done", result, None))
+        except Exception as e:
+            self._messages.put(("done", None, e))
+
+    def _poll(self):
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "total":
+                self.total = message[1]
+            elif message[0] == "progress":
+                if self.on_progress is not None:
+                    self.on_progress(message[1], self.total)
+            else:
+                if self.on_done is not None:
+                    self.on_done(message[1], message[2])
+                return
+        self.root.after(POLL_INTERVAL_MS, self._poll)
@@ -0,0 +1,164 @@
+"""Shared fixtures.
+
+The tests run without MySQL: config.py only needs the DB_* variables to be
+set, and the sync tests talk to FakeServer, an SQLite stand-in for the
+vocabulary and vocabulary_changes tables that replica.py reads and writes.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name in ("DB_USER", "DB_PASS", "DB_HOST", "DB_NAME"):
+    os.environ.setdefault(name, "test")
+# Keep the dictionary cache, activation token and replica out of the real one
+os.environ["VOCAB_DATA_DIR"] = tempfile.mkdtemp(prefix="vocab-tests-")
+
+import mysql.connector  # noqa: E402
+
+import db  # noqa: E402
+import replica  # noqa: E402
+
+_SERVER_SCHEMA = """
+CREATE TABLE vocabulary (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    word TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    meaning TEXT NOT NULL
+);
+CREATE TABLE vocabulary_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    vocabulary_id INTEGER NOT NULL,
+    changed_at REAL NOT NULL DEFAULT (now())
+);
+CREATE TRIGGER vocabulary_log_insert AFTER INSERT ON vocabulary BEGIN
+    INSERT INTO vocabulary_changes (vocabulary_id) VALUES (NEW.id);
+END;
+CREATE TRIGGER vocabulary_log_update AFTER UPDATE ON vocabulary BEGIN
+    INSERT INTO vocabulary_changes (vocabulary_id) VALUES (NEW.id);
+END;
+CREATE TRIGGER vocabulary_log_delete AFTER DELETE ON vocabulary BEGIN
+    INSERT INTO vocabulary_changes (vocabulary_id) VALUES (OLD.id);
+END;
+"""
+
+
+class _Cursor:
+    def __init__(self, server):
+        self._server = server
+        self._cursor = server.conn.cursor()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=()):
+        self._server.check_online()
+        self._server.statements += 1
+        try:
+            self._cursor.execute(self._server.translate(query), params)
+        except sqlite3.IntegrityError as e:
+            raise mysql.connector.IntegrityError(msg=str(e), errno=1062) from e
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+
+class FakeServer:
+    """Stands in for the db module, on an in-memory SQLite database.
+
+    ``now`` is the server clock (time.time() unless set) and ``online``
+    False makes every call fail like an unreachable server. ``statements``
+    counts the statements run through its cursors.
+    """
+
+    def __init__(self):
+        self.conn = sqlite3.connect(
+            ":memory:", isolation_level=None, check_same_thread=False
+        )
+        self.conn.create_function("now", 0, lambda: self.time())
+        self.conn.executescript(_SERVER_SCHEMA)
+        self.now = None
+        self.online = True
+        self.statements = 0
+        self.is_connection_error = db.is_connection_error
+
+    def time(self):
+        return time.time() if self.now is None else self.now
+
+    def check_online(self):
+        if not self.online:
+            raise mysql.connector.InterfaceError(msg="Can't connect", errno=2003)
+
+    def translate(self, query):
+        query = query.replace("%s", "?")
+        query = re.sub(r"NOW\(6?\) - INTERVAL \? SECOND", "now() - ?", query)
+        # SQLite has no DELETE ... LIMIT
+        return re.sub(
+            r"DELETE FROM (\w+)\s+WHERE (.*) LIMIT \?",
+            r"DELETE FROM \1 WHERE rowid IN (SELECT rowid FROM \1 WHERE \2 LIMIT ?)",
+            query,
+            flags=re.S,
+        )
+
+    def rows(self):
+        return self.conn.execute(
+            "SELECT id, word, meaning FROM vocabulary ORDER BY id"
+        ).fetchall()
+
+    @contextmanager
+    def cursor(self, config=None):
+        self.check_online()
+        yield _Cursor(self)
+
+    @contextmanager
+    def transaction(self, config=None):
+        self.check_online()
+        self.conn.execute("BEGIN")
+        try:
+            yield _Cursor(self)
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def stream(self, query, params=(), chunk_size=1000, config=None):
+        self.check_online()
+        yield from self.conn.execute(self.translate(query), params).fetchall()
+
+
+class FakeRoot:
+    """Enough of a Tk root for SyncWorker."""
+
+    def after(self, delay, callback):
+        return "after"
+
+    def after_cancel(self, after_id):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeServer()
+    monkeypatch.setattr(replica, "db", fake)
+    return fake
+
+
+@pytest.fixture
+def local(tmp_path):
+    store = replica.Replica(str(tmp_path / "replica.sqlite3"))
+    yield store
+    store.close()
@@ -0,0 +1,100 @@
+import io
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import mysql.connector
+import pytest
+
+import cli
+from cli import Report, bulk_add
+
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        self.rows = [(word,) for word in self.database.words]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def executemany(self, query, rows):
+        if any(word in self.database.rejected for word, _ in rows):
+            raise mysql.connector.DataError("1406 (22001): Data too long")
+        self.database.words.extend(word for word, _ in rows)
+        self.rowcount = len(rows)
+
+
+class FakeDb:
+    """Stands in for db: the vocabulary is a list of words, and a batch
+    holding a word from ``rejected`` fails with a DataError."""
+
+    def __init__(self, words=(), rejected=()):
+        self.words = list(words)
+        self.rejected = set(rejected)
+
+    @contextmanager
+    def cursor(self):
+        yield FakeCursor(self)
+
+    transaction = cursor
+
+
+@pytest.fixture
+def run(monkeypatch):
+    def run(words, database, meanings, cached=()):
+        acquired = []
+        monkeypatch.setattr(cli, "db", database)
+        monkeypatch.setattr(cli, "fetch_meaning", meanings.get)
+        monkeypatch.setattr(
+            cli.RateLimiter, "acquire", lambda self: acquired.append(True)
+        )
+        cache = SimpleNamespace(contains_fresh=lambda word: word in cached)
+        monkeypatch.setattr(
+            cli.dictionary, "get_client", lambda: SimpleNamespace(cache=cache)
+        )
+        stream = io.StringIO()
+        bulk_add(words, Report(stream), concurrency=1, batch_size=2)
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        return events, len(acquired)
+
+    return run
+
+
+def test_rejected_batch_is_reported_and_the_run_goes_on(run):
+    database = FakeDb(["known"], rejected=["bad"])
+    words = ["known", "a", "bad", "b", "c", "x" * 300]
+    meanings = {word: "meaning" for word in words}
+    events, _ = run(words, database, meanings)
+
+    failed = {e["word"]: e["reason"] for e in events if e["event"] == "failed"}
+    assert failed.pop("x" * 300) == "word longer than 255 characters"
+    # "bad" and the other word of its batch (lookups finish in any order)
+    assert len(failed) == 2 and "bad" in failed
+    assert all(reason.startswith("insert failed: 1406") for reason in failed.values())
+    assert sorted(database.words[1:] + list(failed)) == ["a", "b", "bad", "c"]
+    summary = events[-1]
+    assert summary["event"] == "summary"
+    assert (summary["added"], summary["skipped"], summary["failed"]) == (2, 1, 3)
+
+
+def test_long_meaning_is_not_inserted(run):
+    database = FakeDb()
+    meanings = {"long": "x" * 70000, "short": "fine"}
+    events, _ = run(["long", "short"], database, meanings)
+    [failed] = [e for e in events if e["event"] == "failed"]
+    assert failed == {
+        "event": "failed",
+        "word": "long",
+        "reason": "meaning longer than 65535 bytes",
+    }
+    assert database.words == ["short"]
+
+
+def test_cached_words_are_not_rate_limited(run):
+    meanings = {"a": "1", "b": "2", "c": "3"}
+    _, acquired = run(["a", "b", "c"], FakeDb(), meanings, cached={"a", "c"})
+    assert acquired == 1
@@ -0,0 +1,103 @@
+import pytest
+
+import dedupe
+from dedupe import duplicates, find_clusters, normalize, singular_forms
+
+
+@pytest.mark.parametrize(
+    "word, key",
+    [
+        ("Apple", "apple"),
+        ("  apple ", "apple"),
+        ("APPLES", "apples"),
+        ("ice  creams", "ice creams"),
+        ("ﬁsh", "fish"),
+        ("Straße", "strasse"),
+    ],
+)
+def test_normalize(word, key):
+    assert normalize(word) == key
+
+
+@pytest.mark.parametrize(
+    "key, forms",
+    [
+        ("apples", ["apple"]),
+        ("boxes", ["box", "boxe"]),
+        ("glasses", ["glass", "glasse"]),
+        ("churches", ["church", "churche"]),
+        ("dishes", ["dish", "dishe"]),
+        ("cities", ["city", "citie"]),
+        ("movies", ["movy", "movie"]),
+        ("ice creams", ["ice cream"]),
+        ("axes", ["axe"]),
+        ("as", []),
+    ],
+)
+def test_singular_forms(key, forms):
+    assert singular_forms(key) == forms
+
+
+@pytest.mark.parametrize(
+    "word",
+    [
+        "news",
+        "goods",
+        "means",
+        "series",
+        "glass",
+        "status",
+        "analysis",
+        "bus",
+        "does",
+        "hers",
+        "ours",
+        "yes",
+    ],
+)
+def test_words_that_are_not_plurals(word):
+    assert singular_forms(word) == []
+
+
+def merged(monkeypatch, words, lengths=None):
+    """Return the (kept word, word) pairs dedupe would merge in ``words``,
+    given as rows in id order, and the state of each cluster."""
+    lengths = lengths or {}
+    rows = [(row_id, word) for row_id, word in enumerate(words, 1)]
+
+    def stream(query, **options):
+        if "CHAR_LENGTH" in query:
+            return ((i, word, lengths.get(word, 1)) for i, word in rows)
+        return iter(rows)
+
+    monkeypatch.setattr(dedupe.db, "stream", stream)
+    keys = find_clusters()
+    pairs = [(kept, word) for _, kept, _, word in duplicates(keys)]
+    return pairs, list(dedupe.clusters(keys))
+
+
+def test_plurals_join_their_singular(monkeypatch):
+    words = ["apple", "Movie", "apples", "movies", "Apple ", "cities", "city"]
+    pairs, _ = merged(monkeypatch, words)
+    assert pairs == [
+        ("apple", "apples"),
+        ("Movie", "movies"),
+        ("apple", "Apple "),
+        ("cities", "city"),
+    ]
+
+
+def test_plurals_without_their_singular_are_kept(monkeypatch):
+    words = ["does", "hers", "ours", "yes", "ye", "movies", "boxes", "glasses"]
+    pairs, clusters = merged(monkeypatch, words)
+    assert pairs == []
+    assert clusters == []
+
+
+def test_cluster_keeps_the_oldest_row_and_the_longest_meaning(monkeypatch):
+    words = ["boxes", "Box", "box"]
+    pairs, [cluster] = merged(monkeypatch, words, {"box": 5, "Box": 3})
+    assert pairs == [("boxes", "Box"), ("boxes", "box")]
+    assert cluster[dedupe._COUNT] == 3
+    assert cluster[dedupe._KEEP] == 1
+    assert cluster[dedupe._BEST] == 3
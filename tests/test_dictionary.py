@@ -0,0 +1,108 @@
+import pytest
+import requests
+
+import dictionary
+from dictcache import MISS, DictionaryCache
+from dictionary import DictionaryClient
+
+PAYLOAD = {
+    "word": "apple",
+    "meanings": [
+        {"partOfSpeech": "noun", "definitions": [{"definition": "A round fruit."}]}
+    ],
+}
+
+
+class FakeApi:
+    """Stands in for DictionaryClient._fetch: answers from ``words``, or
+    raises ConnectionError while ``online`` is False."""
+
+    def __init__(self, words):
+        self.words = words
+        self.online = True
+        self.calls = 0
+
+    def __call__(self, key, timeout):
+        self.calls += 1
+        if not self.online:
+            raise requests.ConnectionError("offline")
+        return self.words.get(key)
+
+
+@pytest.fixture
+def cache():
+    cache = DictionaryCache(":memory:", ttl=100, negative_ttl=100, max_entries=10)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def api():
+    return FakeApi({"apple": PAYLOAD})
+
+
+@pytest.fixture
+def client(cache, api):
+    client = DictionaryClient(cache=cache)
+    client._fetch = api
+    return client
+
+
+def expire(cache):
+    cache._conn.execute("UPDATE entries SET fetched_at = fetched_at - 1000")
+
+
+def test_lookup_caches_found_and_missing_words(client, api, cache):
+    assert client.lookup("Apple ").meaning == "A round fruit."
+    assert client.lookup("pear") is None
+    assert cache.get("apple") == PAYLOAD
+    assert cache.get("pear") is None
+    client.forget("apple")
+    client.forget("pear")
+
+    client.lookup("apple")
+    client.lookup("pear")
+    assert api.calls == 2
+
+
+def test_expired_entry_is_served_when_the_fetch_fails(client, api, cache):
+    client.lookup("apple")
+    client.forget("apple")
+    expire(cache)
+    api.online = False
+
+    assert cache.get("apple") is MISS
+    assert cache.get_stale("apple") == PAYLOAD
+    assert client.lookup("apple").meaning == "A round fruit."
+    assert not cache.contains_fresh("apple")
+
+    # The stale copy isn't kept in memory: once online, the word is refreshed.
+    api.online = True
+    client.lookup("apple")
+    assert api.calls == 3
+    assert cache.contains_fresh("apple")
+
+
+def test_failed_fetch_without_a_cached_entry(client, api, cache):
+    api.online = False
+    assert client.lookup("apple") is None
+    assert cache.get_stale("apple") is MISS
+
+
+def test_warm_reports_failures_separately(client, api, monkeypatch, capsys):
+    monkeypatch.setattr(dictionary, "_client", client)
+    client.lookup("cached")
+    api.words["fig"] = PAYLOAD
+    dictionary.warm(["apple", "pear", "cached"], workers=1)
+    assert "Cached 1 new word(s), 1 not found, 0 failed, 1 already cached." in (
+        capsys.readouterr().out
+    )
+
+    # Offline, an expired word is served from the cache but not refreshed.
+    expire(client.cache)
+    client.forget("apple")
+    api.online = False
+    dictionary.warm(["apple", "fig", "plum"], workers=1)
+    captured = capsys.readouterr()
+    assert "Cached 0 new word(s), 0 not found, 3 failed" in captured.out
+    assert "failed: apple" in captured.err
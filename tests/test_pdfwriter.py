@@ -0,0 +1,80 @@
+import io
+import re
+import zlib
+
+import pytest
+
+from pdfwriter import PdfWriter, text_width, wrap
+
+
+def test_text_width():
+    assert text_width("", 10) == 0
+    assert text_width("i", 10) == pytest.approx(2.22)
+    assert text_width("Hello", 12) == pytest.approx(
+        (722 + 556 + 222 + 222 + 556) * 12 / 1000
+    )
+
+
+def test_wrap_breaks_at_spaces():
+    text = "the quick brown fox jumps over the lazy dog"
+    width = text_width("the quick brown", 10)
+    lines = wrap(text, width, 10)
+    assert lines[0] == "the quick brown"
+    assert " ".join(lines) == text
+    assert all(text_width(line, 10) <= width for line in lines)
+
+
+def test_wrap_keeps_newlines_and_splits_long_words():
+    lines = wrap("short\n" + "x" * 50, text_width("x" * 20, 10), 10)
+    assert lines == ["short", "x" * 20, "x" * 20, "x" * 10]
+    assert wrap("", 100, 10) == [""]
+
+
+def parse(data):
+    """Return the objects of a PDF by number, checking the xref offsets."""
+    xref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[xref:].startswith(b"xref\n")
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[xref:]).group(1))
+    entries = re.findall(rb"(\d{10}) 00000 n \n", data[xref:])
+    assert len(entries) == count - 1
+    objects = {}
+    for number, offset in enumerate(entries, 1):
+        pattern = rb"%d 0 obj\n(.*?)\nendobj\n" % number
+        match = re.match(pattern, data[int(offset) :], re.S)
+        assert match, f"object {number} is not at its xref offset"
+        objects[number] = match.group(1)
+    return objects
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_pdf_structure(compress):
+    stream = io.BytesIO()
+    pdf = PdfWriter(stream, compress=compress)
+    pdf.text(50, 50, "Vocabulary (A-Z)", 16, "bold")
+    pdf.new_page()
+    pdf.text(50, 50, "naïve \\ café", 10)
+    assert pdf.page_count == 2
+    pdf.close()
+
+    data = stream.getvalue()
+    assert data.startswith(b"%PDF-1.4\n")
+    objects = parse(data)
+    assert b"/Count 2" in objects[PdfWriter._PAGES]
+    pages = [body for body in objects.values() if body.startswith(b"<< /Type /Page ")]
+    assert len(pages) == 2
+
+    contents = []
+    for body in objects.values():
+        if b"\nstream\n" in body:
+            content = body.split(b"\nstream\n", 1)[1].rsplit(b"\nendstream", 1)[0]
+            contents.append(zlib.decompress(content) if compress else content)
+    assert b"(Vocabulary \\(A-Z\\)) Tj" in contents[0]
+    assert b"/F2 16.00 Tf" in contents[0]
+    assert "(naïve \\\\ café) Tj".encode("cp1252") in contents[1]
+
+
+def test_empty_document_has_one_page():
+    stream = io.BytesIO()
+    pdf = PdfWriter(stream)
+    pdf.close()
+    assert b"/Count 1" in parse(stream.getvalue())[PdfWriter._PAGES]
@@ -0,0 +1,494 @@
+import pytest
+
+import replica
+from conftest import FakeRoot
+from replica import DuplicateWord, SyncWorker, match_query
+
+
+def outbox(local):
+    return local._conn.execute(
+        "SELECT op, local_id, remote_id, word, meaning, version FROM outbox "
+        "ORDER BY seq"
+    ).fetchall()
+
+
+def local_rows(local):
+    return local._conn.execute(
+        "SELECT remote_id, word, meaning FROM vocabulary ORDER BY local_id"
+    ).fetchall()
+
+
+def messages(worker):
+    found = []
+    while not worker._messages.empty():
+        found.append(worker._messages.get_nowait())
+    return found
+
+
+@pytest.fixture
+def worker(local):
+    return SyncWorker(FakeRoot(), local.path)
+
+
+# Outbox
+
+
+def test_edits_fold_into_one_outbox_entry(local):
+    local_id = local.insert("apple", "a fruit")
+    local.update(local_id, "apple", "a red fruit")
+    assert outbox(local) == [("insert", local_id, None, "apple", "a red fruit", 1)]
+
+    local.delete(local_id)
+    assert outbox(local) == []
+    assert local.count() == 0
+
+
+def test_deleting_a_pushed_row_queues_a_delete(local):
+    local_id = local.insert("apple", "a fruit")
+    with local._conn:
+        local._conn.execute("UPDATE vocabulary SET remote_id = 7")
+        local._conn.execute("DELETE FROM outbox")
+
+    local.update(local_id, "apple", "a red fruit")
+    assert outbox(local) == [("update", local_id, None, "apple", "a red fruit", 0)]
+    local.delete(local_id)
+    assert outbox(local) == [("delete", local_id, 7, None, None, 0)]
+
+
+def test_duplicate_words_are_refused(local):
+    local_id = local.insert("apple", "a fruit")
+    other = local.insert("pear", "a fruit")
+    with pytest.raises(DuplicateWord):
+        local.insert("Apple", "again")
+    with pytest.raises(DuplicateWord):
+        local.update(other, "APPLE", "a fruit")
+    local.update(local_id, "Apple", "a fruit")
+
+    assert local.insert_many([("APPLE", "x"), ("plum", "a fruit"), ("Plum", "x")]) == 1
+    assert [word for _, word, _ in local_rows(local)] == ["Apple", "pear", "plum"]
+    assert local.pending() == 3
+
+
+def test_changes_notify(local):
+    calls = []
+    local.on_change = lambda: calls.append(True)
+    local_id = local.insert("apple", "a fruit")
+    local.update(local_id, "apple", "a red fruit")
+    local.insert_many([("apple", "again")])
+    local.delete(local_id)
+    assert len(calls) == 3
+
+
+# Pushing
+
+
+def test_push_inserts_updates_and_deletes(server, local, worker):
+    apple = local.insert("apple", "a fruit")
+    pear = local.insert("pear", "a fruit")
+    assert worker._push_batch(local) is False
+    assert local.pending() == 0
+    assert server.rows() == [(1, "apple", "a fruit"), (2, "pear", "a fruit")]
+    assert local_rows(local) == [(1, "apple", "a fruit"), (2, "pear", "a fruit")]
+
+    local.update(apple, "apple", "a red fruit")
+    local.delete(pear)
+    worker._push_batch(local)
+    assert local.pending() == 0
+    assert server.rows() == [(1, "apple", "a red fruit")]
+
+
+def test_push_sends_new_words_in_one_statement(server, local, worker):
+    local.insert_many((f"word{number:03}", "meaning") for number in range(150))
+    server.statements = 0
+    worker._push_batch(local)
+    # The multi-row INSERT, then the SELECT reading the new ids back
+    assert server.statements == 2
+    assert local.pending() == 0
+    assert local_rows(local) == server.rows()
+
+
+def test_push_keeps_the_order_of_inserts_and_edits(server, local, worker):
+    apple = local.insert("apple", "a fruit")
+    worker._push_batch(local)
+    local.insert_many([("pear", "a fruit"), ("plum", "a fruit")])
+    local.update(apple, "apples", "fruits")
+    local.delete(apple)
+    local.insert("apple", "a fruit again")
+    local.insert("fig", "a fruit")
+    worker._push_batch(local)
+
+    assert local.pending() == 0
+    assert server.rows() == [
+        (2, "pear", "a fruit"),
+        (3, "plum", "a fruit"),
+        (4, "apple", "a fruit again"),
+        (5, "fig", "a fruit"),
+    ]
+    assert local_rows(local) == server.rows()
+
+
+def test_push_conflict_in_a_run_of_inserts(server, local, worker):
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('Pear', 'x')")
+    local.insert_many([("apple", "a"), ("pear", "b"), ("plum", "c")])
+    worker._push_batch(local)
+
+    assert local.pending() == 0
+    assert server.rows() == [(1, "Pear", "x"), (2, "apple", "a"), (3, "plum", "c")]
+    assert local_rows(local) == [(2, "apple", "a"), (1, "Pear", "x"), (3, "plum", "c")]
+    [(word, meaning, reason, _)] = local.conflicts()
+    assert (word, meaning) == ("pear", "b")
+
+
+def test_push_conflict_adopts_the_server_row(server, local, worker):
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('Apple', 'x')")
+    local.insert("apple", "a fruit")
+    worker._push_batch(local)
+
+    assert local.pending() == 0
+    assert local_rows(local) == [(1, "Apple", "x")]
+    [(word, meaning, reason, _)] = local.conflicts()
+    assert (word, meaning) == ("apple", "a fruit")
+    assert reason == "the word was already added from another machine"
+    assert messages(worker) == [("conflict", "apple", reason)]
+
+
+def test_push_rename_conflict(server, local, worker):
+    apple = local.insert("apple", "a fruit")
+    worker._push_batch(local)
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('pear', 'x')")
+
+    local.update(apple, "pear", "a fruit")
+    worker._push_batch(local)
+    assert local_rows(local) == [(1, "apple", "a fruit")]
+    assert local.conflicts()[0][2] == "the new word is already in the database"
+
+
+def test_update_of_a_row_deleted_on_the_server_restores_it(server, local, worker):
+    apple = local.insert("apple", "a fruit")
+    worker._push_batch(local)
+    server.conn.execute("DELETE FROM vocabulary")
+
+    local.update(apple, "apple", "a red fruit")
+    worker._push_batch(local)
+    assert server.rows() == [(2, "apple", "a red fruit")]
+    assert local_rows(local) == [(2, "apple", "a red fruit")]
+
+
+def test_edit_while_insert_in_flight_is_pushed_next(server, local, worker):
+    apple = local.insert("apple", "a fruit")
+    [entry] = local.outbox_batch(10)
+    result = worker._push_entry(_cursor(server), *entry)
+    local.update(apple, "apple", "a red fruit")
+    local.apply_push([result])
+
+    assert outbox(local) == [("update", apple, None, "apple", "a red fruit", 1)]
+    worker._push_batch(local)
+    assert server.rows() == [(1, "apple", "a red fruit")]
+    assert local.pending() == 0
+
+
+def test_delete_while_insert_in_flight_is_pushed_next(server, local, worker):
+    apple = local.insert("apple", "a fruit")
+    [entry] = local.outbox_batch(10)
+    result = worker._push_entry(_cursor(server), *entry)
+    local.delete(apple)
+    local.apply_push([result])
+
+    assert outbox(local) == [("delete", apple, 1, None, None, 0)]
+    worker._push_batch(local)
+    assert server.rows() == []
+    assert local.pending() == 0
+
+
+def test_offline_push_keeps_the_outbox(server, local, worker):
+    local.insert("apple", "a fruit")
+    server.online = False
+    with pytest.raises(Exception) as error:
+        worker._push_batch(local)
+    assert replica.db.is_connection_error(error.value)
+    assert local.pending() == 1
+
+
+def _cursor(server):
+    with server.cursor() as cursor:
+        return cursor
+
+
+# Pulling
+
+
+def change_log(server):
+    return [seq for seq, in server.conn.execute("SELECT seq FROM vocabulary_changes")]
+
+
+def test_first_pull_copies_the_table(server, local, worker):
+    server.now = 1000.0
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('a', '1')")
+    server.now += 1
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('b', '2')")
+    server.now += replica.CHANGE_SETTLE_TIME + 1
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('c', '3')")
+
+    worker._pull(local)
+    assert local_rows(local) == [(1, "a", "1"), (2, "b", "2"), (3, "c", "3")]
+    # Only the settled changes count as read.
+    assert local.sync_state("change_seq") == 2
+    assert messages(worker) == [("pulled",)]
+
+
+def test_incremental_pull(server, local, worker):
+    server.now = 1000.0
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('a', '1')")
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('b', '2')")
+    worker._pull(local)
+    assert local.sync_state("change_seq") == 0
+    messages(worker)
+
+    server.conn.execute("UPDATE vocabulary SET meaning = 'one' WHERE id = 1")
+    server.conn.execute("DELETE FROM vocabulary WHERE id = 2")
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('c', '3')")
+    server.now += replica.CHANGE_SETTLE_TIME + 1
+    worker._pull(local)
+
+    assert local_rows(local) == [(1, "a", "one"), (3, "c", "3")]
+    assert local.sync_state("change_seq") == 5
+    [(kind, changes)] = messages(worker)
+    assert kind == "changed"
+    assert sorted(changes, key=str) == sorted(
+        [
+            ((1, "a", "1"), (1, "a", "one")),
+            ((2, "b", "2"), None),
+            (None, (3, "c", "3")),
+        ],
+        key=str,
+    )
+
+    # Nothing new: nothing applied, nothing reported.
+    worker._pull(local)
+    assert messages(worker) == []
+
+
+def test_pull_leaves_rows_with_local_changes(server, local, worker):
+    server.now = 1000.0
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('a', '1')")
+    worker._pull(local)
+    [(local_id,)] = local._conn.execute("SELECT local_id FROM vocabulary")
+    local.update(local_id, "a", "mine")
+
+    server.conn.execute("UPDATE vocabulary SET meaning = 'theirs'")
+    server.now += replica.CHANGE_SETTLE_TIME + 1
+    worker._pull(local)
+    assert local_rows(local) == [(1, "a", "mine")]
+
+    worker._push_batch(local)
+    assert server.rows() == [(1, "a", "mine")]
+
+
+def test_stale_replica_copies_the_table_again(server, local, worker):
+    server.now = 1000.0
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('a', '1')")
+    worker._pull(local)
+    with local._conn:
+        local.set_sync_state("synced_at", 0)
+    server.conn.execute("DELETE FROM vocabulary_changes")
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('b', '2')")
+    server.now += replica.CHANGE_SETTLE_TIME + 1
+
+    worker._pull(local)
+    assert local_rows(local) == [(1, "a", "1"), (2, "b", "2")]
+
+
+def test_prune_trims_the_change_log(server, local, worker, monkeypatch):
+    monkeypatch.setattr(replica, "PRUNE_BATCH_SIZE", 2)
+    server.now = 1000.0
+    for word in "abcde":
+        server.conn.execute(
+            "INSERT INTO vocabulary (word, meaning) VALUES (?, '')", (word,)
+        )
+    server.now += replica.CHANGE_LOG_RETENTION + 1
+    server.conn.execute("INSERT INTO vocabulary (word, meaning) VALUES ('f', '')")
+
+    worker._prune(local)
+    assert change_log(server) == [6]
+    # At most once a day
+    server.conn.execute("UPDATE vocabulary_changes SET changed_at = 0")
+    worker._prune(local)
+    assert change_log(server) == [6]
+
+
+# Change-log watermark
+
+
+def settle(local, rows):
+    with local._conn:
+        local.set_sync_state("change_seq", 0)
+    return local.apply_changes(rows)
+
+
+def test_watermark_stops_at_the_first_unsettled_change(local):
+    applied = settle(
+        local,
+        [
+            (1, 10, "a", "1", True),
+            (2, 11, "b", "2", False),
+            (3, 12, "c", "3", True),
+        ],
+    )
+    # Everything is applied, but seqs 2 and 3 are read again next time, in
+    # case a slower transaction commits a seq in between.
+    assert len(applied) == 3
+    assert local.sync_state("change_seq") == 1
+    assert local_rows(local) == [(10, "a", "1"), (11, "b", "2"), (12, "c", "3")]
+
+    assert local.apply_changes([(2, 11, "b", "2", True), (3, 12, "c", "3", True)]) == []
+    assert local.sync_state("change_seq") == 3
+    assert local.count() == 3
+
+
+def test_watermark_keeps_its_position_when_nothing_settled(local):
+    with local._conn:
+        local.set_sync_state("change_seq", 5)
+    local.apply_changes([(6, 10, "a", "1", False)])
+    assert local.sync_state("change_seq") == 5
+
+
+def test_changes_apply_the_latest_state_of_each_row(local):
+    applied = settle(
+        local,
+        [
+            (1, 10, "a", "1", True),
+            (2, 10, None, None, True),
+            (3, 11, "b", "2", True),
+            (4, 11, "b", "two", True),
+        ],
+    )
+    assert local_rows(local) == [(11, "b", "two")]
+    assert [new for _, new in applied] == [(1, "b", "two")]
+
+
+def test_changes_skip_rows_with_local_changes(local):
+    settle(local, [(1, 10, "a", "1", True), (2, 11, "b", "2", True)])
+    local_a, local_b = [
+        row[0] for row in local._conn.execute("SELECT local_id FROM vocabulary")
+    ]
+    local.update(local_a, "a", "mine")
+    local.delete(local_b)
+
+    applied = local.apply_changes(
+        [
+            (3, 10, "a", "theirs", True),
+            (4, 11, "b", "theirs", True),
+            (5, 12, "c", "3", True),
+        ]
+    )
+    assert [new for _, new in applied] == [(3, "c", "3")]
+    assert local_rows(local) == [(10, "a", "mine"), (12, "c", "3")]
+    assert local.sync_state("change_seq") == 5
+
+
+# Search
+
+
+@pytest.mark.parametrize(
+    "term, expected",
+    [
+        ("", None),
+        ("   ", None),
+        ("apple", ('"apple"*', "apple")),
+        ("red apple", ('"red" AND "apple"*', "red apple")),
+        ("+red apple", ('"red" AND "apple"*', "red apple")),
+        ("appl* pie", ('"appl"* AND "pie"*', "appl pie")),
+        ('"red apple" pie', ('"red apple" AND "pie"*', "red apple pie")),
+        ("apple -pie", ('"apple" NOT ("pie"*)', "apple")),
+        ("apple -pie -tart", ('"apple" NOT ("pie" OR "tart"*)', "apple")),
+        ("-pie", (None, "")),
+        ("it's", ('"it s"*', "it s")),
+        ('"', None),
+    ],
+)
+def test_match_query(term, expected):
+    assert match_query(term) == expected
+
+
+def add(local, *pairs):
+    return [local.insert(word, meaning) for word, meaning in pairs]
+
+
+def found(local, term):
+    source = local.search(term)
+    return [row[1] for row in source.rows_at(0, source.count() + 1)]
+
+
+def test_search_ranks_exact_then_prefix_matches_first(local):
+    add(
+        local,
+        ("pineapple", "the fruit of the ananas"),
+        ("applesauce", "a purée of apples"),
+        ("apple", "a round fruit"),
+        ("crab", "an apple tree, also a crustacean"),
+    )
+    # "pineapple" is one token, so it doesn't match
+    assert found(local, "apple") == ["apple", "applesauce", "crab"]
+    assert found(local, "fruit round") == ["apple"]
+    assert set(found(local, "fru")) == {"apple", "pineapple"}
+
+
+def test_search_ranks_matches_in_the_word_above_the_meaning(local):
+    add(local, ("bowl", "holds a green salad"), ("green salad", "lettuce"))
+    assert found(local, "salad") == ["green salad", "bowl"]
+
+
+def test_search_operators(local):
+    add(
+        local,
+        ("apple pie", "a dessert"),
+        ("apple tart", "a dessert"),
+        ("apple", "a fruit"),
+    )
+    assert set(found(local, "apple -pie")) == {"apple tart", "apple"}
+    assert set(found(local, "dessert -pie -tart")) == set()
+    assert found(local, "-pie") == []
+    assert local.search("-pie").count() == 0
+    assert found(local, '"apple pie"') == ["apple pie"]
+    assert set(found(local, "app*")) == {"apple pie", "apple tart", "apple"}
+
+
+def test_search_index_follows_changes(local):
+    apple, pear = add(local, ("apple", "a fruit"), ("pear", "a fruit"))
+    local.update(apple, "apricot", "a stone fruit")
+    local.delete(pear)
+    local.apply_changes([(1, 10, "plum", "a fruit", True)])
+
+    assert found(local, "apple") == []
+    assert found(local, "stone") == ["apricot"]
+    assert set(found(local, "fruit")) == {"apricot", "plum"}
+    local._conn.execute(
+        "INSERT INTO vocabulary_fts (vocabulary_fts) VALUES ('integrity-check')"
+    )
+
+
+def test_search_source_pages(local):
+    add(local, *((f"word{number:03}", "common") for number in range(30)))
+    source = local.search("common")
+    assert source.count() == 30
+    first = source.rows_at(0, 10)
+    assert [row[3] for row in first] == list(range(10))
+    assert source.rows_after(source.key(first[-1]), 10) == source.rows_at(10, 10)
+    assert source.rows_before(10, 10) == first
+    assert source.rows_at(25, 10) == source.rows_at(25, 5)
+
+
+def test_old_replica_gets_indexed(tmp_path):
+    path = str(tmp_path / "old.sqlite3")
+    local = replica.Replica(path)
+    local.insert("apple", "a fruit")
+    local._conn.executescript(
+        "DROP TABLE vocabulary_fts; DROP TRIGGER IF EXISTS vocabulary_fts_insert;"
+        "DROP TRIGGER IF EXISTS vocabulary_fts_delete;"
+        "DROP TRIGGER IF EXISTS vocabulary_fts_update;"
+    )
+    local.close()
+
+    local = replica.Replica(path)
+    assert found(local, "fruit") == ["apple"]
+    local.close()
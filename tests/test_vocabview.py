@@ -0,0 +1,273 @@
+"""VirtualTreeview with fake tree and scrollbar widgets.
+
+After any mix of scrolling and edits patched into the buffer, the rows on
+screen must be the rows a fresh read of the source returns at that position.
+"""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import vocabview
+from prefetch import IDLE_DELAY_MS, Prefetcher
+from vocabview import VirtualTreeview
+
+
+class FakeTree:
+    def __init__(self):
+        self.items = {}
+        self._selection = ()
+
+    def configure(self, **options):
+        pass
+
+    def bind(self, sequence, func, add=None):
+        pass
+
+    def after_idle(self, callback):
+        return "idle"
+
+    def after_cancel(self, after_id):
+        pass
+
+    def get_children(self):
+        return tuple(self.items)
+
+    def delete(self, *iids):
+        for iid in iids:
+            del self.items[iid]
+        self._selection = tuple(i for i in self._selection if i in self.items)
+
+    def insert(self, parent, index, iid, values):
+        assert iid not in self.items
+        self.items[iid] = values
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def selection(self):
+        return self._selection
+
+    def selection_set(self, iid):
+        self._selection = (iid,)
+
+    def selection_remove(self, iids):
+        self._selection = ()
+
+    def focus(self, iid):
+        pass
+
+
+class FakeScrollbar:
+    def config(self, **options):
+        pass
+
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+class ListSource:
+    """(id, word) rows held in a list, in id order, filtered by ``term``."""
+
+    def __init__(self, rows, term=""):
+        self.rows = rows
+        self.term = term
+
+    @staticmethod
+    def key(row):
+        return row[0]
+
+    def matches(self, row):
+        return self.term in row[1]
+
+    def count(self):
+        return len(self._matching())
+
+    def rows_after(self, key, limit):
+        return [row for row in self._matching() if row[0] > key][:limit]
+
+    def rows_before(self, key, limit):
+        rows = [row for row in self._matching() if row[0] < key]
+        return rows[max(0, len(rows) - limit) :]
+
+    def rows_at(self, offset, limit):
+        return self._matching()[offset : offset + limit]
+
+    def _matching(self):
+        return sorted(row for row in self.rows if self.matches(row))
+
+
+def format_row(row):
+    return str(row[0]), row[1:]
+
+
+@pytest.fixture
+def view(monkeypatch):
+    # Small pages so the buffer is extended, trimmed and re-anchored often
+    monkeypatch.setattr(vocabview, "PAGE_SIZE", 10)
+    view = VirtualTreeview(FakeTree(), FakeScrollbar(), format_row)
+    view._visible = 20
+    return view
+
+
+def check(view):
+    view._render()
+    expected = view.source.rows_at(view.offset, view._visible)
+    assert list(view.tree.items.values()) == [format_row(row)[1] for row in expected]
+    assert view.total == view.source.count()
+
+
+def scroll(view, rng):
+    action = rng.random()
+    if action < 0.6:
+        view.scroll_to(view.offset + rng.randint(-15, 15))
+    elif action < 0.8:
+        view.yview("moveto", rng.random())
+    else:
+        view.yview("scroll", rng.choice((-1, 1)), rng.choice(("units", "pages")))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_scrolling_shows_the_source_rows(seed, view):
+    rng = random.Random(seed)
+    view.set_source(ListSource([(number, f"word{number}") for number in range(300)]))
+    check(view)
+    for _ in range(300):
+        scroll(view, rng)
+        check(view)
+    view.scroll_to(view.total)
+    check(view)
+    assert view.offset == view.total - view._visible
+
+
+def test_short_source_fits_on_screen(view):
+    view.set_source(ListSource([(1, "one"), (2, "two")]))
+    view.scroll_to(5)
+    check(view)
+    assert view.offset == 0
+    assert view.scrollbar.position == (0.0, 1.0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("term", ["", "3"])
+def test_edits_patch_the_buffer(seed, term, view):
+    rng = random.Random(seed)
+    rows = [(number, f"word{number}") for number in range(300)]
+    view.set_source(ListSource(rows, term))
+    check(view)
+
+    for step in range(300):
+        action = rng.random()
+        if action < 0.5:
+            scroll(view, rng)
+        elif action < 0.7:
+            row = (max(row[0] for row in rows) + 1, f"new{step}")
+            rows.append(row)
+            view.insert_row(row)
+        elif action < 0.85:
+            row = rows.pop(rng.randrange(len(rows)))
+            view.remove_row(row)
+        else:
+            index = rng.randrange(len(rows))
+            old, rows[index] = rows[index], (rows[index][0], f"edit{step}")
+            view.update_row(old, rows[index])
+        check(view)
+
+
+# The replica as the source
+
+
+def replica_row(local, local_id):
+    [row] = local._conn.execute(
+        "SELECT local_id, word, meaning FROM vocabulary WHERE local_id = ?",
+        (local_id,),
+    )
+    return row
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_view_matches_the_replica(seed, local, view):
+    rng = random.Random(seed)
+    local.insert_many((f"word{number:04}", "meaning") for number in range(300))
+    ids = [row[0] for row in local._conn.execute("SELECT local_id FROM vocabulary")]
+    view.set_source(local.search(""))
+    check(view)
+
+    for step in range(300):
+        action = rng.random()
+        if action < 0.5:
+            scroll(view, rng)
+        elif action < 0.7:
+            word = f"new{step}"
+            local_id = local.insert(word, "meaning")
+            ids.append(local_id)
+            view.insert_row((local_id, word, "meaning"))
+        elif action < 0.85:
+            row = replica_row(local, ids.pop(rng.randrange(len(ids))))
+            local.delete(row[0])
+            view.remove_row(row)
+        else:
+            old = replica_row(local, rng.choice(ids))
+            local.update(old[0], f"edit{step}", "changed")
+            view.update_row(old, (old[0], f"edit{step}", "changed"))
+        check(view)
+
+
+def test_search_view_rereads_after_changes(local, view):
+    local.insert_many((f"word{number:02}", "common") for number in range(50))
+    view.set_source(local.search("common"))
+    view.scroll_to(40)
+    check(view)
+
+    local_id = local.insert("another", "common too")
+    view.insert_row((local_id, "another", "common too"))
+    check(view)
+    assert view.total == 51
+
+
+# Prefetching on scroll
+
+
+class TimerRoot:
+    """Records the callbacks scheduled with after()."""
+
+    def __init__(self):
+        self.timers = {}
+
+    def after(self, delay, callback):
+        after_id = f"after{len(self.timers)}"
+        self.timers[after_id] = (delay, callback)
+        return after_id
+
+    def after_cancel(self, after_id):
+        del self.timers[after_id]
+
+    def bind_all(self, sequence, func, add=None):
+        pass
+
+
+@pytest.mark.parametrize(
+    "move",
+    [
+        lambda view: view._on_mousewheel(SimpleNamespace(delta=-120)),
+        lambda view: view._scroll_event(3),
+        lambda view: view._move_selection(1),
+        lambda view: view.yview("moveto", 0.5),
+    ],
+)
+def test_scrolling_schedules_a_prefetch(move, view):
+    root = TimerRoot()
+    prefetcher = Prefetcher(root, view.visible_rows, workers=1)
+    try:
+        view.on_scroll = prefetcher.note_input
+        view.set_source(ListSource([(number, f"word{number}") for number in range(50)]))
+        check(view)
+        assert root.timers == {}
+
+        move(view)
+        [(delay, tick)] = root.timers.values()
+        assert delay == IDLE_DELAY_MS
+        assert tick == prefetcher._tick
+    finally:
+        prefetcher.shutdown()
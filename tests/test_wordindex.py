@@ -0,0 +1,76 @@
+import random
+
+from wordindex import IndexQuery, WordIndex
+
+ROWS = [
+    (1, "Banana", "a fruit"),
+    (2, "apple", "a fruit"),
+    (3, "pineapple", "a fruit"),
+    (4, "Application", "a request"),
+    (5, "grape", "a fruit"),
+]
+
+
+def words(rows):
+    return [row[1] for row in rows]
+
+
+def test_search_lists_prefix_matches_first():
+    index = WordIndex(ROWS)
+    assert words(index.search("app")) == ["apple", "Application", "pineapple"]
+    assert words(index.search("ap")) == ["apple", "Application", "grape", "pineapple"]
+
+
+def test_search_ignores_case_and_surrounding_space():
+    index = WordIndex(ROWS)
+    assert words(index.search(" BAN ")) == ["Banana"]
+    assert words(index.search("")) == [
+        "apple",
+        "Application",
+        "Banana",
+        "grape",
+        "pineapple",
+    ]
+
+
+def test_changes_are_searchable():
+    index = WordIndex(ROWS)
+    index.add((6, "Apricot", "a fruit"))
+    index.remove(2)
+    index.update((3, "Appleseed", "a name"))
+    assert index.remove(99) is None
+    assert len(index) == 5
+    assert index.get(3) == (3, "Appleseed", "a name")
+    assert words(index.search("ap")) == ["Appleseed", "Application", "Apricot", "grape"]
+
+
+def test_extended_term_after_a_change_rescans():
+    index = WordIndex(ROWS)
+    assert words(index.search("pp")) == ["apple", "Application", "pineapple"]
+    index.add((6, "hippo", "an animal"))
+    # "ppo" extends "pp", but the matches cached for "pp" predate "hippo"
+    assert words(index.search("ppo")) == ["hippo"]
+
+
+def test_typing_matches_a_fresh_search():
+    rng = random.Random(0)
+    rows = [
+        (row_id, "".join(rng.choice("abc") for _ in range(rng.randint(1, 6))), "")
+        for row_id in range(500)
+    ]
+    index = WordIndex(rows)
+    for _ in range(50):
+        word = "".join(rng.choice("abc") for _ in range(4))
+        for length in range(1, 5):
+            expected = WordIndex(rows).search(word[:length])
+            assert index.search(word[:length]) == expected
+
+
+def test_index_query_pages_through_results():
+    query = IndexQuery(WordIndex(ROWS), "a")
+    assert query.count() == 5
+    first = query.rows_at(0, 2)
+    assert [row[3] for row in first] == [0, 1]
+    assert query.rows_after(query.key(first[-1]), 2) == query.rows_at(2, 2)
+    assert query.rows_before(2, 10) == first
+    assert query.rows_after(None, 1) == query.rows_at(0, 1)
@@ -0,0 +1,19 @@
+"""Definitions shared by the code that reads the vocabulary table."""
+
+# Characters of the meaning shown in the lists; the full text is read on
+# demand
+MEANING_PREVIEW_LENGTH = 120
+
+# Column expression for the meaning preview selected by list queries
+PREVIEW = f"LEFT(meaning, {MEANING_PREVIEW_LENGTH})"
+
+
+def preview(meaning):
+    """Truncate ``meaning`` the way list queries do."""
+    return meaning[:MEANING_PREVIEW_LENGTH]
+
+
+def escape_like(text):
+    """Escape the LIKE wildcards in ``text``."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
@@ -0,0 +1,344 @@
+"""Windowed (virtual) Treeview for large vocabularies.
+
+Only the rows that fit on screen exist as Treeview items. Rows are read from a
+source (see replica.ReplicaQuery) a page at a time into a small buffer
+around the viewport, and the scrollbar is driven by row positions rather than
+by the Treeview itself, so the cost of showing the list scales with the
+window height instead of with the size of the table.
+"""
+
+from bisect import bisect_left
+from tkinter import ttk
+
+# Rows fetched per query and the number of pages kept around the viewport
+PAGE_SIZE = 100
+MAX_BUFFER_PAGES = 3
+
+# Approximate height of the heading row in pixels
+HEADING_HEIGHT = 30
+
+
+class VirtualTreeview:
+    """Drive ``tree`` and ``scrollbar`` as a window over a paged row source.
+
+    ``format_row`` turns a source row into ``(iid, values)`` for the Treeview.
+    A source provides ``count()``, ``rows_after(key, n)``, ``rows_before(key,
+    n)``, ``rows_at(offset, n)``, ``key(row)`` and ``matches(row)``; rows are
+    ordered by key. A source whose ``ranked`` attribute is true orders rows by
+    something the view can't compute (search relevance), so changes re-read it
+    instead of patching the buffer.
+
+    ``on_scroll``, if given, is called whenever the view scrolls or the
+    keyboard moves the selection. The view's own bindings stop those events
+    from reaching ``bind_all`` handlers.
+    """
+
+    def __init__(self, tree, scrollbar, format_row, on_scroll=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.on_scroll = on_scroll
+        self.source = None
+        self.total = 0
+        # Position of the first visible row
+        self.offset = 0
+
+        # Buffered rows and the position of the first one
+        self._rows = []
+        self._start = 0
+        self._visible = 1
+        self._render_id = None
+        # (iid, row) of the selected row, kept while it is scrolled away
+        self._selected = None
+        # iid -> row for the items currently in the Treeview
+        self._shown = {}
+
+        scrollbar.config(command=self.yview)
+        tree.configure(yscrollcommand="")
+        tree.bind("<Configure>", self._on_configure, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+        tree.bind("<MouseWheel>", self._on_mousewheel)
+        tree.bind("<Button-4>", lambda event: self._scroll_event(-3))
+        tree.bind("<Button-5>", lambda event: self._scroll_event(3))
+        tree.bind("<Up>", lambda event: self._move_selection(-1))
+        tree.bind("<Down>", lambda event: self._move_selection(1))
+        tree.bind("<Prior>", lambda event: self._move_selection(-self._visible))
+        tree.bind("<Next>", lambda event: self._move_selection(self._visible))
+        tree.bind("<Home>", lambda event: self._move_selection(-self.total))
+        tree.bind("<End>", lambda event: self._move_selection(self.total))
+
+    def set_source(self, source):
+        """Show ``source`` from the top."""
+        self.source = source
+        self.total = source.count()
+        self.offset = 0
+        self._rows = []
+        self._start = 0
+        self._selected = None
+        self._render()
+
+    def refresh(self):
+        """Re-read the current source, keeping the scroll position."""
+        if self.source is None:
+            return
+        self.total = self.source.count()
+        self.offset = max(0, min(self.offset, self.total - self._visible))
+        self._rows = []
+        self._start = 0
+        self._render()
+
+    def selected_row(self):
+        """Return the source row that is selected, or None."""
+        return self._selected[1] if self._selected else None
+
+    def visible_rows(self):
+        """Return the rows on screen, top to bottom."""
+        return list(self._shown.values())
+
+    def rows_near_selection(self, count):
+        """Return the selected row and up to ``count`` buffered rows on each
+        side of it, nearest first; empty when nothing is selected."""
+        if not self._selected:
+            return []
+        iids = [self.format_row(row)[0] for row in self._rows]
+        if self._selected[0] not in iids:
+            return []
+        index = iids.index(self._selected[0])
+        rows = [self._rows[index]]
+        for distance in range(1, count + 1):
+            for neighbour in (index + distance, index - distance):
+                if 0 <= neighbour < len(self._rows):
+                    rows.append(self._rows[neighbour])
+        return rows
+
+    def clear_selection(self):
+        self._selected = None
+        self.tree.selection_remove(self.tree.selection())
+
+    # In-place updates: patch the buffer instead of re-reading the source
+
+    def insert_row(self, row):
+        """Show a newly created row if it matches the current source."""
+        if self.source is None:
+            return
+        if getattr(self.source, "ranked", False):
+            self.refresh()
+        elif self.source.matches(row):
+            self._place(row)
+            self._schedule_render()
+
+    def update_row(self, old_row, row):
+        """Reflect an edited row, keeping the list order and filter."""
+        if self.source is None:
+            return
+        if self._selected and self._selected[1] == old_row:
+            self._selected = (self.format_row(row)[0], row)
+        if getattr(self.source, "ranked", False):
+            self.refresh()
+            return
+        if self.source.matches(old_row):
+            self._discard(self.source.key(old_row))
+        if self.source.matches(row):
+            self._place(row)
+        self._schedule_render()
+
+    def remove_row(self, row):
+        """Drop a deleted row from the list."""
+        if self.source is None:
+            return
+        if self._selected and self._selected[1] == row:
+            self._selected = None
+        if getattr(self.source, "ranked", False):
+            self.refresh()
+            return
+        if self.source.matches(row):
+            self._discard(self.source.key(row))
+        self._schedule_render()
+
+    def _place(self, row):
+        keys = [self.source.key(buffered) for buffered in self._rows]
+        key = self.source.key(row)
+        self.total += 1
+        if not self._rows:
+            return
+        if key < keys[0]:
+            # Before the buffer: everything buffered moves down one position,
+            # unless the buffer starts at the top and the row becomes first.
+            if self._start > 0:
+                self._start += 1
+            else:
+                self._rows.insert(0, row)
+        elif key < keys[-1] or self._start + len(self._rows) == self.total - 1:
+            # Inside the buffer, or at the very end of a fully buffered tail.
+            self._rows.insert(bisect_left(keys, key), row)
+
+    def _discard(self, key):
+        keys = [self.source.key(buffered) for buffered in self._rows]
+        self.total = max(0, self.total - 1)
+        if keys and key < keys[0]:
+            # Before the buffer: everything buffered moves up one position.
+            self._start = max(0, self._start - 1)
+        elif keys and key <= keys[-1]:
+            index = bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del self._rows[index]
+        self.offset = max(0, min(self.offset, self.total - self._visible))
+
+    # Scrolling
+
+    def yview(self, *args):
+        """Scrollbar command: handles ``moveto`` and ``scroll`` requests."""
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.total))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= max(self._visible - 1, 1)
+            self.scroll_to(self.offset + amount)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.total - self._visible))
+        if offset != self.offset:
+            self.offset = offset
+            self._update_scrollbar()
+            self._schedule_render()
+            self._scrolled()
+
+    def _scroll_event(self, amount):
+        self.scroll_to(self.offset + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas.
+        notches = max(1, abs(event.delta) // 120)
+        return self._scroll_event(-3 * notches if event.delta > 0 else 3 * notches)
+
+    def _move_selection(self, delta):
+        children = self.tree.get_children()
+        if not children:
+            return "break"
+        selection = self.tree.selection()
+        if selection and selection[0] in children:
+            index = self.offset + children.index(selection[0])
+        else:
+            index = self.offset if delta > 0 else self.offset + len(children) - 1
+            delta = 0
+
+        target = max(0, min(index + delta, self.total - 1))
+        if target < self.offset:
+            self.scroll_to(target)
+        elif target >= self.offset + self._visible:
+            self.scroll_to(target - self._visible + 1)
+        self._render()
+
+        children = self.tree.get_children()
+        if 0 <= target - self.offset < len(children):
+            iid = children[target - self.offset]
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+        self._scrolled()
+        return "break"
+
+    def _scrolled(self):
+        if self.on_scroll is not None:
+            self.on_scroll()
+
+    # Rendering
+
+    def _schedule_render(self):
+        # Coalesce bursts of scroll events (e.g. dragging the thumb) into one
+        # fetch and redraw per idle cycle.
+        if self._render_id is None:
+            self._render_id = self.tree.after_idle(self._render)
+
+    def _render(self):
+        if self._render_id is not None:
+            self.tree.after_cancel(self._render_id)
+            self._render_id = None
+        if self.source is None:
+            return
+
+        rows = self._window(self.offset, self._visible)
+        self.tree.delete(*self.tree.get_children())
+        self._shown = {}
+        for row in rows:
+            iid, values = self.format_row(row)
+            self.tree.insert("", "end", iid=iid, values=values)
+            self._shown[iid] = row
+
+        if self._selected and self.tree.exists(self._selected[0]):
+            self.tree.selection_set(self._selected[0])
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        if self.total <= self._visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(
+                self.offset / self.total, (self.offset + self._visible) / self.total
+            )
+
+    def _on_configure(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - HEADING_HEIGHT) // rowheight)
+        if visible != self._visible:
+            self._visible = visible
+            self.offset = max(0, min(self.offset, self.total - visible))
+            self._schedule_render()
+
+    def _on_select(self, event):
+        # Deleting items while re-rendering clears the Tk selection too, so only
+        # a non-empty selection updates the remembered row; clear_selection()
+        # forgets it explicitly.
+        selection = self.tree.selection()
+        if selection and selection[0] in self._shown:
+            self._selected = (selection[0], self._shown[selection[0]])
+
+    # Buffering
+
+    def _window(self, offset, count):
+        """Return the rows at positions [offset, offset + count)."""
+        end = min(offset + count, self.total)
+        if not self._covers(offset, end):
+            self._fill(offset, end)
+        if not self._covers(offset, end):
+            # The table shrank since it was counted; recount and re-read.
+            self.total = self.source.count()
+            self.offset = offset = max(0, min(offset, self.total - count))
+            end = min(offset + count, self.total)
+            self._jump(offset, end)
+        return self._rows[offset - self._start : end - self._start]
+
+    def _covers(self, offset, end):
+        return self._start <= offset and end <= self._start + len(self._rows)
+
+    def _fill(self, offset, end):
+        buffer_end = self._start + len(self._rows)
+        key = self.source.key
+
+        if self._rows and self._start <= offset and end - buffer_end <= PAGE_SIZE:
+            # Scrolled down past the buffer: fetch the next page by key.
+            self._rows.extend(self.source.rows_after(key(self._rows[-1]), PAGE_SIZE))
+            excess = len(self._rows) - MAX_BUFFER_PAGES * PAGE_SIZE
+            if excess > 0:
+                drop = min(excess, offset - self._start)
+                del self._rows[:drop]
+                self._start += drop
+        elif self._rows and end <= buffer_end and self._start - offset <= PAGE_SIZE:
+            # Scrolled up past the buffer: fetch the previous page by key.
+            rows = self.source.rows_before(key(self._rows[0]), PAGE_SIZE)
+            self._rows[:0] = rows
+            # A short page means we reached the top of the list.
+            self._start = self._start - len(rows) if len(rows) == PAGE_SIZE else 0
+            excess = len(self._rows) - MAX_BUFFER_PAGES * PAGE_SIZE
+            if excess > 0:
+                keep = max(end - self._start, len(self._rows) - excess)
+                del self._rows[keep:]
+        else:
+            self._jump(offset, end)
+
+    def _jump(self, offset, end):
+        # Re-anchor the buffer around a distant position (scrollbar drag).
+        start = max(0, offset - PAGE_SIZE // 2)
+        self._rows = self.source.rows_at(start, end - start + PAGE_SIZE // 2)
+        self._start = start
@@ -0,0 +1,133 @@
+"""In-memory word index for live (search-as-you-type) filtering.
+
+The word column is read once into a case-folded, sorted array. Prefix matches
+are a bisect into it; substring matches are a scan of the folded words, and
+while the user keeps typing (each term extending the previous one) only the
+previous matches are re-checked. Answering a keystroke therefore never touches
+the database, and 100k words filter well within a frame.
+"""
+
+from bisect import bisect_left
+
+import db
+from vocabulary import PREVIEW
+
+
+def fold(word):
+    return word.casefold()
+
+
+class WordIndex:
+    """Sorted, case-insensitive index over (id, word, meaning preview) rows."""
+
+    def __init__(self, rows=()):
+        entries = sorted(((fold(row[1]), row) for row in rows), key=lambda e: e[0])
+        self._keys = [key for key, _ in entries]
+        self._rows = [row for _, row in entries]
+        self._by_id = {row[0]: row for row in self._rows}
+        # Bumped on every change so cached matches are never reused stale
+        self._version = 0
+        # (version, term, sorted positions of keys containing term)
+        self._last = None
+
+    @classmethod
+    def load(cls, config=None):
+        """Build the index from the vocabulary table."""
+        with db.cursor(config) as cursor:
+            cursor.execute(f"SELECT id, word, {PREVIEW} FROM vocabulary")
+            return cls(cursor.fetchall())
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, row_id):
+        return self._by_id.get(row_id)
+
+    def add(self, row):
+        key = fold(row[1])
+        position = bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._rows.insert(position, row)
+        self._by_id[row[0]] = row
+        self._version += 1
+
+    def remove(self, row_id):
+        row = self._by_id.pop(row_id, None)
+        if row is None:
+            return None
+        position = bisect_left(self._keys, fold(row[1]))
+        while self._rows[position][0] != row_id:
+            position += 1
+        del self._keys[position]
+        del self._rows[position]
+        self._version += 1
+        return row
+
+    def update(self, row):
+        self.remove(row[0])
+        self.add(row)
+
+    def search(self, term):
+        """Return the rows whose word contains ``term``, prefix matches first.
+
+        Both groups are in alphabetical order.
+        """
+        term = fold(term.strip())
+        if not term:
+            return list(self._rows)
+
+        keys = self._keys
+        last = self._last
+        if last and last[0] == self._version and term.startswith(last[1]):
+            matched = [position for position in last[2] if term in keys[position]]
+        else:
+            matched = [position for position, key in enumerate(keys) if term in key]
+        self._last = (self._version, term, matched)
+
+        # Words starting with the term form one contiguous run of the array.
+        low = bisect_left(keys, term)
+        high = bisect_left(keys, term + "\U0010ffff", low)
+        rows = self._rows
+        return rows[low:high] + [
+            rows[position] for position in matched if not low <= position < high
+        ]
+
+
+class IndexQuery:
+    """A vocabview source over the index's matches for ``term``.
+
+    Rows are keyed by their position in the results; ``ranked`` makes the view
+    re-run the search after changes instead of patching its buffer.
+    """
+
+    ranked = True
+
+    def __init__(self, index, term=""):
+        self.index = index
+        self.term = term
+        self._results = []
+
+    @staticmethod
+    def key(row):
+        return row[3]
+
+    @staticmethod
+    def matches(row):
+        return False
+
+    def count(self):
+        self._results = self.index.search(self.term)
+        return len(self._results)
+
+    def rows_after(self, key, limit):
+        return self.rows_at(0 if key is None else key + 1, limit)
+
+    def rows_before(self, key, limit):
+        start = max(0, key - limit)
+        return self.rows_at(start, key - start)
+
+    def rows_at(self, offset, limit):
+        return [
+            row + (offset + index,)
+            for index, row in enumerate(self._results[offset : offset + limit])
+        ]